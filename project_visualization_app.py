@@ -3,8 +3,12 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from functools import lru_cache
 import numpy as np
+import copy
 import csv
+import hashlib
+import re
 from auth import (
     check_authentication,
     get_current_user,
@@ -37,6 +41,25 @@ RUSSIAN_MONTHS = {
     12: "Декабрь",
 }
 
+# Ограничения на объем графиков на странице (большие payload'ы тормозят браузер)
+MAX_PROJECT_SECTIONS = 10
+MAX_CONTRACTOR_BARS = 40
+
+# Строковые колонки на Arrow (по умолчанию в pandas 3): .str.replace/.str.strip и
+# astype(str) выполняются векторными ядрами Arrow. На pandas 2.x включаем их явно,
+# если установлен pyarrow; без него остаются обычные object-колонки
+try:
+    import pyarrow  # noqa: F401
+
+    pd.set_option("future.infer_string", True)
+except (ImportError, pd.errors.OptionError):
+    pass
+
+# Copy-on-Write (всегда включен в pandas 3): выборки и assign делят буферы
+# колонок с исходным DataFrame, поэтому защитные df.copy() перед изменением не нужны
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 
 def apply_default_filters(
     report_name: str, user_role: str, filter_widgets: dict
@@ -188,7 +211,454 @@ def get_russian_month_name(period_val):
     return ""
 
 
-def format_dataframe_as_html(df, conditional_cols=None, column_colors=None):
+# Названия месяцев в виде массива для векторного форматирования периодов
+RUSSIAN_MONTH_NAMES = np.array([RUSSIAN_MONTHS[m] for m in range(1, 13)], dtype=object)
+
+
+def format_period_labels(series):
+    """
+    Форматирует месячные периоды как "Месяц ГГГГ" без построчного apply.
+
+    Args:
+        series: Series с dtype period[M]
+
+    Returns:
+        Series строк ("Н/Д" для пустых периодов)
+    """
+    periods = pd.PeriodIndex(series, freq="M")
+    months = periods.month.to_numpy()
+    valid = months > 0
+    labels = np.full(len(periods), "Н/Д", dtype=object)
+    labels[valid] = (
+        RUSSIAN_MONTH_NAMES[months[valid] - 1]
+        + " "
+        + periods.year.to_numpy()[valid].astype(str).astype(object)
+    )
+    return pd.Series(labels, index=series.index)
+
+
+def format_period_values(series):
+    """
+    Форматирует периоды любой частоты без построчного apply.
+
+    Месяцы выводятся как "Месяц ГГГГ", кварталы как "Qn ГГГГ", годы как "ГГГГ".
+
+    Args:
+        series: Series с dtype period (месяц, квартал или год)
+
+    Returns:
+        Series строк ("Н/Д" для пустых периодов)
+    """
+    periods = pd.PeriodIndex(series)
+    valid = ~periods.isna()
+    years = periods.year.to_numpy()[valid].astype(str).astype(object)
+    freq = periods.freqstr[0]
+    if freq == "Q":
+        quarters = periods.quarter.to_numpy()[valid].astype(str).astype(object)
+        values = "Q" + quarters + " " + years
+    elif freq in ("Y", "A"):
+        values = years
+    else:
+        values = RUSSIAN_MONTH_NAMES[periods.month.to_numpy()[valid] - 1] + " " + years
+    labels = np.full(len(periods), "Н/Д", dtype=object)
+    labels[valid] = values
+    return pd.Series(labels, index=series.index)
+
+
+@lru_cache(maxsize=4096)
+def format_period_display(period_val):
+    """
+    Форматирует одно значение периода для отображения.
+
+    Результат кэшируется: в колонке обычно несколько десятков уникальных
+    периодов на тысячи строк, поэтому повторные значения берутся из кэша.
+
+    Args:
+        period_val: pd.Period, строка вида "2025-01" или пустое значение
+
+    Returns:
+        Строка периода ("Н/Д" для пустых значений)
+    """
+    if pd.isna(period_val):
+        return "Н/Д"
+    if isinstance(period_val, pd.Period):
+        try:
+            if period_val.freqstr == "M" or period_val.freqstr.startswith(
+                "M"
+            ):  # Month
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+            elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
+                "Q"
+            ):  # Quarter
+                return f"Q{period_val.quarter} {period_val.year}"
+            elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
+                return str(period_val.year)
+            else:
+                month_name = get_russian_month_name(period_val)
+                year = period_val.year
+                return f"{month_name} {year}"
+        except:
+            # Try parsing as string
+            period_str = str(period_val)
+            try:
+                if "-" in period_str:
+                    parts = period_str.split("-")
+                    if len(parts) >= 2:
+                        year = parts[0]
+                        month = parts[1]
+                        month_num = int(month)
+                        month_name = RUSSIAN_MONTHS.get(month_num, "")
+                        if month_name:
+                            return f"{month_name} {year}"
+            except:
+                pass
+            return str(period_val)
+    elif isinstance(period_val, str):
+        # Try parsing string like "2025-01"
+        try:
+            if "-" in period_val:
+                parts = period_val.split("-")
+                if len(parts) >= 2:
+                    year = parts[0]
+                    month = parts[1]
+                    month_num = int(month)
+                    month_name = RUSSIAN_MONTHS.get(month_num, "")
+                    if month_name:
+                        return f"{month_name} {year}"
+        except:
+            pass
+    return str(period_val)
+
+
+@lru_cache(maxsize=64)
+def match_column_name(columns, possible_names):
+    """
+    Ищет колонку по возможным названиям (точное или частичное совпадение).
+
+    Args:
+        columns: Кортеж названий колонок DataFrame
+        possible_names: Кортеж возможных названий
+
+    Returns:
+        Найденное название колонки или None
+    """
+    for col in columns:
+        col_lower = str(col).lower().strip()
+        for name in possible_names:
+            name_lower = str(name).lower().strip()
+            if (
+                name_lower == col_lower
+                or name_lower in col_lower
+                or col_lower in name_lower
+            ):
+                return col
+    return None
+
+
+def find_column_by_partial(df, possible_names):
+    """
+    Ищет колонку DataFrame по возможным названиям; результат кэшируется по схеме.
+
+    Args:
+        df: DataFrame
+        possible_names: Список возможных названий колонки
+
+    Returns:
+        Найденное название колонки или None
+    """
+    return match_column_name(tuple(df.columns), tuple(possible_names))
+
+
+@lru_cache(maxsize=64)
+def match_documentation_column(columns, possible_names):
+    """
+    Ищет колонку документации по возможным названиям: точное совпадение,
+    вхождение подстроки или все ключевые слова названия в колонке.
+
+    Args:
+        columns: Кортеж названий колонок DataFrame
+        possible_names: Кортеж возможных названий
+
+    Returns:
+        Найденное название колонки или None
+    """
+    # Normalize column names once: remove newlines, extra spaces, normalize case
+    normalized = [
+        (col, str(col).replace("\n", " ").replace("\r", " ").strip().lower())
+        for col in columns
+    ]
+    names = [name.lower().strip() for name in possible_names]
+
+    # Exact match (case insensitive) is a dict lookup on the normalized names
+    normalized_map = {}
+    for col, col_lower in normalized:
+        normalized_map.setdefault(col_lower, col)
+    for name_lower in names:
+        if name_lower in normalized_map:
+            return normalized_map[name_lower]
+
+    name_words = [[w for w in name.split() if len(w) > 2] for name in names]
+
+    for col, col_lower in normalized:
+        for name_lower, words in zip(names, name_words):
+            # Substring match
+            if name_lower in col_lower or col_lower in name_lower:
+                return col
+            # Check if all key words from name are in column
+            if words and all(word in col_lower for word in words):
+                return col
+
+    # Special handling for RD count column with key words
+    if any("разделов" in n and "рд" in n and "договор" in n for n in names):
+        key_words = ["разделов", "договор", "количество"]
+        for col, col_lower in normalized:
+            if all(word in col_lower for word in key_words):
+                return col
+
+    return None
+
+
+def find_documentation_column(df, possible_names):
+    """
+    Ищет колонку документации в DataFrame; результат кэшируется по схеме.
+
+    Args:
+        df: DataFrame
+        possible_names: Список возможных названий колонки
+
+    Returns:
+        Найденное название колонки или None
+    """
+    return match_documentation_column(tuple(df.columns), tuple(possible_names))
+
+
+@lru_cache(maxsize=16)
+def resolve_documentation_columns(columns):
+    """
+    Находит все колонки дашборда документации за один проход по схеме.
+
+    Args:
+        columns: Кортеж названий колонок DataFrame
+
+    Returns:
+        Словарь {ключ: название колонки или None}
+    """
+
+    def find(possible_names, exact=None):
+        if exact is not None and exact in columns:
+            return exact
+        return match_documentation_column(columns, tuple(possible_names))
+
+    return {
+        "rd_count": find(
+            [
+                "Количество разделов РД по Договору",
+                "Количество разделов РД",
+                "разделов РД",
+                "Количетсов разделов РД по Договору",  # Handle typo
+                "Количество разделов РД по договору",
+            ]
+        ),
+        "on_approval": find(["На согласовании", "согласовании"]),
+        "in_production": find(
+            ["Выдано в производство работ", "производство работ", "в производство"]
+        ),
+        "plan_start": find(["Старт План", "План Старт"], exact="plan start"),
+        "plan_end": find(["Конец План", "План Конец"], exact="plan end"),
+        "base_start": find(["Старт Факт", "Факт Старт"], exact="base start"),
+        "base_end": find(["Конец Факт", "Факт Конец"], exact="base end"),
+        "project": find(["Проект", "project"], exact="project name"),
+        "contractor": find(["Выдана подрядчику", "подрядчику"]),
+        "rework": find(["На доработке", "доработке"]),
+        "rd_plan": find(["РД по Договору", "РД по договору", "рд по договору"]),
+    }
+
+
+def to_stripped_category(series):
+    """
+    Обрезает пробелы в значениях и приводит колонку к категориальному типу.
+
+    Выполняется один раз при подготовке данных, после чего фильтрация и
+    группировка работают по целочисленным кодам категорий.
+
+    Args:
+        series: Колонка с текстовыми ключами (проект, контрагент и т.п.)
+
+    Returns:
+        Категориальная колонка (категории отсортированы)
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    stripped = series.where(series.isna(), series.astype(str).str.strip())
+    return stripped.astype("category")
+
+
+def category_equals_ignore_case(series, value):
+    """
+    Маска строк категориальной колонки, равных value без учета регистра.
+
+    Нормализуются только метки категорий (их мало), строки сравниваются по кодам.
+
+    Args:
+        series: Категориальная колонка (см. to_stripped_category)
+        value: Искомое значение
+
+    Returns:
+        Булева Series той же длины, что и series
+    """
+    categories = series.cat.categories
+    if len(categories) == 0:
+        return pd.Series(False, index=series.index)
+    key = str(value).strip().lower()
+    return series.isin(categories[categories.astype(str).str.lower() == key])
+
+
+@st.cache_data(show_spinner=False)
+def get_filter_options(series):
+    """
+    Отсортированные уникальные значения колонки для selectbox фильтра.
+
+    Результат кэшируется между rerun, поэтому unique() и сортировка выполняются
+    один раз на загруженные данные; у категориальной колонки берутся метки
+    категорий.
+
+    Args:
+        series: Колонка с ключами фильтра (проект, этап, блок)
+
+    Returns:
+        Список значений без пустых
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.remove_unused_categories().cat.categories.tolist()
+    return sorted(series.dropna().unique().tolist())
+
+
+def bucket_top_n(df, n, value_col, label_col="Контрагент", other_label="Прочие"):
+    """
+    Сворачивает "хвост" таблицы в одну строку, чтобы ограничить размер графика.
+
+    Args:
+        df: DataFrame с одной строкой на категорию
+        n: Максимальное количество строк в результате (включая other_label)
+        value_col: Колонка, по которой выбираются крупнейшие строки
+        label_col: Колонка с подписями категорий
+        other_label: Подпись для строки с суммой остальных категорий
+
+    Returns:
+        DataFrame из n-1 крупнейших строк (в исходном порядке) и строки other_label
+    """
+    if len(df) <= n:
+        return df
+    keep_index = df[value_col].nlargest(n - 1).index
+    top = df[df.index.isin(keep_index)]
+    rest = df[~df.index.isin(keep_index)]
+    numeric_cols = rest.select_dtypes("number").columns
+    other = pd.DataFrame(
+        [{label_col: other_label, **rest[numeric_cols].sum().to_dict()}]
+    )
+    return pd.concat(
+        [top.astype({label_col: str}), other[top.columns.intersection(other.columns)]],
+        ignore_index=True,
+    )
+
+
+def parse_percentage_column(series):
+    """
+    Преобразует колонку с процентами ('-90%', '12,5 %', 40) в числа.
+
+    Args:
+        series: Колонка с процентами в виде строк или чисел
+
+    Returns:
+        Series float, нераспознанные и пустые значения заменены на 0
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(0)
+    cleaned = (
+        series.astype(str)
+        .str.replace("%", "", regex=False)
+        .str.replace(",", ".", regex=False)
+        .str.replace(" ", "", regex=False)
+    )
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0)
+
+
+def safe_percent(numerator, denominator):
+    """
+    Процент numerator / denominator * 100 с нулем там, где знаменатель равен 0.
+
+    Args:
+        numerator: Числитель (Series или массив)
+        denominator: Знаменатель (Series или массив той же длины)
+
+    Returns:
+        numpy массив float
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    result = np.zeros_like(denominator)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result * 100
+
+
+@st.cache_data(show_spinner=False)
+def aggregate_contractor_metrics(df):
+    """
+    Агрегирует План/Среднее за месяц/Дельта по контрагентам (кэшируется между rerun).
+
+    Args:
+        df: DataFrame с колонками Контрагент, План_numeric, week_sum, Дельта_numeric
+
+    Returns:
+        DataFrame с колонками Контрагент, План, Среднее за месяц, Дельта
+    """
+    contractor_data = (
+        df.groupby("Контрагент", as_index=False, sort=False, observed=True).agg(
+            {
+                "План_numeric": "sum",  # Sum of plans
+                "week_sum": "sum",  # Sum of weeks = среднее за месяц
+                "Дельта_numeric": "sum",  # Sum of deltas
+            }
+        )
+    )
+    contractor_data.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
+    return contractor_data
+
+
+def to_numeric_comma(series):
+    """
+    Преобразует колонку в числа с запятой как десятичным разделителем.
+
+    Args:
+        series: Series со строковыми или числовыми значениями
+
+    Returns:
+        Series float (нечисловые значения -> 0)
+    """
+    return pd.to_numeric(
+        series.astype(str).str.replace(",", ".", regex=False), errors="coerce"
+    ).fillna(0)
+
+
+def format_int_column(series):
+    """Форматирует числовую колонку как целые числа (NaN -> "0") без построчного apply"""
+    return series.fillna(0).astype("int64").astype(str)
+
+
+def format_float_column(series, na_rep=""):
+    """Форматирует числовую колонку с двумя знаками после запятой через np.char.mod"""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(values)
+    formatted = np.char.mod("%.2f", np.where(missing, 0.0, values)).astype(object)
+    formatted[missing] = na_rep
+    return pd.Series(formatted, index=series.index)
+
+
+def format_dataframe_as_html(
+    df, conditional_cols=None, column_colors=None, formatters=None
+):
     """
     Форматирует DataFrame как HTML таблицу с единым стилем.
 
@@ -197,55 +667,134 @@ def format_dataframe_as_html(df, conditional_cols=None, column_colors=None):
         conditional_cols: Словарь {column_name: {'positive_color': '#ff4444', 'negative_color': '#44ff44'}}
                          для условного форматирования колонок
         column_colors: Словарь {column_name: 'color'} для установки цвета текста для колонок
+        formatters: Словарь {column_name: func} для форматирования колонок целиком;
+                    func получает Series с числами и возвращает Series строк
 
     Returns:
         HTML строка с таблицей
     """
-    import html as html_module
-
     if df is None or df.empty:
         return "<p>Нет данных для отображения</p>"
 
-    html_table = "<table style='width:100%; border-collapse: collapse; background-color: #12385C; color: #ffffff;'>"
+    if formatters:
+        # Format whole columns at once instead of per-cell conversions
+        df = df.assign(
+            **{
+                col: formatter(df[col])
+                for col, formatter in formatters.items()
+                if col in df.columns
+            }
+        )
+
+    return render_dataframe_html(df, conditional_cols, column_colors)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def render_dataframe_html(df, conditional_cols=None, column_colors=None):
+    """
+    Собирает HTML таблицу для format_dataframe_as_html.
+
+    Результат кэшируется между rerun по содержимому таблицы и настройкам
+    цветов, поэтому при неизменных данных HTML не строится заново.
+
+    Args:
+        df: Непустой DataFrame (колонки из formatters уже отформатированы)
+        conditional_cols: Словарь условного форматирования колонок
+        column_colors: Словарь {column_name: 'color'} цветов текста колонок
+
+    Returns:
+        HTML строка с таблицей
+    """
+    import html as html_module
+
+    parts = [
+        "<table style='width:100%; border-collapse: collapse; background-color: #12385C; color: #ffffff;'>"
+    ]
 
     # Header row
-    html_table += "<thead><tr>"
+    parts.append("<thead><tr>")
     for col in df.columns:
         col_escaped = html_module.escape(str(col))
-        html_table += f"<th style='border: 1px solid #ffffff; padding: 8px; background-color: rgba(18, 56, 92, 0.95);'>{col_escaped}</th>"
-    html_table += "</tr></thead>"
+        parts.append(
+            f"<th style='border: 1px solid #ffffff; padding: 8px; background-color: rgba(18, 56, 92, 0.95);'>{col_escaped}</th>"
+        )
+    parts.append("</tr></thead>")
 
-    # Data rows
-    html_table += "<tbody>"
-    for idx, row in df.iterrows():
-        html_table += "<tr>"
-        for col in df.columns:
-            value = row[col]
+    # Per-column settings are resolved once instead of for every cell:
+    # conditional columns carry their colors (and precomputed per-row colors
+    # for float columns), regular columns their money flag and cell style
+    column_settings = []
+    for col in df.columns:
+        if conditional_cols and col in conditional_cols:
+            cond_config = conditional_cols[col]
+            positive_color = cond_config.get('positive_color', '#ff4444')
+            negative_color = cond_config.get('negative_color', '#44ff44')
+            # Float columns get their colors for all rows in one comparison;
+            # other dtypes keep the per-cell type check below
+            cell_colors = None
+            if pd.api.types.is_float_dtype(df[col]):
+                cell_colors = np.where(
+                    df[col].to_numpy() > 0, positive_color, negative_color
+                )
+            column_settings.append(
+                {
+                    "conditional": True,
+                    "positive_color": positive_color,
+                    "negative_color": negative_color,
+                    "cell_colors": cell_colors,
+                }
+            )
+        else:
+            # Check if this column has a specific color
+            cell_style = "border: 1px solid #ffffff; padding: 8px;"
+            if column_colors and col in column_colors:
+                cell_style += f" color: {column_colors[col]};"
+            # Check if column name contains "млн руб." - always format as float with 2 decimals
+            column_settings.append(
+                {
+                    "conditional": False,
+                    "is_money_col": "млн руб" in str(col).lower(),
+                    "cell_style": cell_style,
+                }
+            )
 
+    # Data rows: iterate the same row values iterrows() would yield (df.values),
+    # without building a Series per row, and join the parts once at the end
+    parts.append("<tbody>")
+    for row_idx, row_values in enumerate(df.to_numpy()):
+        parts.append("<tr>")
+        for value, settings in zip(row_values, column_settings):
             # Check if this column needs conditional formatting
-            if conditional_cols and col in conditional_cols:
-                cond_config = conditional_cols[col]
-                positive_color = cond_config.get('positive_color', '#ff4444')
-                negative_color = cond_config.get('negative_color', '#44ff44')
+            if settings["conditional"]:
+                positive_color = settings["positive_color"]
+                negative_color = settings["negative_color"]
+                cell_colors = settings["cell_colors"]
 
                 # Conditional formatting: red if positive, green if negative or zero
                 if pd.notna(value) and isinstance(value, (int, float)):
-                    if value > 0:
+                    if cell_colors is not None:
+                        color = cell_colors[row_idx]
+                    elif value > 0:
                         color = positive_color
                     else:
                         color = negative_color
                     formatted_value = f"{value:.2f}" if isinstance(value, float) else f"{int(value)}"
-                    html_table += f"<td style='border: 1px solid #ffffff; padding: 8px; color: {color}; font-weight: bold;'>{formatted_value}</td>"
+                    parts.append(
+                        f"<td style='border: 1px solid #ffffff; padding: 8px; color: {color}; font-weight: bold;'>{formatted_value}</td>"
+                    )
                 else:
                     formatted_value = str(value) if pd.notna(value) else "0"
                     # Escape HTML special characters
                     formatted_value = html_module.escape(str(formatted_value))
-                    html_table += f"<td style='border: 1px solid #ffffff; padding: 8px; color: {negative_color}; font-weight: bold;'>{formatted_value}</td>"
+                    parts.append(
+                        f"<td style='border: 1px solid #ffffff; padding: 8px; color: {negative_color}; font-weight: bold;'>{formatted_value}</td>"
+                    )
             else:
+                is_money_col = settings["is_money_col"]
+                cell_style = settings["cell_style"]
                 # Regular formatting
                 if isinstance(value, (int, float)) and pd.notna(value):
-                    # Check if column name contains "млн руб." - always format as float with 2 decimals
-                    if "млн руб" in str(col).lower():
+                    if is_money_col:
                         formatted_value = f"{float(value):.2f}"
                     # Format numbers appropriately
                     elif isinstance(value, float) and (value % 1 != 0 or abs(value) < 1):
@@ -258,14 +807,11 @@ def format_dataframe_as_html(df, conditional_cols=None, column_colors=None):
                     # Escape HTML special characters but preserve emojis and basic formatting
                     formatted_value = html_module.escape(str(formatted_value))
 
-                # Check if this column has a specific color
-                cell_style = "border: 1px solid #ffffff; padding: 8px;"
-                if column_colors and col in column_colors:
-                    cell_style += f" color: {column_colors[col]};"
+                parts.append(f"<td style='{cell_style}'>{formatted_value}</td>")
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
 
-                html_table += f"<td style='{cell_style}'>{formatted_value}</td>"
-        html_table += "</tr>"
-    html_table += "</tbody></table>"
+    html_table = "".join(parts)
 
     return html_table
 
@@ -754,8 +1300,13 @@ def detect_data_type(df, file_name=None):
     return "project"
 
 
+@st.cache_data(show_spinner=False, max_entries=32)
 def load_data(uploaded_file, file_name=None):
-    """Load data from uploaded file and return DataFrame with metadata"""
+    """Load data from uploaded file and return DataFrame with metadata
+
+    Cached by file content: Streamlit hashes an UploadedFile by its name and
+    bytes, so re-uploading the same file skips parsing.
+    """
     try:
         original_name = file_name if file_name else uploaded_file.name
         if uploaded_file.name.endswith(".csv"):
@@ -836,12 +1387,36 @@ def load_data(uploaded_file, file_name=None):
             if russian_name in df.columns and english_name not in df.columns:
                 df[english_name] = df[russian_name]
 
+        # Convert budget columns to numeric once, so dashboards don't re-parse
+        # them on every rerun
+        budget_columns = [
+            "budget plan",
+            "budget fact",
+            "reserve",
+            "budget adjusted",
+            "adjusted budget",
+        ]
+        for col in budget_columns:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+
+        # Strip whitespace from the filter keys once, so dashboards can compare
+        # them with the selected value directly (numeric keys are left as is)
+        for col in ["project name", "section", "block"]:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].where(
+                    df[col].isna(), df[col].astype(str).str.strip()
+                )
+
         # Convert date columns - handle DD.MM.YYYY format
         date_columns = ["base start", "base end", "plan start", "plan end"]
         for col in date_columns:
             if col in df.columns:
-                # Convert to string first if needed, then parse
-                if df[col].dtype == "object":
+                # Convert to string first if needed, then parse. Text columns
+                # are object or Arrow str (future.infer_string / pandas 3)
+                if pd.api.types.is_object_dtype(
+                    df[col]
+                ) or pd.api.types.is_string_dtype(df[col]):
                     # Try parsing with dayfirst=True for DD.MM.YYYY format
                     df[col] = pd.to_datetime(
                         df[col], errors="coerce", dayfirst=True, format="mixed"
@@ -3721,60 +4296,6 @@ def dashboard_budget_by_period(df):
         filtered_df.groupby([period_col, "project name"]).agg(agg_dict).reset_index()
     )
 
-    # Format period for display
-    def format_period_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        if isinstance(period_val, pd.Period):
-            try:
-                if period_val.freqstr == "M" or period_val.freqstr.startswith(
-                    "M"
-                ):  # Month
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
-                    "Q"
-                ):  # Quarter
-                    return f"Q{period_val.quarter} {period_val.year}"
-                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
-                    return str(period_val.year)
-                else:
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-            except:
-                # Try parsing as string
-                period_str = str(period_val)
-                try:
-                    if "-" in period_str:
-                        parts = period_str.split("-")
-                        if len(parts) >= 2:
-                            year = parts[0]
-                            month = parts[1]
-                            month_num = int(month)
-                            month_name = RUSSIAN_MONTHS.get(month_num, "")
-                            if month_name:
-                                return f"{month_name} {year}"
-                except:
-                    pass
-                return str(period_val)
-        elif isinstance(period_val, str):
-            # Try parsing string like "2025-01"
-            try:
-                if "-" in period_val:
-                    parts = period_val.split("-")
-                    if len(parts) >= 2:
-                        year = parts[0]
-                        month = parts[1]
-                        month_num = int(month)
-                        month_name = RUSSIAN_MONTHS.get(month_num, "")
-                        if month_name:
-                            return f"{month_name} {year}"
-            except:
-                pass
-        return str(period_val)
-
     # Store original period values for sorting before formatting
     budget_summary["period_original"] = budget_summary[period_col]
     budget_summary[period_col] = budget_summary[period_col].apply(format_period_display)
@@ -3802,7 +4323,10 @@ def dashboard_budget_by_period(df):
     # Sort by original period value to ensure correct order for cumulative calculation
     # Convert period_original to sortable format if it's Period objects
     if "period_original" in project_data.columns:
-        if project_data["period_original"].dtype == "object":
+        period_original = project_data["period_original"]
+        if pd.api.types.is_object_dtype(
+            period_original
+        ) or pd.api.types.is_string_dtype(period_original):
             # Try to convert to sortable format
             try:
                 project_data["period_sort"] = project_data["period_original"].apply(
@@ -4082,60 +4606,6 @@ def dashboard_budget_cumulative(df):
         filtered_df.groupby([period_col, "project name"]).agg(agg_dict).reset_index()
     )
 
-    # Format period for display
-    def format_period_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        if isinstance(period_val, pd.Period):
-            try:
-                if period_val.freqstr == "M" or period_val.freqstr.startswith(
-                    "M"
-                ):  # Month
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
-                    "Q"
-                ):  # Quarter
-                    return f"Q{period_val.quarter} {period_val.year}"
-                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
-                    return str(period_val.year)
-                else:
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-            except:
-                # Try parsing as string
-                period_str = str(period_val)
-                try:
-                    if "-" in period_str:
-                        parts = period_str.split("-")
-                        if len(parts) >= 2:
-                            year = parts[0]
-                            month = parts[1]
-                            month_num = int(month)
-                            month_name = RUSSIAN_MONTHS.get(month_num, "")
-                            if month_name:
-                                return f"{month_name} {year}"
-                except:
-                    pass
-                return str(period_val)
-        elif isinstance(period_val, str):
-            # Try parsing string like "2025-01"
-            try:
-                if "-" in period_val:
-                    parts = period_val.split("-")
-                    if len(parts) >= 2:
-                        year = parts[0]
-                        month = parts[1]
-                        month_num = int(month)
-                        month_name = RUSSIAN_MONTHS.get(month_num, "")
-                        if month_name:
-                            return f"{month_name} {year}"
-            except:
-                pass
-        return str(period_val)
-
     budget_summary[period_col] = budget_summary[period_col].apply(format_period_display)
 
     # Aggregate data
@@ -4332,60 +4802,6 @@ def dashboard_budget_by_section(df):
         .reset_index()
     )
 
-    # Format period for display
-    def format_period_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        if isinstance(period_val, pd.Period):
-            try:
-                if period_val.freqstr == "M" or period_val.freqstr.startswith(
-                    "M"
-                ):  # Month
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
-                    "Q"
-                ):  # Quarter
-                    return f"Q{period_val.quarter} {period_val.year}"
-                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
-                    return str(period_val.year)
-                else:
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-            except:
-                # Try parsing as string
-                period_str = str(period_val)
-                try:
-                    if "-" in period_str:
-                        parts = period_str.split("-")
-                        if len(parts) >= 2:
-                            year = parts[0]
-                            month = parts[1]
-                            month_num = int(month)
-                            month_name = RUSSIAN_MONTHS.get(month_num, "")
-                            if month_name:
-                                return f"{month_name} {year}"
-                except:
-                    pass
-                return str(period_val)
-        elif isinstance(period_val, str):
-            # Try parsing string like "2025-01"
-            try:
-                if "-" in period_val:
-                    parts = period_val.split("-")
-                    if len(parts) >= 2:
-                        year = parts[0]
-                        month = parts[1]
-                        month_num = int(month)
-                        month_name = RUSSIAN_MONTHS.get(month_num, "")
-                        if month_name:
-                            return f"{month_name} {year}"
-            except:
-                pass
-        return str(period_val)
-
     # Store original period values for sorting before formatting
     budget_summary["period_original"] = budget_summary[period_col]
     budget_summary[period_col] = budget_summary[period_col].apply(format_period_display)
@@ -4532,41 +4948,6 @@ def dashboard_budget_by_section(df):
 def dashboard_rd_delay(df):
     st.subheader("⏱️ Просрочка выдачи РД")
 
-    # Find column names (they might have different formats)
-    # Try to find columns by partial name matching
-    def find_column(df, possible_names):
-        """Find column by possible names"""
-        for col in df.columns:
-            # Normalize column name: remove newlines, extra spaces, normalize case
-            col_normalized = str(col).replace("\n", " ").replace("\r", " ").strip()
-            col_lower = col_normalized.lower()
-
-            for name in possible_names:
-                name_lower = name.lower().strip()
-                # Exact match (case insensitive)
-                if name_lower == col_lower:
-                    return col
-                # Substring match
-                if name_lower in col_lower or col_lower in name_lower:
-                    return col
-                # Check if all key words from name are in column
-                name_words = [w for w in name_lower.split() if len(w) > 2]
-                if name_words and all(word in col_lower for word in name_words):
-                    return col
-
-        # Special handling for RD count column with key words
-        if any(
-            "разделов" in n.lower() and "рд" in n.lower() and "договор" in n.lower()
-            for n in possible_names
-        ):
-            for col in df.columns:
-                col_lower = str(col).lower().replace("\n", " ").replace("\r", " ")
-                key_words = ["разделов", "рд", "договор", "количество"]
-                if all(word in col_lower for word in key_words if len(word) > 3):
-                    return col
-
-        return None
-
     # Find required columns
     # Column for Y-axis: "Отклонение разделов РД" (exact match from CSV file)
     # This is column 17 in the CSV file (after header row)
@@ -4577,7 +4958,7 @@ def dashboard_rd_delay(df):
         rd_deviation_col = "Отклонение разделов РД"
     else:
         # Try with find_column function for variations
-        rd_deviation_col = find_column(
+        rd_deviation_col = find_documentation_column(
             df,
             [
                 "Отклонение разделов РД",
@@ -4607,20 +4988,22 @@ def dashboard_rd_delay(df):
     plan_start_col = (
         "plan start"
         if "plan start" in df.columns
-        else find_column(df, ["Старт План", "План Старт"])
+        else find_documentation_column(df, ["Старт План", "План Старт"])
     )
     project_col = (
         "project name"
         if "project name" in df.columns
-        else find_column(df, ["Проект", "project"])
+        else find_documentation_column(df, ["Проект", "project"])
     )
     section_col = (
-        "section" if "section" in df.columns else find_column(df, ["Раздел", "section"])
+        "section"
+        if "section" in df.columns
+        else find_documentation_column(df, ["Раздел", "section"])
     )
     task_col = (
         "task name"
         if "task name" in df.columns
-        else find_column(df, ["Задача", "task"])
+        else find_documentation_column(df, ["Задача", "task"])
     )
 
     # Check if required columns exist
@@ -4637,6 +5020,15 @@ def dashboard_rd_delay(df):
         st.info("Пожалуйста, убедитесь, что файл содержит все необходимые колонки.")
         return
 
+    # Project and section are low-cardinality: stripped categoricals give sorted
+    # filter options and integer-code comparisons/grouping below
+    df = df.assign(
+        **{
+            project_col: to_stripped_category(df[project_col]),
+            section_col: to_stripped_category(df[section_col]),
+        }
+    )
+
     # Add filters
     st.subheader("Фильтры")
     filter_col1, filter_col2, filter_col3 = st.columns(3)
@@ -4644,7 +5036,7 @@ def dashboard_rd_delay(df):
     # Project filter
     with filter_col1:
         try:
-            projects = ["Все"] + sorted(df[project_col].dropna().unique().tolist())
+            projects = ["Все"] + df[project_col].cat.categories.tolist()
             selected_project = st.selectbox(
                 "Фильтр по проекту", projects, key="rd_delay_project"
             )
@@ -4655,7 +5047,7 @@ def dashboard_rd_delay(df):
     # Section filter
     with filter_col2:
         try:
-            sections = ["Все"] + sorted(df[section_col].dropna().unique().tolist())
+            sections = ["Все"] + df[section_col].cat.categories.tolist()
             selected_section = st.selectbox(
                 "Фильтр по этапу", sections, key="rd_delay_section"
             )
@@ -4664,18 +5056,16 @@ def dashboard_rd_delay(df):
             return
 
     # Apply filters
-    filtered_df = df.copy()
+    filtered_df = df
 
     if selected_project != "Все":
         filtered_df = filtered_df[
-            filtered_df[project_col].astype(str).str.strip()
-            == str(selected_project).strip()
+            filtered_df[project_col] == str(selected_project).strip()
         ]
 
     if selected_section != "Все":
         filtered_df = filtered_df[
-            filtered_df[section_col].astype(str).str.strip()
-            == str(selected_section).strip()
+            filtered_df[section_col] == str(selected_section).strip()
         ]
 
     if filtered_df.empty:
@@ -4742,7 +5132,7 @@ def dashboard_rd_delay(df):
             # Group by project and sum deviations
             if project_col and project_col in filtered_df.columns:
                 chart_data = (
-                    filtered_df.groupby(project_col)
+                    filtered_df.groupby(project_col, observed=True)
                     .agg({"rd_deviation_numeric": "sum"})
                     .reset_index()
                 )
@@ -4880,23 +5270,9 @@ def dashboard_technique(df):
         )
         return
 
-    # Create working copy
-    work_df = technique_df.copy()
-
-    # Helper function to find columns by partial match (handles encoding issues)
-    def find_column_by_partial(df, possible_names):
-        """Find column by possible names (exact or partial match)"""
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            for name in possible_names:
-                name_lower = str(name).lower().strip()
-                if (
-                    name_lower == col_lower
-                    or name_lower in col_lower
-                    or col_lower in name_lower
-                ):
-                    return col
-        return None
+    # Shallow working copy: only new or replaced columns are written below,
+    # so the session-state frame is never modified
+    work_df = technique_df.copy(deep=False)
 
     # Expected columns: Проект, Контрагент, Период, План, Среднее за месяц, 1 неделя, 2 неделя, 3 неделя, 4 неделя, 5 неделя, Дельта, Дельта (%)
     # Use Russian column names directly
@@ -5025,35 +5401,21 @@ def dashboard_technique(df):
         )
 
     if delta_pct_col and delta_pct_col in work_df.columns:
-
-        def extract_percentage(value):
-            """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
-            if pd.isna(value):
-                return 0
-            # If already numeric, return as is
-            if isinstance(value, (int, float)):
-                return float(value)
-            # Otherwise, try to extract from string
-            value_str = str(value).strip()
-            # Remove % sign and convert to float
-            value_str = value_str.replace("%", "").replace(",", ".").replace(" ", "")
-            try:
-                return float(value_str)
-            except:
-                return 0
-
-        work_df["Дельта_процент_numeric"] = work_df[delta_pct_col].apply(
-            extract_percentage
+        # Extract numeric value from percentage strings like '-90%' (vectorized)
+        work_df["Дельта_процент_numeric"] = parse_percentage_column(
+            work_df[delta_pct_col]
         )
     else:
         # Calculate delta percentage if we have delta and plan
         work_df["Дельта_процент_numeric"] = 0
         if "Дельта_numeric" in work_df.columns and "План_numeric" in work_df.columns:
-            mask = work_df["План_numeric"] != 0
-            work_df.loc[mask, "Дельта_процент_numeric"] = (
-                work_df.loc[mask, "Дельта_numeric"] / work_df.loc[mask, "План_numeric"]
-            ) * 100
-        work_df["Дельта_процент_numeric"] = work_df["Дельта_процент_numeric"].fillna(0)
+            work_df["Дельта_процент_numeric"] = safe_percent(
+                work_df["Дельта_numeric"].fillna(0), work_df["План_numeric"].fillna(0)
+            )
+
+    # Cast aggregation inputs to float64 once so groupby sums use typed reductions
+    aggregation_cols = ["План_numeric", "week_sum", "Дельта_numeric"]
+    work_df[aggregation_cols] = work_df[aggregation_cols].astype("float64")
 
     # Find Проект column
     period_col = None
@@ -5101,13 +5463,19 @@ def dashboard_technique(df):
             work_df, ["Проект", "проект", "project", "Project"]
         )
 
+    # Strip whitespace once and switch filter keys to categorical codes
+    work_df["Контрагент"] = to_stripped_category(work_df["Контрагент"])
+    if project_col and project_col in work_df.columns:
+        work_df[project_col] = to_stripped_category(work_df[project_col])
+
     # Filters - project and contractor filters
     col1, col2 = st.columns(2)
 
     with col1:
         # Project filter - multiselect для выбора нескольких проектов
         if project_col and project_col in work_df.columns:
-            all_projects = sorted(work_df[project_col].dropna().unique().tolist())
+            # Categories are already unique and sorted - no need to re-sort
+            all_projects = work_df[project_col].cat.categories.tolist()
             selected_projects = st.multiselect(
                 "Фильтр по проектам (можно выбрать несколько)",
                 all_projects,
@@ -5121,9 +5489,7 @@ def dashboard_technique(df):
     with col2:
         # Contractor filter
         if "Контрагент" in work_df.columns:
-            contractors = ["Все"] + sorted(
-                work_df["Контрагент"].dropna().unique().tolist()
-            )
+            contractors = ["Все"] + work_df["Контрагент"].cat.categories.tolist()
             selected_contractor = st.selectbox(
                 "Фильтр по контрагенту", contractors, key="technique_contractor"
             )
@@ -5131,23 +5497,21 @@ def dashboard_technique(df):
             selected_contractor = "Все"
             st.info("Колонка 'Контрагент' не найдена")
 
-    # Apply filters
-    filtered_df = work_df.copy()
+    # Apply filters (boolean masking returns new frames, no upfront copy needed)
+    filtered_df = work_df
     if selected_projects and project_col and project_col in filtered_df.columns:
-        # Фильтруем по выбранным проектам
-        project_mask = (
-            filtered_df[project_col]
-            .astype(str)
-            .str.strip()
-            .isin([str(p).strip() for p in selected_projects])
-        )
-        filtered_df = filtered_df[project_mask]
+        # Фильтруем по выбранным проектам (isin по категориям сравнивает коды)
+        filtered_df = filtered_df[filtered_df[project_col].isin(selected_projects)]
     if selected_contractor != "Все" and "Контрагент" in filtered_df.columns:
-        # Use string comparison with strip to handle whitespace
-        filtered_df = filtered_df[
-            filtered_df["Контрагент"].astype(str).str.strip()
-            == str(selected_contractor).strip()
-        ]
+        # Compare categorical codes instead of stripped strings
+        contractor_cat = filtered_df["Контрагент"].cat
+        contractor_key = str(selected_contractor).strip()
+        contractor_code = (
+            contractor_cat.categories.get_loc(contractor_key)
+            if contractor_key in contractor_cat.categories
+            else -1
+        )
+        filtered_df = filtered_df[contractor_cat.codes == contractor_code]
 
     if filtered_df.empty:
         st.info("Нет данных для отображения с выбранными фильтрами.")
@@ -5162,7 +5526,7 @@ def dashboard_technique(df):
         return
 
     # Remove rows where Контрагент is NaN before grouping
-    filtered_df = filtered_df[filtered_df["Контрагент"].notna()].copy()
+    filtered_df = filtered_df[filtered_df["Контрагент"].notna()]
 
     if filtered_df.empty:
         st.info("Нет данных с указанными контрагентами после фильтрации.")
@@ -5174,8 +5538,10 @@ def dashboard_technique(df):
     else:
         # Если проекты не выбраны или колонка не найдена, обрабатываем все проекты
         if project_col and project_col in filtered_df.columns:
-            projects_to_process = sorted(
-                filtered_df[project_col].dropna().unique().tolist()
+            projects_to_process = (
+                filtered_df[project_col]
+                .cat.remove_unused_categories()
+                .cat.categories.tolist()
             )
         else:
             projects_to_process = ["Все проекты"]
@@ -5183,16 +5549,13 @@ def dashboard_technique(df):
     # Обрабатываем каждый проект отдельно
     for project_name in projects_to_process:
         # Фильтруем данные по проекту
-        project_filtered_df = filtered_df.copy()
+        project_filtered_df = filtered_df
         if (
             project_col
-            and project_col in project_filtered_df.columns
+            and project_col in filtered_df.columns
             and project_name != "Все проекты"
         ):
-            project_filtered_df = project_filtered_df[
-                project_filtered_df[project_col].astype(str).str.strip()
-                == str(project_name).strip()
-            ]
+            project_filtered_df = filtered_df[filtered_df[project_col] == project_name]
 
         if project_filtered_df.empty:
             continue
@@ -5228,43 +5591,20 @@ def dashboard_technique(df):
                 )
 
             if delta_pct_col and delta_pct_col in project_filtered_df.columns:
-                # Extract percentage values from the column
-                def extract_percentage(value):
-                    """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
-                    if pd.isna(value):
-                        return 0
-                    # If already numeric, return as is
-                    if isinstance(value, (int, float)):
-                        return float(value)
-                    # Otherwise, try to extract from string
-                    value_str = str(value).strip()
-                    # Remove % sign and convert to float
-                    value_str = (
-                        value_str.replace("%", "").replace(",", ".").replace(" ", "")
-                    )
-                    try:
-                        return float(value_str)
-                    except:
-                        return 0
-
-                project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
-                    delta_pct_col
-                ].apply(extract_percentage)
+                # Extract percentage values from the column (vectorized)
+                project_filtered_df["Дельта_процент_numeric"] = parse_percentage_column(
+                    project_filtered_df[delta_pct_col]
+                )
             else:
                 # Try to calculate from Дельта and План if available
                 if (
                     "Дельта_numeric" in project_filtered_df.columns
                     and "План_numeric" in project_filtered_df.columns
                 ):
-                    project_filtered_df["Дельта_процент_numeric"] = 0
-                    mask = project_filtered_df["План_numeric"] != 0
-                    project_filtered_df.loc[mask, "Дельта_процент_numeric"] = (
-                        project_filtered_df.loc[mask, "Дельта_numeric"]
-                        / project_filtered_df.loc[mask, "План_numeric"]
-                    ) * 100
-                    project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
-                        "Дельта_процент_numeric"
-                    ].fillna(0)
+                    project_filtered_df["Дельта_процент_numeric"] = safe_percent(
+                        project_filtered_df["Дельта_numeric"].fillna(0),
+                        project_filtered_df["План_numeric"].fillna(0),
+                    )
                 else:
                     st.error(
                         "❌ Не удалось найти или рассчитать Дельта (%). Отсутствуют необходимые колонки."
@@ -5283,11 +5623,9 @@ def dashboard_technique(df):
                 not project_filtered_df.empty
                 and "Контрагент" in project_filtered_df.columns
             ):
-                contractor_delta_pct = (
-                    project_filtered_df.groupby("Контрагент")
-                    .agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
-                    .reset_index()
-                )
+                contractor_delta_pct = project_filtered_df.groupby(
+                    "Контрагент", as_index=False, sort=False, observed=True
+                ).agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
 
                 contractor_delta_pct.columns = ["Контрагент", "Дельта (%)"]
             else:
@@ -5298,41 +5636,38 @@ def dashboard_technique(df):
         contractor_delta_pct = pd.DataFrame(columns=["Контрагент", "Дельта (%)"])
 
     # Check if we have data
-    if contractor_delta_pct.empty or len(contractor_delta_pct) == 0:
+    if contractor_delta_pct.empty:
         st.info("Нет данных для отображения круговой диаграммы.")
     else:
-        # Ensure Дельта (%) is numeric
-        contractor_delta_pct["Дельта (%)"] = pd.to_numeric(
+        # Ensure Дельта (%) is numeric; the coerced series and its abs values are
+        # computed once and reused for the zero check, sorting and pie values
+        delta_series = pd.to_numeric(
             contractor_delta_pct["Дельта (%)"], errors="coerce"
         ).fillna(0)
+        delta_abs_series = delta_series.abs()
 
         # Check if we have any non-zero values
-        total_abs_sum = contractor_delta_pct["Дельта (%)"].abs().sum()
+        total_abs_sum = delta_abs_series.sum()
 
         if total_abs_sum == 0:
             st.info(
                 "Все значения дельты (%) равны нулю. Диаграмма не может быть построена."
             )
         else:
-            # Remove only exactly zero values (not small values)
-            non_zero_data = contractor_delta_pct[
-                contractor_delta_pct["Дельта (%)"] != 0
-            ].copy()
-
-            # Use non-zero data if available
-            if not non_zero_data.empty:
-                contractor_delta_pct = non_zero_data
-
-            # Sort by absolute value for better visualization
-            contractor_delta_pct = contractor_delta_pct.sort_values(
-                "Дельта (%)", key=abs, ascending=False
+            # Remove only exactly zero values (not small values); sort by absolute
+            # value for better visualization (pie charts don't support negative values)
+            non_zero = delta_series != 0
+            contractor_delta_pct = (
+                contractor_delta_pct.loc[non_zero]
+                .assign(
+                    **{
+                        "Дельта (%)": delta_series[non_zero],
+                        "Дельта (%)_abs": delta_abs_series[non_zero],
+                    }
+                )
+                .sort_values("Дельта (%)_abs", ascending=False, kind="stable")
             )
-
-            # Create a copy with absolute values for pie chart (pie charts don't support negative values)
-            contractor_delta_pct_abs = contractor_delta_pct.copy()
-            contractor_delta_pct_abs["Дельта (%)_abs"] = contractor_delta_pct_abs[
-                "Дельта (%)"
-            ].abs()
+            contractor_delta_pct_abs = contractor_delta_pct
 
             # Store original values for display
             original_values = contractor_delta_pct_abs["Дельта (%)"].tolist()
@@ -5374,55 +5709,30 @@ def dashboard_technique(df):
         )
 
         # Group by Контрагент and aggregate
-        # Ensure Дельта_numeric exists
-        if "Дельта_numeric" not in project_filtered_df.columns:
-            # Try to calculate if missing
-            if (
-                "План_numeric" in project_filtered_df.columns
-                and "week_sum" in project_filtered_df.columns
-            ):
-                project_filtered_df["Дельта_numeric"] = (
-                    project_filtered_df["План_numeric"]
-                    - project_filtered_df["week_sum"]
-                )
-            else:
-                project_filtered_df["Дельта_numeric"] = 0
-
-        contractor_data = (
-            project_filtered_df.groupby("Контрагент")
-            .agg(
-                {
-                    "План_numeric": "sum",  # Sum of plans
-                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
-                    "Дельта_numeric": "sum",  # Sum of deltas
-                }
-            )
-            .reset_index()
+        # Дельта_numeric is always materialized once on work_df above
+        contractor_data = aggregate_contractor_metrics(
+            project_filtered_df[
+                ["Контрагент", "План_numeric", "week_sum", "Дельта_numeric"]
+            ]
         )
 
-        contractor_data.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
-
-        # Ensure Дельта column has numeric values
-        contractor_data["Дельта"] = pd.to_numeric(
-            contractor_data["Дельта"], errors="coerce"
-        ).fillna(0)
-
         # Sort by contractor name
         contractor_data = contractor_data.sort_values("Контрагент")
 
-        # Create bar chart
+        # Create bar chart; traces get plain ndarrays instead of Series
+        contractor_names = contractor_data["Контрагент"].to_numpy()
+        plan_values = contractor_data["План"].to_numpy()
+        average_values = contractor_data["Среднее за месяц"].to_numpy()
         fig_bar = go.Figure()
 
         # Add bars for Plan
         fig_bar.add_trace(
             go.Bar(
                 name="План",
-                x=contractor_data["Контрагент"],
-                y=contractor_data["План"],
+                x=contractor_names,
+                y=plan_values,
                 marker_color="#3498db",
-                text=contractor_data["План"].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) else "0"
-                ),
+                text=format_int_column(contractor_data["План"]).to_numpy(),
                 textposition="outside",
                 textfont=dict(size=12, color="white"),
             )
@@ -5432,75 +5742,38 @@ def dashboard_technique(df):
         fig_bar.add_trace(
             go.Bar(
                 name="Среднее за месяц",
-                x=contractor_data["Контрагент"],
-                y=contractor_data["Среднее за месяц"],
+                x=contractor_names,
+                y=average_values,
                 marker_color="#2ecc71",
-                text=contractor_data["Среднее за месяц"].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) else "0"
-                ),
+                text=format_int_column(contractor_data["Среднее за месяц"]).to_numpy(),
                 textposition="outside",
                 textfont=dict(size=12, color="white"),
             )
         )
 
         # Add bars for Delta - ensure values are properly formatted
-        # Разделяем на положительные и отрицательные значения для разных цветов
-        delta_values = contractor_data["Дельта"].fillna(0)
-        delta_abs = delta_values.abs()  # Абсолютные значения для отображения
-
-        # Положительные значения дельты (зеленый)
-        positive_mask = delta_values > 0
-        if positive_mask.any():
-            fig_bar.add_trace(
-                go.Bar(
-                    name="Дельта (+)",
-                    x=contractor_data.loc[positive_mask, "Контрагент"],
-                    y=delta_abs[positive_mask],
-                    marker_color="#2ecc71",  # Зеленый для положительных
-                    text=delta_abs[positive_mask].apply(
-                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                    ),
-                    textposition="outside",
-                    textfont=dict(size=12, color="white"),
-                    showlegend=False,
-                )
-            )
-
-        # Отрицательные значения дельты (красный)
-        negative_mask = delta_values < 0
-        if negative_mask.any():
-            fig_bar.add_trace(
-                go.Bar(
-                    name="Дельта (-)",
-                    x=contractor_data.loc[negative_mask, "Контрагент"],
-                    y=delta_abs[negative_mask],
-                    marker_color="#e74c3c",  # Красный для отрицательных
-                    text=delta_abs[negative_mask].apply(
-                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                    ),
-                    textposition="outside",
-                    textfont=dict(size=12, color="white"),
-                    showlegend=False,
-                )
-            )
-
-        # Нулевые значения (если есть)
-        zero_mask = delta_values == 0
-        if zero_mask.any():
-            fig_bar.add_trace(
-                go.Bar(
-                    name="Дельта (0)",
-                    x=contractor_data.loc[zero_mask, "Контрагент"],
-                    y=delta_abs[zero_mask],
-                    marker_color="#95a5a6",  # Серый для нулевых
-                    text=delta_abs[zero_mask].apply(
-                        lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                    ),
-                    textposition="outside",
-                    textfont=dict(size=12, color="white"),
-                    showlegend=False,
-                )
+        # Одна серия с цветом по знаку дельты вместо трёх отдельных трасс
+        delta_values = contractor_data["Дельта"].fillna(0).to_numpy()
+        delta_abs = np.abs(delta_values)  # Абсолютные значения для отображения
+        delta_colors = np.where(
+            delta_values > 0,
+            "#2ecc71",  # Зеленый для положительных
+            np.where(delta_values < 0, "#e74c3c", "#95a5a6"),  # Красный / серый
+        )
+        fig_bar.add_trace(
+            go.Bar(
+                name="Дельта",
+                x=contractor_names,
+                y=delta_abs,
+                marker_color=delta_colors.tolist(),
+                text=np.where(
+                    delta_abs >= 0.5, delta_abs.astype(np.int64).astype(str), "0"
+                ),
+                textposition="outside",
+                textfont=dict(size=12, color="white"),
+                showlegend=False,
             )
+        )
 
         # Update layout
         fig_bar.update_layout(
@@ -5523,49 +5796,22 @@ def dashboard_technique(df):
             "📊 Круговая диаграмма: Распределение суммы Плана и Среднего за месяц по контрагентам"
         )
 
-        # Group by Контрагент and aggregate for pie chart (Plan + Average)
-        contractor_plan_avg = (
-            project_filtered_df.groupby("Контрагент")
-            .agg(
-                {
-                    "План_numeric": "sum",  # Sum of plans
-                    "week_sum": "sum",  # Sum of weeks = среднее за месяц
-                    "Дельта_numeric": "sum",  # Sum of deltas
-                }
-            )
-            .reset_index()
-        )
-
-        contractor_plan_avg.columns = [
-            "Контрагент",
-            "План",
-            "Среднее за месяц",
-            "Дельта",
-        ]
-
+        # Reuse the per-contractor aggregation from Chart 2 (Plan + Average)
         # Calculate sum of Plan + Average for each contractor
-        contractor_plan_avg["Сумма"] = (
-            contractor_plan_avg["План"] + contractor_plan_avg["Среднее за месяц"]
+        contractor_sum = contractor_data["План"] + contractor_data["Среднее за месяц"]
+
+        # Remove zero values for pie chart before computing the shares
+        contractor_plan_avg = contractor_data[contractor_sum != 0].assign(
+            Сумма=contractor_sum
         )
 
         # Calculate доля факта (Среднее за месяц / Сумма * 100) and доля отклонения (Дельта / План * 100)
-        contractor_plan_avg["Доля факта (%)"] = 0
-        contractor_plan_avg["Доля отклонения (%)"] = 0
-        mask_sum = contractor_plan_avg["Сумма"] != 0
-        contractor_plan_avg.loc[mask_sum, "Доля факта (%)"] = (
-            contractor_plan_avg.loc[mask_sum, "Среднее за месяц"]
-            / contractor_plan_avg.loc[mask_sum, "Сумма"]
-        ) * 100
-        mask_plan = contractor_plan_avg["План"] != 0
-        contractor_plan_avg.loc[mask_plan, "Доля отклонения (%)"] = (
-            contractor_plan_avg.loc[mask_plan, "Дельта"]
-            / contractor_plan_avg.loc[mask_plan, "План"]
-        ) * 100
-
-        # Remove zero values for pie chart
-        contractor_plan_avg = contractor_plan_avg[
-            contractor_plan_avg["Сумма"] != 0
-        ].copy()
+        contractor_plan_avg["Доля факта (%)"] = safe_percent(
+            contractor_plan_avg["Среднее за месяц"], contractor_plan_avg["Сумма"]
+        )
+        contractor_plan_avg["Доля отклонения (%)"] = safe_percent(
+            contractor_plan_avg["Дельта"], contractor_plan_avg["План"]
+        )
 
         if contractor_plan_avg.empty:
             st.info("Нет данных для отображения.")
@@ -5595,13 +5841,27 @@ def dashboard_technique(df):
 
             # Prepare custom text with доля факта and доля отклонения
             total_sum = contractor_plan_avg["Сумма"].sum()
-            custom_texts = []
-            for idx, row in contractor_plan_avg.iterrows():
-                fact_pct = row["Доля факта (%)"]
-                delta_pct = row["Доля отклонения (%)"]
-                percent_val = (row["Сумма"] / total_sum * 100) if total_sum > 0 else 0
-                text = f"{row['Контрагент']}<br>Факт: {fact_pct:.0f}%<br>Отклонение: {delta_pct:.0f}%<br>({percent_val:.0f}%)"
-                custom_texts.append(text)
+            fact_text = format_int_column(contractor_plan_avg["Доля факта (%)"].round())
+            delta_text = format_int_column(
+                contractor_plan_avg["Доля отклонения (%)"].round()
+            )
+            percent_text = (
+                format_int_column(
+                    (contractor_plan_avg["Сумма"] / total_sum * 100).round()
+                )
+                if total_sum > 0
+                else pd.Series("0", index=contractor_plan_avg.index)
+            )
+            custom_texts = (
+                contractor_plan_avg["Контрагент"].astype(str)
+                + "<br>Факт: "
+                + fact_text
+                + "%<br>Отклонение: "
+                + delta_text
+                + "%<br>("
+                + percent_text
+                + "%)"
+            ).tolist()
 
             fig_pie_plan_avg.update_traces(
                 textposition="inside",
@@ -5629,19 +5889,15 @@ def dashboard_technique(df):
         # ========== Summary Table ==========
         st.subheader("📋 Сводная таблица по контрагентам")
 
-        # Format numbers for display
-        summary_table = contractor_data.copy()
-        summary_table["План"] = summary_table["План"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
-        )
-        summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
-        )
-        summary_table["Дельта"] = summary_table["Дельта"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
+        # Format numbers for display (whole columns, inside the HTML helper)
+        html_table = format_dataframe_as_html(
+            contractor_data,
+            formatters={
+                "План": format_int_column,
+                "Среднее за месяц": format_int_column,
+                "Дельта": format_int_column,
+            },
         )
-
-        html_table = format_dataframe_as_html(summary_table)
         st.markdown(html_table, unsafe_allow_html=True)
 
         # Summary metrics
@@ -5672,21 +5928,18 @@ def dashboard_workforce_movement(df):
     combined_df = None
 
     if resources_df is not None and not resources_df.empty:
-        combined_df = resources_df.copy()
-        combined_df["data_source"] = "Ресурсы"
+        combined_df = resources_df.assign(data_source="Ресурсы")
 
     if technique_df is not None and not technique_df.empty:
         if combined_df is not None:
-            technique_copy = technique_df.copy()
-            technique_copy["data_source"] = "Техника"
+            technique_copy = technique_df.assign(data_source="Техника")
             # Align columns before concatenation to avoid issues
             # If technique has "Среднее за месяц" but resources has "Среднее за неделю", keep both
             combined_df = pd.concat(
                 [combined_df, technique_copy], ignore_index=True, sort=False
             )
         else:
-            combined_df = technique_df.copy()
-            combined_df["data_source"] = "Техника"
+            combined_df = technique_df.assign(data_source="Техника")
 
     if combined_df is None or combined_df.empty:
         st.warning(
@@ -5697,23 +5950,8 @@ def dashboard_workforce_movement(df):
         )
         return
 
-    # Create working copy
-    work_df = combined_df.copy()
-
-    # Helper function to find columns by partial match (handles encoding issues)
-    def find_column_by_partial(df, possible_names):
-        """Find column by possible names (exact or partial match)"""
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            for name in possible_names:
-                name_lower = str(name).lower().strip()
-                if (
-                    name_lower == col_lower
-                    or name_lower in col_lower
-                    or col_lower in name_lower
-                ):
-                    return col
-        return None
+    # combined_df is already a fresh frame (assign/concat), work on it directly
+    work_df = combined_df
 
     # Expected columns: Проект, Контрагент, Период, План, Среднее за неделю, 1 неделя, 2 неделя, 3 неделя, 4 неделя, 5 неделя, Дельта, Дельта (%)
     # Use Russian column names directly
@@ -5865,35 +6103,17 @@ def dashboard_workforce_movement(df):
         )
 
     if delta_pct_col and delta_pct_col in work_df.columns:
-
-        def extract_percentage(value):
-            """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
-            if pd.isna(value):
-                return 0
-            # If already numeric, return as is
-            if isinstance(value, (int, float)):
-                return float(value)
-            # Otherwise, try to extract from string
-            value_str = str(value).strip()
-            # Remove % sign and convert to float
-            value_str = value_str.replace("%", "").replace(",", ".").replace(" ", "")
-            try:
-                return float(value_str)
-            except:
-                return 0
-
-        work_df["Дельта_процент_numeric"] = work_df[delta_pct_col].apply(
-            extract_percentage
+        # Extract numeric value from percentage strings like '-90%' (vectorized)
+        work_df["Дельта_процент_numeric"] = parse_percentage_column(
+            work_df[delta_pct_col]
         )
     else:
         # Calculate delta percentage if we have delta and plan
         work_df["Дельта_процент_numeric"] = 0
         if "Дельта_numeric" in work_df.columns and "План_numeric" in work_df.columns:
-            mask = work_df["План_numeric"] != 0
-            work_df.loc[mask, "Дельта_процент_numeric"] = (
-                work_df.loc[mask, "Дельта_numeric"] / work_df.loc[mask, "План_numeric"]
-            ) * 100
-        work_df["Дельта_процент_numeric"] = work_df["Дельта_процент_numeric"].fillna(0)
+            work_df["Дельта_процент_numeric"] = safe_percent(
+                work_df["Дельта_numeric"].fillna(0), work_df["План_numeric"].fillna(0)
+            )
 
     # Ensure Среднее_за_неделю_numeric exists (should already be calculated above)
     if "Среднее_за_неделю_numeric" not in work_df.columns:
@@ -5903,6 +6123,10 @@ def dashboard_workforce_movement(df):
             work_df["week_sum"] / num_weeks if num_weeks > 0 else 0
         )
 
+    # Cast aggregation inputs to float64 once so groupby sums use typed reductions
+    aggregation_cols = ["План_numeric", "week_sum", "Дельта_numeric"]
+    work_df[aggregation_cols] = work_df[aggregation_cols].astype("float64")
+
     # Find Проект column
     project_col = None
     if "Проект" in work_df.columns:
@@ -5912,13 +6136,19 @@ def dashboard_workforce_movement(df):
             work_df, ["Проект", "проект", "project", "Project"]
         )
 
+    # Strip whitespace once and switch filter keys to categorical codes
+    work_df["Контрагент"] = to_stripped_category(work_df["Контрагент"])
+    if project_col and project_col in work_df.columns:
+        work_df[project_col] = to_stripped_category(work_df[project_col])
+
     # Filters - project and contractor filters
     col1, col2 = st.columns(2)
 
     with col1:
         # Project filter - multiselect для выбора нескольких проектов
         if project_col and project_col in work_df.columns:
-            all_projects = sorted(work_df[project_col].dropna().unique().tolist())
+            # Categories are already unique and sorted - no need to re-sort
+            all_projects = work_df[project_col].cat.categories.tolist()
             selected_projects = st.multiselect(
                 "Фильтр по проектам (можно выбрать несколько)",
                 all_projects,
@@ -5932,9 +6162,7 @@ def dashboard_workforce_movement(df):
     with col2:
         # Contractor filter
         if "Контрагент" in work_df.columns:
-            contractors = ["Все"] + sorted(
-                work_df["Контрагент"].dropna().unique().tolist()
-            )
+            contractors = ["Все"] + work_df["Контрагент"].cat.categories.tolist()
             selected_contractor = st.selectbox(
                 "Фильтр по контрагенту", contractors, key="workforce_contractor"
             )
@@ -5942,23 +6170,21 @@ def dashboard_workforce_movement(df):
             selected_contractor = "Все"
             st.info("Колонка 'Контрагент' не найдена")
 
-    # Apply filters
-    filtered_df = work_df.copy()
+    # Apply filters (boolean masking returns new frames, no upfront copy needed)
+    filtered_df = work_df
     if selected_projects and project_col and project_col in filtered_df.columns:
-        # Фильтруем по выбранным проектам
-        project_mask = (
-            filtered_df[project_col]
-            .astype(str)
-            .str.strip()
-            .isin([str(p).strip() for p in selected_projects])
-        )
-        filtered_df = filtered_df[project_mask]
+        # Фильтруем по выбранным проектам (isin по категориям сравнивает коды)
+        filtered_df = filtered_df[filtered_df[project_col].isin(selected_projects)]
     if selected_contractor != "Все" and "Контрагент" in filtered_df.columns:
-        # Use string comparison with strip to handle whitespace
-        filtered_df = filtered_df[
-            filtered_df["Контрагент"].astype(str).str.strip()
-            == str(selected_contractor).strip()
-        ]
+        # Compare categorical codes instead of stripped strings
+        contractor_cat = filtered_df["Контрагент"].cat
+        contractor_key = str(selected_contractor).strip()
+        contractor_code = (
+            contractor_cat.categories.get_loc(contractor_key)
+            if contractor_key in contractor_cat.categories
+            else -1
+        )
+        filtered_df = filtered_df[contractor_cat.codes == contractor_code]
 
     if filtered_df.empty:
         st.info("Нет данных для отображения с выбранными фильтрами.")
@@ -5973,37 +6199,52 @@ def dashboard_workforce_movement(df):
         return
 
     # Remove rows where Контрагент is NaN before grouping
-    filtered_df = filtered_df[filtered_df["Контрагент"].notna()].copy()
+    filtered_df = filtered_df[filtered_df["Контрагент"].notna()]
 
     if filtered_df.empty:
         st.info("Нет данных с указанными контрагентами после фильтрации.")
         return
 
+    # Sort once by group keys so every groupby below scans contiguous rows
+    sort_keys = ["Контрагент"]
+    if project_col and project_col in filtered_df.columns:
+        sort_keys.insert(0, project_col)
+    filtered_df = filtered_df.sort_values(sort_keys, kind="stable").reset_index(
+        drop=True
+    )
+
     # Определяем список проектов для обработки
     if selected_projects and project_col and project_col in filtered_df.columns:
         projects_to_process = selected_projects
     else:
         # Если проекты не выбраны или колонка не найдена, обрабатываем все проекты
         if project_col and project_col in filtered_df.columns:
-            projects_to_process = sorted(
-                filtered_df[project_col].dropna().unique().tolist()
+            projects_to_process = (
+                filtered_df[project_col]
+                .cat.remove_unused_categories()
+                .cat.categories.tolist()
             )
         else:
             projects_to_process = ["Все проекты"]
 
+    # Слишком много проектов - показываем один сводный вид вместо N наборов графиков
+    if len(projects_to_process) > MAX_PROJECT_SECTIONS:
+        st.warning(
+            f"⚠️ Выбрано проектов: {len(projects_to_process)}. Слишком много для "
+            "отдельных графиков; показываем сводный вид по всем выбранным проектам."
+        )
+        projects_to_process = ["Все проекты"]
+
     # Обрабатываем каждый проект отдельно
     for project_name in projects_to_process:
         # Фильтруем данные по проекту
-        project_filtered_df = filtered_df.copy()
+        project_filtered_df = filtered_df
         if (
             project_col
-            and project_col in project_filtered_df.columns
+            and project_col in filtered_df.columns
             and project_name != "Все проекты"
         ):
-            project_filtered_df = project_filtered_df[
-                project_filtered_df[project_col].astype(str).str.strip()
-                == str(project_name).strip()
-            ]
+            project_filtered_df = filtered_df[filtered_df[project_col] == project_name]
 
         if project_filtered_df.empty:
             continue
@@ -6039,43 +6280,20 @@ def dashboard_workforce_movement(df):
                 )
 
             if delta_pct_col and delta_pct_col in project_filtered_df.columns:
-                # Extract percentage values from the column
-                def extract_percentage(value):
-                    """Extract numeric value from percentage string like '-90%' or '90%', or numeric value"""
-                    if pd.isna(value):
-                        return 0
-                    # If already numeric, return as is
-                    if isinstance(value, (int, float)):
-                        return float(value)
-                    # Otherwise, try to extract from string
-                    value_str = str(value).strip()
-                    # Remove % sign and convert to float
-                    value_str = (
-                        value_str.replace("%", "").replace(",", ".").replace(" ", "")
-                    )
-                    try:
-                        return float(value_str)
-                    except:
-                        return 0
-
-                project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
-                    delta_pct_col
-                ].apply(extract_percentage)
+                # Extract percentage values from the column (vectorized)
+                project_filtered_df["Дельта_процент_numeric"] = parse_percentage_column(
+                    project_filtered_df[delta_pct_col]
+                )
             else:
                 # Try to calculate from Дельта and План if available
                 if (
                     "Дельта_numeric" in project_filtered_df.columns
                     and "План_numeric" in project_filtered_df.columns
                 ):
-                    project_filtered_df["Дельта_процент_numeric"] = 0
-                    mask = project_filtered_df["План_numeric"] != 0
-                    project_filtered_df.loc[mask, "Дельта_процент_numeric"] = (
-                        project_filtered_df.loc[mask, "Дельта_numeric"]
-                        / project_filtered_df.loc[mask, "План_numeric"]
-                    ) * 100
-                    project_filtered_df["Дельта_процент_numeric"] = project_filtered_df[
-                        "Дельта_процент_numeric"
-                    ].fillna(0)
+                    project_filtered_df["Дельта_процент_numeric"] = safe_percent(
+                        project_filtered_df["Дельта_numeric"].fillna(0),
+                        project_filtered_df["План_numeric"].fillna(0),
+                    )
                 else:
                     st.error(
                         "❌ Не удалось найти или рассчитать Дельта (%). Отсутствуют необходимые колонки."
@@ -6094,11 +6312,9 @@ def dashboard_workforce_movement(df):
                 not project_filtered_df.empty
                 and "Контрагент" in project_filtered_df.columns
             ):
-                contractor_delta_pct = (
-                    project_filtered_df.groupby("Контрагент")
-                    .agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
-                    .reset_index()
-                )
+                contractor_delta_pct = project_filtered_df.groupby(
+                    "Контрагент", as_index=False, sort=False, observed=True
+                ).agg({"Дельта_процент_numeric": "sum"})  # Sum of delta percentages
 
                 contractor_delta_pct.columns = ["Контрагент", "Дельта (%)"]
             else:
@@ -6109,41 +6325,38 @@ def dashboard_workforce_movement(df):
         contractor_delta_pct = pd.DataFrame(columns=["Контрагент", "Дельта (%)"])
 
     # Check if we have data
-    if contractor_delta_pct.empty or len(contractor_delta_pct) == 0:
+    if contractor_delta_pct.empty:
         st.info("Нет данных для отображения круговой диаграммы.")
     else:
-        # Ensure Дельта (%) is numeric
-        contractor_delta_pct["Дельта (%)"] = pd.to_numeric(
-            contractor_delta_pct["Дельта (%)"], errors="coerce"
-        ).fillna(0)
-
-        # Check if we have any non-zero values
-        total_abs_sum = contractor_delta_pct["Дельта (%)"].abs().sum()
+        # Ensure Дельта (%) is numeric; abs values, non-zero mask and total in one pass
+        delta_pct_values = (
+            pd.to_numeric(contractor_delta_pct["Дельта (%)"], errors="coerce")
+            .fillna(0)
+            .to_numpy(dtype=float)
+        )
+        delta_pct_abs = np.abs(delta_pct_values)
+        total_abs_sum = delta_pct_abs.sum()
 
         if total_abs_sum == 0:
             st.info(
                 "Все значения дельты (%) равны нулю. Диаграмма не может быть построена."
             )
         else:
-            # Remove only exactly zero values (not small values)
-            non_zero_data = contractor_delta_pct[
-                contractor_delta_pct["Дельта (%)"] != 0
-            ].copy()
-
-            # Use non-zero data if available
-            if not non_zero_data.empty:
-                contractor_delta_pct = non_zero_data
+            # Remove only exactly zero values (not small values); keep absolute
+            # values for pie chart (pie charts don't support negative values)
+            non_zero = delta_pct_values != 0
+            contractor_delta_pct = contractor_delta_pct.loc[non_zero].assign(
+                **{
+                    "Дельта (%)": delta_pct_values[non_zero],
+                    "Дельта (%)_abs": delta_pct_abs[non_zero],
+                }
+            )
 
-            # Sort by absolute value for better visualization
+            # Sort by the precomputed absolute value for better visualization
             contractor_delta_pct = contractor_delta_pct.sort_values(
-                "Дельта (%)", key=abs, ascending=False
+                "Дельта (%)_abs", ascending=False, kind="stable"
             )
-
-            # Create a copy with absolute values for pie chart (pie charts don't support negative values)
-            contractor_delta_pct_abs = contractor_delta_pct.copy()
-            contractor_delta_pct_abs["Дельта (%)_abs"] = contractor_delta_pct_abs[
-                "Дельта (%)"
-            ].abs()
+            contractor_delta_pct_abs = contractor_delta_pct
 
             # Store original values for display
             original_values = contractor_delta_pct_abs["Дельта (%)"].tolist()
@@ -6185,43 +6398,40 @@ def dashboard_workforce_movement(df):
     )
 
     # Group by Контрагент and aggregate for bar chart
-    contractor_data = (
-        project_filtered_df.groupby("Контрагент")
-        .agg(
-            {
-                "План_numeric": "sum",  # Sum of plans
-                "week_sum": "sum",  # Sum of weeks = среднее за месяц
-                "Дельта_numeric": "sum",  # Sum of deltas
-            }
-        )
-        .reset_index()
+    contractor_data = aggregate_contractor_metrics(
+        project_filtered_df[["Контрагент", "План_numeric", "week_sum", "Дельта_numeric"]]
     )
 
-    contractor_data.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
-
-    # Ensure Дельта column has numeric values
-    contractor_data["Дельта"] = pd.to_numeric(
-        contractor_data["Дельта"], errors="coerce"
-    ).fillna(0)
-
     # Sort by contractor name
     contractor_data = contractor_data.sort_values("Контрагент")
 
-    # Create bar chart
+    # Collapse the long tail into "Прочие" to keep the bar chart payload bounded;
+    # contractor_data itself stays complete for the pie chart, table and totals
+    chart_data = contractor_data
+    if len(contractor_data) > MAX_CONTRACTOR_BARS:
+        chart_data = bucket_top_n(
+            contractor_data, MAX_CONTRACTOR_BARS, value_col="План", other_label="Прочие"
+        )
+
+    # Create bar chart; traces get plain ndarrays instead of Series
+    contractor_names = chart_data["Контрагент"].to_numpy()
+    plan_values = chart_data["План"].to_numpy()
+    average_values = chart_data["Среднее за месяц"].to_numpy()
     fig_bar = go.Figure()
 
     # Add bars for Plan
     fig_bar.add_trace(
         go.Bar(
             name="План",
-            x=contractor_data["Контрагент"],
-            y=contractor_data["План"],
+            x=contractor_names,
+            y=plan_values,
             marker_color="#3498db",
-            text=contractor_data["План"].apply(
-                lambda x: f"{int(x)}" if pd.notna(x) else "0"
-            ),
+            text=format_int_column(chart_data["План"]).to_numpy(),
             textposition="outside",
             textfont=dict(size=12, color="white"),
+            hovertemplate="%{x}<br>План: %{y:.0f}<extra></extra>",
+            cliponaxis=False,
+            textangle=0,
         )
     )
 
@@ -6229,75 +6439,44 @@ def dashboard_workforce_movement(df):
     fig_bar.add_trace(
         go.Bar(
             name="Среднее за месяц",
-            x=contractor_data["Контрагент"],
-            y=contractor_data["Среднее за месяц"],
+            x=contractor_names,
+            y=average_values,
             marker_color="#2ecc71",
-            text=contractor_data["Среднее за месяц"].apply(
-                lambda x: f"{int(x)}" if pd.notna(x) else "0"
-            ),
+            text=format_int_column(chart_data["Среднее за месяц"]).to_numpy(),
             textposition="outside",
             textfont=dict(size=12, color="white"),
+            hovertemplate="%{x}<br>Среднее за месяц: %{y:.0f}<extra></extra>",
+            cliponaxis=False,
+            textangle=0,
         )
     )
 
     # Add bars for Delta - ensure values are properly formatted
-    # Разделяем на положительные и отрицательные значения для разных цветов
-    delta_values = contractor_data["Дельта"].fillna(0)
-    delta_abs = delta_values.abs()  # Абсолютные значения для отображения
-
-    # Положительные значения дельты (зеленый)
-    positive_mask = delta_values > 0
-    if positive_mask.any():
-        fig_bar.add_trace(
-            go.Bar(
-                name="Дельта (+)",
-                x=contractor_data.loc[positive_mask, "Контрагент"],
-                y=delta_abs[positive_mask],
-                marker_color="#2ecc71",  # Зеленый для положительных
-                text=delta_abs[positive_mask].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                ),
-                textposition="outside",
-                textfont=dict(size=12, color="white"),
-                showlegend=False,
-            )
-        )
-
-    # Отрицательные значения дельты (красный)
-    negative_mask = delta_values < 0
-    if negative_mask.any():
-        fig_bar.add_trace(
-            go.Bar(
-                name="Дельта (-)",
-                x=contractor_data.loc[negative_mask, "Контрагент"],
-                y=delta_abs[negative_mask],
-                marker_color="#e74c3c",  # Красный для отрицательных
-                text=delta_abs[negative_mask].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                ),
-                textposition="outside",
-                textfont=dict(size=12, color="white"),
-                showlegend=False,
-            )
-        )
-
-    # Нулевые значения (если есть)
-    zero_mask = delta_values == 0
-    if zero_mask.any():
-        fig_bar.add_trace(
-            go.Bar(
-                name="Дельта (0)",
-                x=contractor_data.loc[zero_mask, "Контрагент"],
-                y=delta_abs[zero_mask],
-                marker_color="#95a5a6",  # Серый для нулевых
-                text=delta_abs[zero_mask].apply(
-                    lambda x: f"{int(x)}" if pd.notna(x) and abs(x) >= 0.5 else "0"
-                ),
-                textposition="outside",
-                textfont=dict(size=12, color="white"),
-                showlegend=False,
-            )
+    # Одна серия с цветом по знаку дельты вместо трёх отдельных трасс
+    delta_values = chart_data["Дельта"].fillna(0).to_numpy()
+    delta_abs = np.abs(delta_values)  # Абсолютные значения для отображения
+    delta_colors = np.where(
+        delta_values > 0,
+        "#2ecc71",  # Зеленый для положительных
+        np.where(delta_values < 0, "#e74c3c", "#95a5a6"),  # Красный / серый
+    )
+    fig_bar.add_trace(
+        go.Bar(
+            name="Дельта",
+            x=contractor_names,
+            y=delta_abs,
+            marker_color=delta_colors.tolist(),
+            text=np.where(
+                delta_abs >= 0.5, delta_abs.astype(np.int64).astype(str), "0"
+            ),
+            textposition="outside",
+            textfont=dict(size=12, color="white"),
+            showlegend=False,
+            hovertemplate="%{x}<br>Дельта: %{y:.0f}<extra></extra>",
+            cliponaxis=False,
+            textangle=0,
         )
+    )
 
     # Update layout
     fig_bar.update_layout(
@@ -6308,51 +6487,39 @@ def dashboard_workforce_movement(df):
         height=600,
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
         xaxis=dict(tickangle=-75, tickfont=dict(size=8), automargin=True),
+        # Keep zoom/selection state across reruns and skip drag relayouts
+        uirevision="workforce_bar",
+        hovermode="closest",
+        dragmode=False,
     )
     fig_bar = apply_chart_background(fig_bar)
-    st.plotly_chart(fig_bar, use_container_width=True)
+    st.plotly_chart(
+        fig_bar,
+        use_container_width=True,
+        config={"staticPlot": False, "displayModeBar": False},
+    )
 
     # ========== Chart 3: Pie Chart by Contractor (Plan + Average) ==========
     st.subheader(
         "📊 Круговая диаграмма: Распределение суммы Плана и Среднего за месяц по контрагентам"
     )
 
-    # Group by Контрагент and aggregate for pie chart (Plan + Average)
-    contractor_plan_avg = (
-        project_filtered_df.groupby("Контрагент")
-        .agg(
-            {
-                "План_numeric": "sum",  # Sum of plans
-                "week_sum": "sum",  # Sum of weeks = среднее за месяц
-                "Дельта_numeric": "sum",  # Sum of deltas
-            }
-        )
-        .reset_index()
-    )
-
-    contractor_plan_avg.columns = ["Контрагент", "План", "Среднее за месяц", "Дельта"]
-
+    # Reuse the per-contractor aggregation from Chart 2 (Plan + Average)
     # Calculate sum of Plan + Average for each contractor
-    contractor_plan_avg["Сумма"] = (
-        contractor_plan_avg["План"] + contractor_plan_avg["Среднее за месяц"]
+    contractor_sum = contractor_data["План"] + contractor_data["Среднее за месяц"]
+
+    # Remove zero values for pie chart before computing the shares
+    contractor_plan_avg = contractor_data[contractor_sum != 0].assign(
+        Сумма=contractor_sum
     )
 
     # Calculate доля факта (Среднее за месяц / Сумма * 100) and доля отклонения (Дельта / План * 100)
-    contractor_plan_avg["Доля факта (%)"] = 0
-    contractor_plan_avg["Доля отклонения (%)"] = 0
-    mask_sum = contractor_plan_avg["Сумма"] != 0
-    contractor_plan_avg.loc[mask_sum, "Доля факта (%)"] = (
-        contractor_plan_avg.loc[mask_sum, "Среднее за месяц"]
-        / contractor_plan_avg.loc[mask_sum, "Сумма"]
-    ) * 100
-    mask_plan = contractor_plan_avg["План"] != 0
-    contractor_plan_avg.loc[mask_plan, "Доля отклонения (%)"] = (
-        contractor_plan_avg.loc[mask_plan, "Дельта"]
-        / contractor_plan_avg.loc[mask_plan, "План"]
-    ) * 100
-
-    # Remove zero values for pie chart
-    contractor_plan_avg = contractor_plan_avg[contractor_plan_avg["Сумма"] != 0].copy()
+    contractor_plan_avg["Доля факта (%)"] = safe_percent(
+        contractor_plan_avg["Среднее за месяц"], contractor_plan_avg["Сумма"]
+    )
+    contractor_plan_avg["Доля отклонения (%)"] = safe_percent(
+        contractor_plan_avg["Дельта"], contractor_plan_avg["План"]
+    )
 
     if contractor_plan_avg.empty:
         st.info("Нет данных для отображения.")
@@ -6380,13 +6547,17 @@ def dashboard_workforce_movement(df):
 
         # Prepare custom text with доля факта and доля отклонения
         total_sum = contractor_plan_avg["Сумма"].sum()
-        custom_texts = []
-        for idx, row in contractor_plan_avg.iterrows():
-            fact_pct = row["Доля факта (%)"]
-            delta_pct = row["Доля отклонения (%)"]
-            percent_val = (row["Сумма"] / total_sum * 100) if total_sum > 0 else 0
-            text = f"{row['Контрагент']}<br>Факт: {fact_pct:.0f}%<br>Отклонение: {delta_pct:.0f}%<br>({percent_val:.0f}%)"
-            custom_texts.append(text)
+        names = contractor_plan_avg["Контрагент"].to_numpy()
+        fact_pcts = contractor_plan_avg["Доля факта (%)"].to_numpy()
+        delta_pcts = contractor_plan_avg["Доля отклонения (%)"].to_numpy()
+        sums = contractor_plan_avg["Сумма"].to_numpy()
+        percent_vals = sums / total_sum * 100 if total_sum > 0 else np.zeros(len(sums))
+        custom_texts = [
+            f"{name}<br>Факт: {fact_pct:.0f}%<br>Отклонение: {delta_pct:.0f}%<br>({percent_val:.0f}%)"
+            for name, fact_pct, delta_pct, percent_val in zip(
+                names, fact_pcts, delta_pcts, percent_vals
+            )
+        ]
 
         fig_pie_plan_avg.update_traces(
             textposition="inside",
@@ -6413,19 +6584,15 @@ def dashboard_workforce_movement(df):
         # ========== Summary Table ==========
         st.subheader("📋 Сводная таблица по контрагентам")
 
-        # Format numbers for display
-        summary_table = contractor_data.copy()
-        summary_table["План"] = summary_table["План"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
-        )
-        summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
-        )
-        summary_table["Дельта"] = summary_table["Дельта"].apply(
-            lambda x: f"{int(x)}" if pd.notna(x) else "0"
+        # Format numbers for display (whole columns, inside the HTML helper)
+        html_table = format_dataframe_as_html(
+            contractor_data,
+            formatters={
+                "План": format_int_column,
+                "Среднее за месяц": format_int_column,
+                "Дельта": format_int_column,
+            },
         )
-
-        html_table = format_dataframe_as_html(summary_table)
         st.markdown(html_table, unsafe_allow_html=True)
 
         # Summary metrics
@@ -6465,49 +6632,36 @@ def dashboard_skud_stroyka(df):
             )
         return
 
-    # Create working copy
-    work_df = resources_df.copy()
-
-    # Debug: Show data info (can be removed later)
-    with st.expander("🔍 Отладочная информация", expanded=False):
-        st.write(f"**Количество строк в исходных данных:** {len(work_df)}")
-        st.write(f"**Колонки:** {', '.join(work_df.columns.tolist())}")
-        if len(work_df) > 0:
-            st.write("**Первые строки данных:**")
-            # Rename columns to Russian and remove period_original
-            work_df_display = work_df.drop(columns=["period_original"], errors="ignore").head().copy()
-            work_df_display = work_df_display.rename(columns={
-                "project name": "Проект",
-                "section": "Этап",
-                "block": "Блок",
-                "period_month": "Период",
-                "period_display": "Период"
-            })
-            html_table = format_dataframe_as_html(work_df_display)
-            st.markdown(html_table, unsafe_allow_html=True)
-            if "Среднее_numeric" in work_df.columns:
-                st.write(f"**Среднее_numeric статистика:**")
-                st.write(
-                    f"- Не пустых значений: {work_df['Среднее_numeric'].notna().sum()}"
-                )
-                st.write(f"- Среднее значение: {work_df['Среднее_numeric'].mean():.2f}")
-                st.write(f"- Минимум: {work_df['Среднее_numeric'].min():.2f}")
-                st.write(f"- Максимум: {work_df['Среднее_numeric'].max():.2f}")
-
-    # Helper function to find columns by partial match
-    def find_column_by_partial(df, possible_names):
-        """Find column by possible names (exact or partial match)"""
-        for col in df.columns:
-            col_lower = str(col).lower().strip()
-            for name in possible_names:
-                name_lower = str(name).lower().strip()
-                if (
-                    name_lower == col_lower
-                    or name_lower in col_lower
-                    or col_lower in name_lower
-                ):
-                    return col
-        return None
+    # Shallow working copy: only new or replaced columns are written below,
+    # so the session-state frame is never modified
+    work_df = resources_df.copy(deep=False)
+
+    # Debug: Show data info, only built in debug mode (admin sidebar toggle)
+    if st.session_state.get("debug_mode", False):
+        with st.expander("🔍 Отладочная информация", expanded=False):
+            st.write(f"**Количество строк в исходных данных:** {len(work_df)}")
+            st.write(f"**Колонки:** {', '.join(work_df.columns.tolist())}")
+            if len(work_df) > 0:
+                st.write("**Первые строки данных:**")
+                # Rename columns to Russian and remove period_original
+                work_df_display = work_df.drop(columns=["period_original"], errors="ignore").head().copy()
+                work_df_display = work_df_display.rename(columns={
+                    "project name": "Проект",
+                    "section": "Этап",
+                    "block": "Блок",
+                    "period_month": "Период",
+                    "period_display": "Период"
+                })
+                html_table = format_dataframe_as_html(work_df_display)
+                st.markdown(html_table, unsafe_allow_html=True)
+                if "Среднее_numeric" in work_df.columns:
+                    st.write(f"**Среднее_numeric статистика:**")
+                    st.write(
+                        f"- Не пустых значений: {work_df['Среднее_numeric'].notna().sum()}"
+                    )
+                    st.write(f"- Среднее значение: {work_df['Среднее_numeric'].mean():.2f}")
+                    st.write(f"- Минимум: {work_df['Среднее_numeric'].min():.2f}")
+                    st.write(f"- Максимум: {work_df['Среднее_numeric'].max():.2f}")
 
     # Find required columns
     project_col = find_column_by_partial(
@@ -6547,6 +6701,11 @@ def dashboard_skud_stroyka(df):
         )
         st.info(f"Доступные колонки: {', '.join(work_df.columns)}")
 
+    # Strip whitespace once and switch project/contractor keys to categorical codes
+    for key_col in (project_col, contractor_col):
+        if key_col and key_col in work_df.columns:
+            work_df[key_col] = to_stripped_category(work_df[key_col])
+
     # Process average column to numeric
     work_df["Среднее_numeric"] = pd.to_numeric(
         work_df[avg_col].astype(str).str.replace(",", ".").str.replace(" ", ""),
@@ -6573,49 +6732,33 @@ def dashboard_skud_stroyka(df):
         # If parsing failed, try to extract month/year from string
         mask = work_df["period_parsed"].isna()
         if mask.any():
-            # Try to extract month and year from period string
-            def extract_period(val):
-                if pd.isna(val):
-                    return None
-                val_str = str(val)
-                # Try patterns like "2025-01", "01.2025", "январь 2025", etc.
-                try:
-                    # Try YYYY-MM format
-                    if "-" in val_str:
-                        parts = val_str.split("-")
-                        if len(parts) >= 2:
-                            year = int(parts[0])
-                            month = int(parts[1])
-                            return pd.Period(f"{year}-{month:02d}", freq="M")
-                    # Try DD.MM.YYYY or MM.YYYY
-                    if "." in val_str:
-                        parts = val_str.split(".")
-                        if len(parts) >= 2:
-                            if len(parts) == 3:  # DD.MM.YYYY
-                                year = int(parts[2])
-                                month = int(parts[1])
-                            else:  # MM.YYYY
-                                year = int(parts[1])
-                                month = int(parts[0])
-                            return pd.Period(f"{year}-{month:02d}", freq="M")
-                except:
-                    pass
-                return None
+            # Try patterns like "2025-01", "01.01.2025", "01.2025" - one vectorized
+            # parse per format instead of splitting every row in Python
+            remaining = work_df.loc[mask, period_col].astype(str).str.strip()
+            parsed = pd.to_datetime(remaining, format="%Y-%m", errors="coerce")
+            for period_format in ("%d.%m.%Y", "%m.%Y"):
+                parsed = parsed.combine_first(
+                    pd.to_datetime(remaining, format=period_format, errors="coerce")
+                )
+            work_df.loc[mask, "period_parsed"] = parsed
 
-            work_df.loc[mask, "period_parsed"] = work_df.loc[mask, period_col].apply(
-                extract_period
-            )
+        # Convert to Period in one shot
+        work_df["period_month"] = work_df["period_parsed"].dt.to_period("M")
+    else:
+        # Keep the column PeriodDtype even without a period source column
+        work_df["period_month"] = pd.Series(
+            pd.NaT, index=work_df.index, dtype="period[M]"
+        )
 
-        # Convert to Period if possible
-        work_df["period_month"] = work_df["period_parsed"].apply(
-            lambda x: (
-                x.to_period("M")
-                if pd.notna(x) and isinstance(x, pd.Timestamp)
-                else (x if isinstance(x, pd.Period) else None)
-            )
+    # Period options are shared by the "from" and "to" filters - compute them once
+    has_periods = (
+        "period_month" in work_df.columns and work_df["period_month"].notna().any()
+    )
+    if has_periods:
+        available_months = (
+            work_df["period_month"].dropna().drop_duplicates().sort_values().tolist()
         )
-    else:
-        work_df["period_month"] = None
+        month_options = ["Все"] + [str(m) for m in available_months]
 
     # Filters
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -6634,11 +6777,7 @@ def dashboard_skud_stroyka(df):
 
     with col2:
         # Period from filter
-        if "period_month" in work_df.columns and work_df["period_month"].notna().any():
-            available_months = sorted(
-                work_df[work_df["period_month"].notna()]["period_month"].unique()
-            )
-            month_options = ["Все"] + [str(m) for m in available_months]
+        if has_periods:
             selected_period_from = st.selectbox(
                 "Период от", month_options, key="skud_period_from"
             )
@@ -6648,11 +6787,7 @@ def dashboard_skud_stroyka(df):
 
     with col3:
         # Period to filter
-        if "period_month" in work_df.columns and work_df["period_month"].notna().any():
-            available_months = sorted(
-                work_df[work_df["period_month"].notna()]["period_month"].unique()
-            )
-            month_options = ["Все"] + [str(m) for m in available_months]
+        if has_periods:
             selected_period_to = st.selectbox(
                 "Период до", month_options, key="skud_period_to"
             )
@@ -6663,7 +6798,8 @@ def dashboard_skud_stroyka(df):
     with col4:
         # Project filter
         if project_col and project_col in work_df.columns:
-            projects = ["Все"] + sorted(work_df[project_col].dropna().unique().tolist())
+            # Key columns are categorical: categories are already unique and sorted
+            projects = ["Все"] + work_df[project_col].cat.categories.tolist()
             selected_project = st.selectbox(
                 "Фильтр по проекту", projects, key="skud_project"
             )
@@ -6674,9 +6810,7 @@ def dashboard_skud_stroyka(df):
     with col5:
         # Contractor filter
         if contractor_col and contractor_col in work_df.columns:
-            contractors = ["Все"] + sorted(
-                work_df[contractor_col].dropna().unique().tolist()
-            )
+            contractors = ["Все"] + work_df[contractor_col].cat.categories.tolist()
             selected_contractor = st.selectbox(
                 "Фильтр по контрагенту", contractors, key="skud_contractor"
             )
@@ -6684,14 +6818,13 @@ def dashboard_skud_stroyka(df):
             selected_contractor = "Все"
             st.info("Контрагенты не найдены")
 
-    # Apply filters
-    filtered_df = work_df.copy()
+    # Apply filters (boolean masking returns new frames, no upfront copy needed)
+    filtered_df = work_df
 
     if selected_project != "Все" and project_col and project_col in filtered_df.columns:
-        # More robust filtering - handle NaN values and case-insensitive comparison
-        project_mask = (
-            filtered_df[project_col].astype(str).str.strip().str.lower()
-            == str(selected_project).strip().lower()
+        # Case-insensitive comparison on category labels, rows matched by codes
+        project_mask = category_equals_ignore_case(
+            filtered_df[project_col], selected_project
         )
         filtered_df = filtered_df[project_mask]
 
@@ -6700,10 +6833,9 @@ def dashboard_skud_stroyka(df):
         and contractor_col
         and contractor_col in filtered_df.columns
     ):
-        # More robust filtering - handle NaN values and case-insensitive comparison
-        contractor_mask = (
-            filtered_df[contractor_col].astype(str).str.strip().str.lower()
-            == str(selected_contractor).strip().lower()
+        # Case-insensitive comparison on category labels, rows matched by codes
+        contractor_mask = category_equals_ignore_case(
+            filtered_df[contractor_col], selected_contractor
         )
         filtered_df = filtered_df[contractor_mask]
 
@@ -6712,20 +6844,27 @@ def dashboard_skud_stroyka(df):
         "period_month" in filtered_df.columns
         and filtered_df["period_month"].notna().any()
     ):
+        # period_month is PeriodDtype, so both bounds are int64 ordinal compares;
+        # they are combined into one mask and the frame is sliced once
+        period_values = filtered_df["period_month"]
+        period_mask = np.ones(len(filtered_df), dtype=bool)
         if selected_period_from != "Все":
             try:
                 period_from = pd.Period(selected_period_from, freq="M")
-                filtered_df = filtered_df[filtered_df["period_month"] >= period_from]
+                period_mask &= (period_values >= period_from).to_numpy()
             except Exception as e:
                 st.warning(f"Ошибка при фильтрации по периоду от: {e}")
 
         if selected_period_to != "Все":
             try:
                 period_to = pd.Period(selected_period_to, freq="M")
-                filtered_df = filtered_df[filtered_df["period_month"] <= period_to]
+                period_mask &= (period_values <= period_to).to_numpy()
             except Exception as e:
                 st.warning(f"Ошибка при фильтрации по периоду до: {e}")
 
+        if not period_mask.all():
+            filtered_df = filtered_df[period_mask]
+
     if filtered_df.empty:
         st.warning("⚠️ Нет данных для отображения с выбранными фильтрами.")
         with st.expander("🔍 Информация о фильтрах", expanded=False):
@@ -6778,18 +6917,19 @@ def dashboard_skud_stroyka(df):
 
     if group_cols:
         # Filter out rows where any grouping column is NaN before grouping
-        mask = pd.Series([True] * len(filtered_df))
-        for col in group_cols:
-            if col in filtered_df.columns:
-                mask = mask & filtered_df[col].notna()
+        present_group_cols = [col for col in group_cols if col in filtered_df.columns]
+        mask = filtered_df[present_group_cols].notna().all(axis=1).to_numpy()
 
         if mask.any():
-            grouped_data = (
-                filtered_df[mask]
-                .groupby(group_cols)["Среднее_numeric"]
-                .mean()
-                .reset_index()
-            )
+            # Reduce only the key columns plus a float32 value column so the
+            # groupby doesn't drag the unrelated object blocks along
+            slim = filtered_df.loc[mask, group_cols + ["Среднее_numeric"]].astype(
+                {"Среднее_numeric": "float32"}
+            )
+            # Keep the default sort here: the x axis follows period order
+            grouped_data = slim.groupby(group_cols, as_index=False, observed=True)[
+                "Среднее_numeric"
+            ].mean()
             grouped_data.columns = list(group_cols) + ["Среднее за месяц"]
         else:
             # All grouping columns are NaN, aggregate without grouping
@@ -6802,11 +6942,12 @@ def dashboard_skud_stroyka(df):
             "period_month" in filtered_df.columns
             and filtered_df["period_month"].notna().any()
         ):
-            grouped_data = (
-                filtered_df.groupby("period_month")["Среднее_numeric"]
-                .mean()
-                .reset_index()
+            slim = filtered_df[["period_month", "Среднее_numeric"]].astype(
+                {"Среднее_numeric": "float32"}
             )
+            grouped_data = slim.groupby("period_month", as_index=False)[
+                "Среднее_numeric"
+            ].mean()
             grouped_data.columns = ["period_month", "Среднее за месяц"]
         else:
             # No period available, just aggregate all data
@@ -6815,24 +6956,10 @@ def dashboard_skud_stroyka(df):
                 mean_value = 0
             grouped_data = pd.DataFrame({"Среднее за месяц": [mean_value]})
 
-    # Format period for display
-    def format_period_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        if isinstance(period_val, pd.Period):
-            try:
-                month_name = get_russian_month_name(period_val)
-                year = period_val.year
-                if month_name:
-                    return f"{month_name} {year}"
-                return str(period_val)
-            except:
-                return str(period_val)
-        return str(period_val)
-
+    # Format period for display (period_month is always period[M] here)
     if "period_month" in grouped_data.columns:
-        grouped_data["period_display"] = grouped_data["period_month"].apply(
-            format_period_display
+        grouped_data["period_display"] = format_period_labels(
+            grouped_data["period_month"]
         )
 
     # Check if we have data to display
@@ -6848,7 +6975,8 @@ def dashboard_skud_stroyka(df):
             st.write(f"**Выбранный контрагент:** {selected_contractor}")
             st.write(f"**Период от:** {selected_period_from}")
             st.write(f"**Период до:** {selected_period_to}")
-            if len(filtered_df) > 0:
+            # The data preview and its reductions are only built in debug mode
+            if len(filtered_df) > 0 and st.session_state.get("debug_mode", False):
                 st.write("**Данные после фильтрации (первые 10 строк):**")
                 # Rename columns to Russian and remove period_original
                 filtered_df_display = filtered_df.drop(columns=["period_original"], errors="ignore").head(10).copy()
@@ -6870,7 +6998,7 @@ def dashboard_skud_stroyka(df):
                         f"- Среднее значение: {filtered_df['Среднее_numeric'].mean():.2f}"
                     )
                     st.write(f"- Сумма: {filtered_df['Среднее_numeric'].sum():.2f}")
-            else:
+            elif len(filtered_df) == 0:
                 st.write(
                     "**Проблема:** После применения фильтров не осталось ни одной строки."
                 )
@@ -6886,17 +7014,20 @@ def dashboard_skud_stroyka(df):
             st.warning("⚠️ Все значения среднего равны NaN после группировки.")
             with st.expander("🔍 Детали проблемы", expanded=True):
                 st.write(f"**Строк после группировки:** {len(grouped_data)}")
-                # Rename columns to Russian and remove period_original
-                grouped_data_display = grouped_data.drop(columns=["period_original"], errors="ignore").copy()
-                grouped_data_display = grouped_data_display.rename(columns={
-                    "project name": "Проект",
-                    "section": "Этап",
-                    "block": "Блок",
-                    "period_month": "Период",
-                    "period_display": "Период"
-                })
-                html_table = format_dataframe_as_html(grouped_data_display)
-                st.markdown(html_table, unsafe_allow_html=True)
+                # The grouped data table is only rendered in debug mode
+                if st.session_state.get("debug_mode", False):
+                    # Rename columns to Russian and remove period_original
+                    grouped_data_display = grouped_data.drop(
+                        columns=["period_original"], errors="ignore"
+                    ).rename(columns={
+                        "project name": "Проект",
+                        "section": "Этап",
+                        "block": "Блок",
+                        "period_month": "Период",
+                        "period_display": "Период"
+                    })
+                    html_table = format_dataframe_as_html(grouped_data_display)
+                    st.markdown(html_table, unsafe_allow_html=True)
             return
 
     # Create visualization
@@ -6904,133 +7035,57 @@ def dashboard_skud_stroyka(df):
         "period_month" in grouped_data.columns
         or "period_display" in grouped_data.columns
     )
-
+    x_col = (
+        "period_display" if "period_display" in grouped_data.columns else "period_month"
+    )
+    grouping_cols = [col for col in group_cols if col != "period_month"]
+
+    # The chart variants only differ in their plotly express arguments, so each
+    # case just fills chart_kwargs and the figure is built at one call site
+    chart_kwargs = {
+        "y": "Среднее за месяц",
+        "labels": {"Среднее за месяц": "Среднее за месяц (чел.)"},
+        "text": "Среднее за месяц",
+    }
+    use_bar = True
     if selected_grouping == "Без группировки":
         if has_period:
             # Simple line chart with time series
-            x_col = (
-                "period_display"
-                if "period_display" in grouped_data.columns
-                else "period_month"
-            )
-            fig = px.line(
-                grouped_data,
-                x=x_col,
-                y="Среднее за месяц",
-                title="Среднее за месяц по людям в динамике",
-                labels={x_col: "Месяц", "Среднее за месяц": "Среднее за месяц (чел.)"},
-                markers=True,
-            )
-            fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
-            fig = apply_chart_background(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            use_bar = False
+            del chart_kwargs["text"]
+            chart_kwargs.update(x=x_col, markers=True)
+    elif has_period and grouping_cols:
+        # Grouped bar chart with time series; a second grouping column
+        # (projects and contractors) goes to facets
+        chart_kwargs.update(x=x_col, color=grouping_cols[0])
+        if len(grouping_cols) > 1:
+            chart_kwargs["facet_col"] = grouping_cols[1]
+    elif len(grouping_cols) == 1 and not has_period:
+        # Grouped bar chart without time series (single month selected)
+        chart_kwargs["x"] = grouping_cols[0]
+    else:
+        chart_kwargs = None
+
+    if chart_kwargs is None:
+        st.info("Не удалось построить график с выбранной группировкой.")
+    else:
+        if chart_kwargs.get("x") == x_col and has_period:
+            chart_kwargs["title"] = "Среднее за месяц по людям в динамике"
+            chart_kwargs["labels"][x_col] = "Месяц"
         else:
-            # Single value bar chart
-            fig = px.bar(
-                grouped_data,
-                y="Среднее за месяц",
-                title="Среднее за месяц по людям",
-                labels={"Среднее за месяц": "Среднее за месяц (чел.)"},
-                text="Среднее за месяц",
-            )
+            chart_kwargs["title"] = "Среднее за месяц по людям"
+
+        fig = (px.bar if use_bar else px.line)(grouped_data, **chart_kwargs)
+        if "color" in chart_kwargs:
+            fig.update_layout(barmode="group")
+        if "x" in chart_kwargs:
+            fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
+        if use_bar:
             fig.update_traces(
                 textposition="outside", textfont=dict(size=12, color="white")
             )
-            fig = apply_chart_background(fig)
-            st.plotly_chart(fig, use_container_width=True)
-    else:
-        # Grouped visualization
-        grouping_cols = [col for col in group_cols if col != "period_month"]
-
-        if has_period and len(grouping_cols) > 0:
-            # Grouped bar chart with time series
-            x_col = (
-                "period_display"
-                if "period_display" in grouped_data.columns
-                else "period_month"
-            )
-            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
-
-            if color_col:
-                fig = px.bar(
-                    grouped_data,
-                    x=x_col,
-                    y="Среднее за месяц",
-                    color=color_col,
-                    title="Среднее за месяц по людям в динамике",
-                    labels={
-                        x_col: "Месяц",
-                        "Среднее за месяц": "Среднее за месяц (чел.)",
-                    },
-                    text="Среднее за месяц",
-                )
-                fig.update_layout(barmode="group")
-                fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
-                fig.update_traces(
-                    textposition="outside", textfont=dict(size=12, color="white")
-                )
-                fig = apply_chart_background(fig)
-                st.plotly_chart(fig, use_container_width=True)
-            elif len(grouping_cols) > 1:
-                # Multiple grouping columns - use first for color, show others in hover
-                fig = px.bar(
-                    grouped_data,
-                    x=x_col,
-                    y="Среднее за месяц",
-                    color=grouping_cols[0],
-                    title="Среднее за месяц по людям в динамике",
-                    labels={
-                        x_col: "Месяц",
-                        "Среднее за месяц": "Среднее за месяц (чел.)",
-                    },
-                    text="Среднее за месяц",
-                    facet_col=grouping_cols[1] if len(grouping_cols) > 1 else None,
-                )
-                fig.update_layout(barmode="group")
-                fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
-                fig.update_traces(
-                    textposition="outside", textfont=dict(size=12, color="white")
-                )
-                fig = apply_chart_background(fig)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                # Fallback to line chart
-                fig = px.line(
-                    grouped_data,
-                    x=x_col,
-                    y="Среднее за месяц",
-                    title="Среднее за месяц по людям в динамике",
-                    labels={
-                        x_col: "Месяц",
-                        "Среднее за месяц": "Среднее за месяц (чел.)",
-                    },
-                    markers=True,
-                )
-                fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
-                fig = apply_chart_background(fig)
-            st.plotly_chart(fig, use_container_width=True)
-        elif len(grouping_cols) > 0:
-            # Grouped bar chart without time series (single month selected)
-            color_col = grouping_cols[0] if len(grouping_cols) == 1 else None
-            if color_col:
-                fig = px.bar(
-                    grouped_data,
-                    x=color_col,
-                    y="Среднее за месяц",
-                    title="Среднее за месяц по людям",
-                    labels={"Среднее за месяц": "Среднее за месяц (чел.)"},
-                    text="Среднее за месяц",
-                )
-                fig.update_traces(
-                    textposition="outside", textfont=dict(size=12, color="white")
-                )
-                fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
-                fig = apply_chart_background(fig)
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("Не удалось построить график с выбранной группировкой.")
-        else:
-            st.info("Не удалось построить график с выбранной группировкой.")
+        fig = apply_chart_background(fig)
+        st.plotly_chart(fig, use_container_width=True)
 
     # Summary table
     if not grouped_data.empty:
@@ -7059,98 +7114,85 @@ def dashboard_skud_stroyka(df):
         # Filter to only existing columns
         display_cols = [col for col in display_cols if col in grouped_data.columns]
 
-        summary_table = grouped_data[display_cols].copy()
-        summary_table["Среднее за месяц"] = summary_table["Среднее за месяц"].apply(
-            lambda x: f"{x:.2f}" if pd.notna(x) else "0"
-        )
         # Rename columns to Russian
-        summary_table = summary_table.rename(columns={
+        summary_table = grouped_data[display_cols].rename(columns={
             "period_display": "Период",
             "period_month": "Период",
             "project name": "Проект",
             "section": "Этап",
             "block": "Блок"
         })
-        html_table = format_dataframe_as_html(summary_table)
+        html_table = format_dataframe_as_html(
+            summary_table,
+            formatters={
+                "Среднее за месяц": lambda col: format_float_column(col, na_rep="0")
+            },
+        )
         st.markdown(html_table, unsafe_allow_html=True)
 
 
 # ==================== DASHBOARD 8.7: Documentation ====================
-def dashboard_documentation(df):
-    st.header("📚 Выдача рабочей/проектной документации")
+@st.cache_data(show_spinner=False)
+def prepare_documentation_data(df, doc_cols):
+    """
+    Добавляет числовые колонки статусов РД и разобранные даты "Старт План".
 
-    # Find column names (they might have different formats)
-    # Try to find columns by partial name matching
-    def find_column(df, possible_names):
-        """Find column by possible names"""
-        for col in df.columns:
-            # Normalize column name: remove newlines, extra spaces, normalize case
-            col_normalized = str(col).replace("\n", " ").replace("\r", " ").strip()
-            col_lower = col_normalized.lower()
-
-            for name in possible_names:
-                name_lower = name.lower().strip()
-                # Exact match (case insensitive)
-                if name_lower == col_lower:
-                    return col
-                # Substring match
-                if name_lower in col_lower or col_lower in name_lower:
-                    return col
-                # Check if all key words from name are in column
-                name_words = [w for w in name_lower.split() if len(w) > 2]
-                if name_words and all(word in col_lower for word in name_words):
-                    return col
-
-        # Special handling for RD count column with key words
-        if any(
-            "разделов" in n.lower() and "рд" in n.lower() and "договор" in n.lower()
-            for n in possible_names
-        ):
-            for col in df.columns:
-                col_lower = str(col).lower().replace("\n", " ").replace("\r", " ")
-                key_words = ["разделов", "рд", "договор", "количество"]
-                if all(word in col_lower for word in key_words if len(word) > 3):
-                    return col
+    Результат кэшируется между rerun: разбор дат с format="mixed" и
+    преобразование строк в числа выполняются один раз на загруженный файл,
+    а изменение фильтров только накладывает маски на готовый DataFrame.
 
-        return None
+    Args:
+        df: Исходный DataFrame документации
+        doc_cols: Словарь колонок из resolve_documentation_columns
 
-    # Find required columns - expanded search for RD count column
-    rd_count_col = find_column(
-        df,
-        [
-            "Количество разделов РД по Договору",
-            "Количество разделов РД",
-            "разделов РД",
-            "Количетсов разделов РД по Договору",  # Handle typo
-            "Количество разделов РД по договору",
-            "Количество разделов РД по Договору",
-        ],
+    Returns:
+        DataFrame с колонками *_numeric, plan_start_dt (если найдена колонка)
+        и колонкой проекта в виде category
+    """
+    numeric_status_cols = {
+        "on_approval_numeric": doc_cols["on_approval"],
+        "in_production_numeric": doc_cols["in_production"],
+        "contractor_numeric": doc_cols["contractor"],
+        "rework_numeric": doc_cols["rework"],
+        "rd_plan_numeric": doc_cols["rd_plan"],
+    }
+    prepared = df.assign(
+        **{
+            numeric_col: to_numeric_comma(df[source_col])
+            for numeric_col, source_col in numeric_status_cols.items()
+            if source_col and source_col in df.columns
+        }
     )
+    project_col = doc_cols["project"]
+    if project_col and project_col in df.columns:
+        # Low-cardinality project names filter by integer codes as a categorical
+        prepared[project_col] = to_stripped_category(df[project_col])
+    plan_start_col = doc_cols["plan_start"]
+    if plan_start_col and plan_start_col in df.columns:
+        prepared["plan_start_dt"] = pd.to_datetime(
+            df[plan_start_col].astype(str),
+            errors="coerce",
+            dayfirst=True,
+            format="mixed",
+        )
+    return prepared
 
-    on_approval_col = find_column(df, ["На согласовании", "согласовании"])
-    in_production_col = find_column(
-        df, ["Выдано в производство работ", "производство работ", "в производство"]
-    )
-    plan_start_col = (
-        "plan start"
-        if "plan start" in df.columns
-        else find_column(df, ["Старт План", "План Старт"])
-    )
-    plan_end_col = (
-        "plan end"
-        if "plan end" in df.columns
-        else find_column(df, ["Конец План", "План Конец"])
-    )
-    base_start_col = (
-        "base start"
-        if "base start" in df.columns
-        else find_column(df, ["Старт Факт", "Факт Старт"])
-    )
-    base_end_col = (
-        "base end"
-        if "base end" in df.columns
-        else find_column(df, ["Конец Факт", "Факт Конец"])
-    )
+
+@st.fragment
+def dashboard_documentation(df):
+    # Rendered as a fragment: changing the project/date/status filters reruns
+    # only this dashboard, not the whole app (sidebar, file loading, routing)
+    st.header("📚 Выдача рабочей/проектной документации")
+
+    # Find required columns in one cached pass over the schema
+    doc_cols = resolve_documentation_columns(tuple(df.columns))
+    rd_count_col = doc_cols["rd_count"]
+    on_approval_col = doc_cols["on_approval"]
+    in_production_col = doc_cols["in_production"]
+    plan_start_col = doc_cols["plan_start"]
+    plan_end_col = doc_cols["plan_end"]
+    base_start_col = doc_cols["base_start"]
+    base_end_col = doc_cols["base_end"]
 
     # Check if required columns exist
     missing_cols = []
@@ -7167,11 +7209,11 @@ def dashboard_documentation(df):
         return
 
     # Find project column for filtering
-    project_col = (
-        "project name"
-        if "project name" in df.columns
-        else find_column(df, ["Проект", "project"])
-    )
+    project_col = doc_cols["project"]
+
+    # Numeric status columns and parsed plan start dates are prepared once per
+    # file and reused by the filters, the pie chart and the dynamics chart
+    prepared_df = prepare_documentation_data(df, doc_cols)
 
     # Add filters
     st.subheader("Фильтры")
@@ -7181,7 +7223,7 @@ def dashboard_documentation(df):
     selected_project = "Все"
     if project_col and project_col in df.columns:
         with filter_col1:
-            projects = ["Все"] + sorted(df[project_col].dropna().unique().tolist())
+            projects = ["Все"] + prepared_df[project_col].cat.categories.tolist()
             selected_project = st.selectbox(
                 "Фильтр по проекту", projects, key="doc_project_filter"
             )
@@ -7191,12 +7233,7 @@ def dashboard_documentation(df):
     selected_date_end = None
     if plan_start_col and plan_start_col in df.columns:
         with filter_col2:
-            # Convert dates for filtering
-            plan_start_str = df[plan_start_col].astype(str)
-            df_dates = pd.to_datetime(
-                plan_start_str, errors="coerce", dayfirst=True, format="mixed"
-            )
-            valid_dates = df_dates[df_dates.notna()]
+            valid_dates = prepared_df["plan_start_dt"].dropna()
 
             if not valid_dates.empty:
                 min_date = valid_dates.min().date()
@@ -7225,8 +7262,8 @@ def dashboard_documentation(df):
             rd_status_options.append("Выдано в производство работ")
 
         # Find other status columns
-        contractor_col = find_column(df, ["Выдана подрядчику", "подрядчику"])
-        rework_col = find_column(df, ["На доработке", "доработке"])
+        contractor_col = doc_cols["contractor"]
+        rework_col = doc_cols["rework"]
 
         if contractor_col and contractor_col in df.columns:
             rd_status_options.append("Выдана подрядчику")
@@ -7240,15 +7277,15 @@ def dashboard_documentation(df):
             key="doc_status_filter",
         )
 
-    # Apply filters to data
-    filtered_df = df.copy()
+    # Apply filters to data: all filters are combined into one boolean array
+    # and the frame is indexed once
+    keep_mask = np.ones(len(prepared_df), dtype=bool)
 
     # Apply project filter
     if selected_project != "Все" and project_col and project_col in df.columns:
-        filtered_df = filtered_df[
-            filtered_df[project_col].astype(str).str.strip()
-            == str(selected_project).strip()
-        ]
+        keep_mask &= (
+            prepared_df[project_col] == str(selected_project).strip()
+        ).to_numpy()
 
     # Apply date filter
     if (
@@ -7257,78 +7294,33 @@ def dashboard_documentation(df):
         and plan_start_col
         and plan_start_col in df.columns
     ):
-        plan_start_str = filtered_df[plan_start_col].astype(str)
-        filtered_df[plan_start_col + "_parsed"] = pd.to_datetime(
-            plan_start_str, errors="coerce", dayfirst=True, format="mixed"
-        )
-        date_mask = (
-            filtered_df[plan_start_col + "_parsed"].notna()
-            & (filtered_df[plan_start_col + "_parsed"].dt.date >= selected_date_start)
-            & (filtered_df[plan_start_col + "_parsed"].dt.date <= selected_date_end)
-        )
-        filtered_df = filtered_df[date_mask].copy()
+        # Compare datetimes directly instead of materializing .dt.date objects
+        plan_start_dt = prepared_df["plan_start_dt"]
+        keep_mask &= (
+            (plan_start_dt >= pd.Timestamp(selected_date_start))
+            & (plan_start_dt < pd.Timestamp(selected_date_end) + pd.Timedelta(days=1))
+        ).to_numpy()
 
     # Apply status filter
     if "Все" not in selected_statuses and selected_statuses:
-        status_mask = pd.Series([False] * len(filtered_df), index=filtered_df.index)
-
-        if (
-            "На согласовании" in selected_statuses
-            and on_approval_col
-            and on_approval_col in filtered_df.columns
-        ):
-            on_approval_series = (
-                filtered_df[on_approval_col]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-            )
-            on_approval_numeric = pd.to_numeric(
-                on_approval_series, errors="coerce"
-            ).fillna(0)
-            status_mask = status_mask | (on_approval_numeric > 0)
-
-        if (
-            "Выдано в производство работ" in selected_statuses
-            and in_production_col
-            and in_production_col in filtered_df.columns
-        ):
-            in_production_series = (
-                filtered_df[in_production_col]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-            )
-            in_production_numeric = pd.to_numeric(
-                in_production_series, errors="coerce"
-            ).fillna(0)
-            status_mask = status_mask | (in_production_numeric > 0)
-
-        if (
-            "Выдана подрядчику" in selected_statuses
-            and contractor_col
-            and contractor_col in filtered_df.columns
-        ):
-            contractor_series = (
-                filtered_df[contractor_col]
-                .astype(str)
-                .str.replace(",", ".", regex=False)
-            )
-            contractor_numeric = pd.to_numeric(
-                contractor_series, errors="coerce"
-            ).fillna(0)
-            status_mask = status_mask | (contractor_numeric > 0)
+        # One (rows x selected statuses) bool matrix reduced with any(axis=1)
+        # instead of a separate masked OR per status
+        status_numeric_cols = {
+            "На согласовании": "on_approval_numeric",
+            "Выдано в производство работ": "in_production_numeric",
+            "Выдана подрядчику": "contractor_numeric",
+            "На доработке": "rework_numeric",
+        }
+        selected_status_cols = [
+            numeric_col
+            for status, numeric_col in status_numeric_cols.items()
+            if status in selected_statuses and numeric_col in prepared_df.columns
+        ]
+        status_mask = (prepared_df[selected_status_cols].to_numpy() > 0).any(axis=1)
 
-        if (
-            "На доработке" in selected_statuses
-            and rework_col
-            and rework_col in filtered_df.columns
-        ):
-            rework_series = (
-                filtered_df[rework_col].astype(str).str.replace(",", ".", regex=False)
-            )
-            rework_numeric = pd.to_numeric(rework_series, errors="coerce").fillna(0)
-            status_mask = status_mask | (rework_numeric > 0)
+        keep_mask &= status_mask
 
-        filtered_df = filtered_df[status_mask].copy()
+    filtered_df = prepared_df if keep_mask.all() else prepared_df[keep_mask]
 
     if filtered_df.empty:
         st.info("Нет данных для выбранных фильтров.")
@@ -7340,20 +7332,9 @@ def dashboard_documentation(df):
     # Prepare data for pie chart "Исполнение РД"
     # Sum values for "На согласовании" and "Выдано в производство работ"
     try:
-        # Convert to numeric, handling comma as decimal separator
-        on_approval_series = (
-            df[on_approval_col].astype(str).str.replace(",", ".", regex=False)
-        )
-        on_approval_sum = (
-            pd.to_numeric(on_approval_series, errors="coerce").fillna(0).sum()
-        )
-
-        in_production_series = (
-            df[in_production_col].astype(str).str.replace(",", ".", regex=False)
-        )
-        in_production_sum = (
-            pd.to_numeric(in_production_series, errors="coerce").fillna(0).sum()
-        )
+        # Numeric columns were converted once before filtering
+        on_approval_sum = df["on_approval_numeric"].sum()
+        in_production_sum = df["in_production_numeric"].sum()
 
         # Create pie chart
         if on_approval_sum > 0 or in_production_sum > 0:
@@ -7408,9 +7389,7 @@ def dashboard_documentation(df):
     # Fact (Y-axis): "Выдано в производство работ" (grouped by "Старт План")
     try:
         # Find column for plan data: "РД по Договору"
-        rd_plan_col = find_column(
-            df, ["РД по Договору", "РД по договору", "рд по договору", "РД по Договору"]
-        )
+        rd_plan_col = doc_cols["rd_plan"]
 
         # Check if required columns exist
         if not plan_start_col or plan_start_col not in df.columns:
@@ -7431,101 +7410,83 @@ def dashboard_documentation(df):
             )
             return
 
-        # Convert columns to numeric - handle comma as decimal separator
-        # Replace comma with dot for numeric conversion
-        # Plan: use "РД по Договору"
-        rd_plan_series = df[rd_plan_col].astype(str).str.replace(",", ".", regex=False)
-        df["rd_plan_numeric"] = pd.to_numeric(rd_plan_series, errors="coerce").fillna(0)
+        # Plan ("РД по Договору") and fact ("Выдано в производство работ") numeric
+        # columns were converted once before filtering
 
-        # Convert "Выдано в производство работ" to numeric - handle comma as decimal separator
-        in_production_series = (
-            df[in_production_col].astype(str).str.replace(",", ".", regex=False)
-        )
-        df["in_production_numeric"] = pd.to_numeric(
-            in_production_series, errors="coerce"
-        ).fillna(0)
+        # Prepare data
+        # Both Plan and Fact are grouped by plan_start_col (Старт план);
+        # each entry is (trace name, dates, cumulative values)
+        dynamics_traces = []
 
-        # Convert dates - handle DD.MM.YYYY format
-        # First convert to string, then parse with dayfirst=True
-        plan_start_str = df[plan_start_col].astype(str)
-        df[plan_start_col] = pd.to_datetime(
-            plan_start_str, errors="coerce", dayfirst=True, format="mixed"
+        # Group keys are int64 day numbers instead of datetime.date objects, so
+        # groupby hashes plain integers; dates are rebuilt only for the groups
+        plan_mask = df["plan_start_dt"].notna()
+        day_keys = (
+            df.loc[plan_mask, "plan_start_dt"]
+            .to_numpy()
+            .astype("datetime64[D]")
+            .astype(np.int64)
         )
 
-        # Prepare data
-        # Both Plan and Fact are grouped by plan_start_col (Старт план)
-        dynamics_data = []
-
-        # Plan data: group by plan start date, sum "РД по Договору"
-        # Always include plan data, even if some values are 0
-        plan_mask = df[plan_start_col].notna()
         if plan_mask.any():
-            plan_grouped = (
-                df[plan_mask]
-                .groupby(df[plan_mask][plan_start_col].dt.date)
-                .agg({"rd_plan_numeric": "sum"})
-                .reset_index()
-            )
-            plan_grouped.columns = ["Дата", "Количество"]
-            plan_grouped["Тип"] = "План"
-            # Fill NaN with 0 and ensure all values are numeric
-            plan_grouped["Количество"] = plan_grouped["Количество"].fillna(0)
-            # Always add plan data, even if all values are 0
-            dynamics_data.append(plan_grouped)
-
-        # Fact data: group by plan start date (same as Plan!), sum "Выдано в производство работ"
-        fact_mask = df[plan_start_col].notna()  # Use plan_start_col for both!
-        if fact_mask.any():
-            fact_grouped = (
-                df[fact_mask]
-                .groupby(df[fact_mask][plan_start_col].dt.date)
-                .agg({"in_production_numeric": "sum"})
-                .reset_index()
-            )
-            fact_grouped.columns = ["Дата", "Количество"]
-            fact_grouped["Тип"] = "Факт"
-            # Fill NaN with 0 and ensure all values are numeric
-            fact_grouped["Количество"] = fact_grouped["Количество"].fillna(0)
-            # Filter out rows where sum is 0 for fact (only show actual production)
-            fact_grouped = fact_grouped[fact_grouped["Количество"] > 0]
-            if not fact_grouped.empty:
-                dynamics_data.append(fact_grouped)
+            # Plan ("РД по Договору") and Fact ("Выдано в производство работ") share
+            # the same keys: factorize them once (sorted, so cumulative values are
+            # plain cumsums) and scatter-add both columns with np.bincount
+            day_codes, unique_days = pd.factorize(day_keys, sort=True)
+            daily_dates = pd.to_datetime(unique_days, unit="D").date
+
+            def daily_sum(column):
+                """Сумма значений колонки по дням (NaN считаются нулями)."""
+                values = np.nan_to_num(
+                    df.loc[plan_mask, column].to_numpy(dtype=float, na_value=np.nan)
+                )
+                return np.bincount(
+                    day_codes, weights=values, minlength=len(unique_days)
+                )
+
+            # Plan data: always include plan data, even if some values are 0
+            plan_values = daily_sum("rd_plan_numeric")
+            dynamics_traces.append(
+                ("План (РД по Договору)", daily_dates, plan_values.cumsum())
+            )
+
+            # Fact data: only show dates with actual production (sum > 0)
+            fact_values = daily_sum("in_production_numeric")
+            fact_positive = fact_values > 0
+            if fact_positive.any():
+                dynamics_traces.append(
+                    (
+                        "Факт (Выдано в производство работ)",
+                        daily_dates[fact_positive],
+                        fact_values.cumsum()[fact_positive],
+                    )
+                )
 
         # Always show graph if we have plan data, even if fact data is empty
-        if dynamics_data:
+        if dynamics_traces:
             st.subheader("Динамика выдачи РД")
-            dynamics_df = pd.concat(dynamics_data, ignore_index=True)
-            dynamics_df = dynamics_df.sort_values("Дата")
-
-            # Вычисляем накопительные значения для каждого типа отдельно
-            dynamics_df["Накопительное_значение"] = 0
-            for typ in dynamics_df["Тип"].unique():
-                mask = dynamics_df["Тип"] == typ
-                dynamics_df.loc[mask, "Накопительное_значение"] = dynamics_df.loc[
-                    mask, "Количество"
-                ].cumsum()
-
-            # Используем накопительные значения для графика
-            dynamics_df["Количество"] = dynamics_df["Накопительное_значение"]
-
-            # Create line chart with text labels always visible
-            # Prepare text labels for each data point
-            dynamics_df["Текст"] = dynamics_df["Количество"].apply(
-                lambda x: f"{x:.0f}" if pd.notna(x) else ""
-            )
-
-            fig_dynamics = px.line(
-                dynamics_df,
-                x="Дата",
-                y="Количество",
-                color="Тип",
-                title="Динамика выдачи РД",
-                markers=True,
-                labels={"Количество": "Количество", "Дата": "Дата (Старт План)"},
-                text="Текст",
-            )
+            # Build WebGL traces straight from the arrays instead of going
+            # through plotly.express
+            fig_dynamics = go.Figure()
+            for trace_name, trace_dates, cumulative in dynamics_traces:
+                fig_dynamics.add_trace(
+                    go.Scattergl(
+                        x=trace_dates,
+                        y=cumulative,
+                        name=trace_name,
+                        # Text labels are always visible on each data point
+                        mode="lines+markers+text",
+                        text=np.char.mod("%.0f", cumulative),
+                        textposition="top center",
+                        textfont=dict(size=10, color="white"),
+                        line=dict(width=2),
+                        marker=dict(size=8),
+                        hovertemplate="%{y:.0f}",
+                    )
+                )
 
             fig_dynamics.update_layout(
+                title="Динамика выдачи РД",
                 xaxis_title="Дата (Старт План)",
                 yaxis_title="Количество",
                 hovermode="x unified",
@@ -7538,28 +7499,6 @@ def dashboard_documentation(df):
                     title_text="",
                 ),
             )
-            # Update legend labels to be more descriptive
-            fig_dynamics.for_each_trace(
-                lambda t: t.update(
-                    name=(
-                        "План (РД по Договору)"
-                        if t.name == "План"
-                        else (
-                            "Факт (Выдано в производство работ)"
-                            if t.name == "Факт"
-                            else t.name
-                        )
-                    )
-                )
-            )
-            # Add text labels and format - ensure text is always visible
-            fig_dynamics.update_traces(
-                line=dict(width=2),
-                marker=dict(size=8),
-                mode="lines+markers+text",  # Enable text display mode
-                textposition="top center",
-                textfont=dict(size=10, color="white"),
-            )
             fig_dynamics = apply_chart_background(fig_dynamics)
             st.plotly_chart(fig_dynamics, use_container_width=True)
         else:
@@ -7603,6 +7542,70 @@ def dashboard_bddr_by_section(df):
     )
 
 
+@st.cache_data(show_spinner=False)
+def prepare_budget_by_project(
+    df, selected_project, selected_section, adjusted_budget_col
+):
+    """
+    Суммирует бюджет План/Факт/Резерв/Корректировка по проектам.
+
+    Результат кэшируется между rerun по значениям фильтров: переключение
+    типов бюджета и чекбокса резерва не пересчитывает группировку.
+
+    Args:
+        df: DataFrame с данными проектов (колонки project name, budget plan,
+            budget fact)
+        selected_project: Выбранный проект или "Все"
+        selected_section: Выбранный этап или "Все"
+        adjusted_budget_col: Колонка скорректированного бюджета или None
+
+    Returns:
+        DataFrame с колонками project name, budget plan, budget fact,
+        reserve budget, budget adjusted или None, если после фильтров нет строк
+    """
+    # Key columns are stripped in load_data, so plain equality is enough; the
+    # filters are combined into one mask and the rows are taken once
+    keep_mask = np.ones(len(df), dtype=bool)
+    if selected_project != "Все":
+        keep_mask &= (df["project name"] == selected_project).to_numpy()
+    if selected_section != "Все" and "section" in df.columns:
+        keep_mask &= (df["section"] == selected_section).to_numpy()
+    hist_df = df[keep_mask]
+
+    if hist_df.empty:
+        return None
+
+    # Budget columns are numeric since load_data; only the adjusted budget is
+    # brought to a common name (assign keeps the cached input intact)
+    hist_df = hist_df[["project name", "budget plan", "budget fact"]].assign(
+        **{
+            "budget adjusted": (
+                hist_df[adjusted_budget_col]
+                if adjusted_budget_col and adjusted_budget_col in hist_df.columns
+                else 0
+            )
+        }
+    )
+
+    # Group by project and aggregate all budgets in one named-aggregation pass;
+    # missing values count as 0, so the reserve is taken from the totals
+    budget_by_project = hist_df.groupby(
+        "project name", as_index=False, observed=True
+    ).agg(
+        **{
+            "budget plan": pd.NamedAgg("budget plan", "sum"),
+            "budget fact": pd.NamedAgg("budget fact", "sum"),
+            "budget adjusted": pd.NamedAgg("budget adjusted", "sum"),
+        }
+    )
+    budget_by_project.insert(
+        3,
+        "reserve budget",
+        budget_by_project["budget plan"] - budget_by_project["budget fact"],
+    )
+    return budget_by_project
+
+
 # ==================== DASHBOARD 8: Budget by Type (Plan/Fact/Reserve) ====================
 def dashboard_budget_by_type(df):
     # Переключатель типа бюджета (БДДС / БДДР)
@@ -7626,7 +7629,7 @@ def dashboard_budget_by_type(df):
 
     with col1:
         if "project name" in df.columns:
-            projects = ["Все"] + sorted(df["project name"].dropna().unique().tolist())
+            projects = ["Все"] + get_filter_options(df["project name"])
             selected_project = st.selectbox(
                 "Фильтр по проекту", projects, key="budget_type_project"
             )
@@ -7636,47 +7639,20 @@ def dashboard_budget_by_type(df):
 
     with col2:
         if "section" in df.columns:
-            sections = ["Все"] + sorted(df["section"].dropna().unique().tolist())
+            sections = ["Все"] + get_filter_options(df["section"])
             selected_section = st.selectbox(
                 "Фильтр по этапу", sections, key="budget_type_section"
             )
         else:
             selected_section = "Все"
 
-    # Apply filters
-    filtered_df = df.copy()
-    if selected_project != "Все" and "project name" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["project name"].astype(str).str.strip()
-            == str(selected_project).strip()
-        ]
-    if selected_section != "Все" and "section" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["section"].astype(str).str.strip()
-            == str(selected_section).strip()
-        ]
-
     # Check for budget columns
-    has_budget = (
-        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
-    )
+    has_budget = "budget plan" in df.columns and "budget fact" in df.columns
 
     if not has_budget:
         st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
         return
 
-    # Calculate reserve budget (plan - fact, negative means over budget)
-    # Convert to numeric first to avoid TypeError
-    filtered_df["budget plan"] = pd.to_numeric(
-        filtered_df["budget plan"], errors="coerce"
-    )
-    filtered_df["budget fact"] = pd.to_numeric(
-        filtered_df["budget fact"], errors="coerce"
-    )
-    filtered_df["reserve budget"] = (
-        filtered_df["budget plan"] - filtered_df["budget fact"]
-    )
-
     # ========== Histogram: Budget by Project and Type ==========
     st.subheader(
         "📊 Гистограмма: Бюджет План/Прогноз/Факт/корректировка/резерв по проектам"
@@ -7705,187 +7681,164 @@ def dashboard_budget_by_type(df):
         if show_reserve:
             selected_budget_types.append("Резерв бюджета")
 
-    # Apply filters for histogram - use filtered_df to respect project filter
-    hist_df = filtered_df.copy()
+    if "project name" not in df.columns:
+        st.warning(
+            "Колонка 'project name' не найдена в данных для построения гистограммы."
+        )
+        return
 
-    if selected_section != "Все" and "section" in hist_df.columns:
-        hist_df = hist_df[
-            hist_df["section"].astype(str).str.strip() == str(selected_section).strip()
-        ]
+    # Filtering, numeric conversion and grouping are cached per filter values
+    budget_by_project = prepare_budget_by_project(
+        df, selected_project, selected_section, adjusted_budget_col
+    )
 
-    if hist_df.empty:
+    if budget_by_project is None:
         st.info("Нет данных для отображения гистограммы с выбранными фильтрами.")
-    else:
-        # Convert budget columns to numeric
-        hist_df["budget plan"] = pd.to_numeric(
-            hist_df["budget plan"], errors="coerce"
-        ).fillna(0)
-        hist_df["budget fact"] = pd.to_numeric(
-            hist_df["budget fact"], errors="coerce"
-        ).fillna(0)
-        hist_df["reserve budget"] = hist_df["budget plan"] - hist_df["budget fact"]
+        return
 
-        # Group by project and aggregate
-        if "project name" in hist_df.columns:
-            budget_by_project = (
-                hist_df.groupby("project name")
-                .agg(
-                    {
-                        "budget plan": "sum",
-                        "budget fact": "sum",
-                        "reserve budget": "sum",
-                    }
-                )
-                .reset_index()
+    # Budget type -> (column of budget_by_project, bar color)
+    budget_type_columns = {
+        "Бюджет План": ("budget plan", "#2E86AB"),
+        "Бюджет Факт": ("budget fact", "#A23B72"),
+        "Бюджет Корректировка": ("budget adjusted", "#F18F01"),
+        "Резерв бюджета": ("reserve budget", "#06A77D"),
+    }
+
+    # Create histogram - one go.Bar per budget type straight from the wide
+    # per-project frame, values in millions for the y-axis
+    project_names = budget_by_project["project name"].to_numpy()
+    fig_hist = go.Figure()
+    for budget_type in selected_budget_types:
+        value_col, color = budget_type_columns[budget_type]
+        values_mln = budget_by_project[value_col].to_numpy(dtype=float) / 1_000_000
+        fig_hist.add_trace(
+            go.Bar(
+                x=project_names,
+                y=values_mln,
+                name=budget_type,
+                marker_color=color,
+                text=values_mln,
+                hovertemplate=(
+                    f"Тип бюджета={budget_type}<br>Проект=%{{x}}<br>"
+                    "Сумма бюджета, млн руб.=%{y}<extra></extra>"
+                ),
             )
+        )
 
-            # Add adjusted budget if available
-            if adjusted_budget_col and adjusted_budget_col in hist_df.columns:
-                # Convert to numeric first
-                hist_df[adjusted_budget_col] = pd.to_numeric(
-                    hist_df[adjusted_budget_col], errors="coerce"
-                ).fillna(0)
-                budget_by_project["budget adjusted"] = (
-                    hist_df.groupby("project name")[adjusted_budget_col].sum().values
-                )
-            else:
-                budget_by_project["budget adjusted"] = 0
+    # Update layout
+    fig_hist.update_layout(
+        title="Бюджет План/Прогноз/Факт/корректировка/резерв по проектам",
+        barmode="group",
+        legend_title_text="Тип бюджета",
+        xaxis_title="Проект",
+        yaxis_title="Сумма бюджета, млн руб.",
+        height=600,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        xaxis=dict(tickangle=-75, tickfont=dict(size=8), automargin=True),
+    )
 
-            # Transform to long format
-            hist_melted = []
-            for idx, row in budget_by_project.iterrows():
-                project = row["project name"]
+    # Add text labels on the edge of bars (в миллионах рублей)
+    fig_hist.update_traces(
+        textposition="outside",
+        texttemplate="%{text:.2f} млн руб.",
+        textfont=dict(size=12, color="white"),
+    )
 
-                if "Бюджет План" in selected_budget_types:
-                    hist_melted.append(
-                        {
-                            "project name": project,
-                            "Тип бюджета": "Бюджет План",
-                            "Сумма": row["budget plan"],
-                        }
-                    )
+    fig_hist = apply_chart_background(fig_hist)
+    st.plotly_chart(fig_hist, use_container_width=True)
 
-                if "Бюджет Факт" in selected_budget_types:
-                    hist_melted.append(
-                        {
-                            "project name": project,
-                            "Тип бюджета": "Бюджет Факт",
-                            "Сумма": row["budget fact"],
-                        }
-                    )
+    # Summary table
+    with st.expander("📋 Сводная таблица по проектам", expanded=False):
+        # budget_by_project is already one row per project: take the
+        # selected types from it instead of pivoting a long frame
+        summary_hist = budget_by_project.rename(
+            columns={
+                value_col: budget_type
+                for budget_type, (value_col, _) in budget_type_columns.items()
+            }
+        )[["project name"] + sorted(selected_budget_types)]
+
+        # Convert to millions (all budget columns in one block operation)
+        budget_cols = summary_hist.columns[1:]
+        summary_hist[budget_cols] = (summary_hist[budget_cols] / 1_000_000).round(2)
+
+        # Add "Отклонение" column: фактический бюджет - плановый
+        if "Бюджет Факт" in summary_hist.columns and "Бюджет План" in summary_hist.columns:
+            summary_hist["Отклонение"] = (
+                summary_hist["Бюджет Факт"] - summary_hist["Бюджет План"]
+            ).round(2)
+
+        # Rename "project name" to Russian and add "млн руб." to budget columns
+        summary_hist = summary_hist.rename(columns={"project name": "Проект"})
+        # Rename budget columns to include "млн руб."
+        rename_budget_cols = {}
+        for col in summary_hist.columns:
+            if col not in ["Проект", "Отклонение"]:
+                rename_budget_cols[col] = f"{col}, млн руб."
+        summary_hist = summary_hist.rename(columns=rename_budget_cols)
+
+        # Use format_dataframe_as_html with conditional formatting for "Отклонение" column
+        conditional_cols = {
+            "Отклонение": {
+                'positive_color': '#ff4444',
+                'negative_color': '#44ff44'
+            }
+        }
+        html_table = format_dataframe_as_html(summary_hist, conditional_cols=conditional_cols)
+        st.markdown(html_table, unsafe_allow_html=True)
 
-                if (
-                    "Бюджет Корректировка" in selected_budget_types
-                    and adjusted_budget_col
-                ):
-                    hist_melted.append(
-                        {
-                            "project name": project,
-                            "Тип бюджета": "Бюджет Корректировка",
-                            "Сумма": row["budget adjusted"],
-                        }
-                    )
 
-                if "Резерв бюджета" in selected_budget_types:
-                    hist_melted.append(
-                        {
-                            "project name": project,
-                            "Тип бюджета": "Резерв бюджета",
-                            "Сумма": row["reserve budget"],
-                        }
-                    )
+@st.cache_data(show_spinner=False)
+def prepare_budget_by_period(
+    df, period_col, selected_project, selected_section, selected_block
+):
+    """
+    Суммирует бюджет План/Факт/Резерв по периодам (кэшируется между rerun).
 
-            hist_by_type_df = pd.DataFrame(hist_melted)
+    Args:
+        df: DataFrame с данными проектов (колонки budget plan, budget fact)
+        period_col: Колонка периода (plan_month, plan_quarter, plan_year)
+        selected_project: Выбранный проект или "Все"
+        selected_section: Выбранный этап или "Все"
+        selected_block: Выбранный блок или "Все"
 
-            if hist_by_type_df.empty:
-                st.info("Нет данных для отображения с выбранными типами бюджета.")
-            else:
-                # Преобразуем значения в миллионы рублей для отображения на столбцах
-                hist_by_type_df["Сумма_млн"] = hist_by_type_df["Сумма"] / 1000000
-
-                # Create histogram - use millions for y-axis
-                fig_hist = px.bar(
-                    hist_by_type_df,
-                    x="project name",
-                    y="Сумма_млн",
-                    color="Тип бюджета",
-                    title="Бюджет План/Прогноз/Факт/корректировка/резерв по проектам",
-                    labels={"project name": "Проект", "Сумма_млн": "Сумма бюджета, млн руб."},
-                    barmode="group",
-                    text="Сумма_млн",
-                    template=None,  # Убираем дефолтный template
-                    color_discrete_map={
-                        "Бюджет План": "#2E86AB",
-                        "Бюджет Факт": "#A23B72",
-                        "Бюджет Корректировка": "#F18F01",
-                        "Резерв бюджета": "#06A77D",
-                    },
-                )
+    Returns:
+        DataFrame с колонками period_col, budget plan, budget fact, reserve budget
+        или None, если после фильтров нет строк с заполненным бюджетом
+    """
+    # Key columns are stripped in load_data, so plain equality is enough; the
+    # filters are combined into one mask and the rows are taken once
+    keep_mask = np.ones(len(df), dtype=bool)
+    for col, selected in (
+        ("project name", selected_project),
+        ("section", selected_section),
+        ("block", selected_block),
+    ):
+        if selected != "Все" and col in df.columns:
+            keep_mask &= (df[col] == selected).to_numpy()
+    filtered_df = df[keep_mask]
 
-                # Update layout
-                fig_hist.update_layout(
-                    xaxis_title="Проект",
-                    yaxis_title="Сумма бюджета, млн руб.",
-                    height=600,
-                    legend=dict(
-                        orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1
-                    ),
-                    xaxis=dict(tickangle=-75, tickfont=dict(size=8), automargin=True),
-                )
+    # Nothing to aggregate: skip the reserve and groupby work entirely
+    if (
+        filtered_df.empty
+        or not filtered_df[["budget plan", "budget fact"]].notna().to_numpy().any()
+    ):
+        return None
 
-                # Add text labels on the edge of bars (в миллионах рублей)
-                fig_hist.update_traces(
-                    textposition="outside",
-                    texttemplate="%{text:.2f} млн руб.",
-                    textfont=dict(size=12, color="white"),
-                )
+    # Calculate reserve budget (plan - fact, negative means over budget);
+    # budget columns are numeric since load_data
+    filtered_df = filtered_df[[period_col, "budget plan", "budget fact"]].assign(
+        **{"reserve budget": filtered_df["budget plan"] - filtered_df["budget fact"]}
+    )
 
-                fig_hist = apply_chart_background(fig_hist)
-                st.plotly_chart(fig_hist, use_container_width=True)
-
-                # Summary table
-                with st.expander("📋 Сводная таблица по проектам", expanded=False):
-                    summary_hist = hist_by_type_df.pivot_table(
-                        index="project name",
-                        columns="Тип бюджета",
-                        values="Сумма",
-                        aggfunc="sum",
-                        fill_value=0,
-                    ).reset_index()
-
-                    # Convert to millions
-                    for col in summary_hist.columns:
-                        if col != "project name" and col in summary_hist.columns:
-                            summary_hist[col] = (summary_hist[col] / 1_000_000).round(2)
-
-                    # Add "Отклонение" column: фактический бюджет - плановый
-                    if "Бюджет Факт" in summary_hist.columns and "Бюджет План" in summary_hist.columns:
-                        summary_hist["Отклонение"] = (
-                            summary_hist["Бюджет Факт"] - summary_hist["Бюджет План"]
-                        ).round(2)
-
-                    # Rename "project name" to Russian and add "млн руб." to budget columns
-                    summary_hist = summary_hist.rename(columns={"project name": "Проект"})
-                    # Rename budget columns to include "млн руб."
-                    rename_budget_cols = {}
-                    for col in summary_hist.columns:
-                        if col not in ["Проект", "Отклонение"]:
-                            rename_budget_cols[col] = f"{col}, млн руб."
-                    summary_hist = summary_hist.rename(columns=rename_budget_cols)
-
-                    # Use format_dataframe_as_html with conditional formatting for "Отклонение" column
-                    conditional_cols = {
-                        "Отклонение": {
-                            'positive_color': '#ff4444',
-                            'negative_color': '#44ff44'
-                        }
-                    }
-                    html_table = format_dataframe_as_html(summary_hist, conditional_cols=conditional_cols)
-                    st.markdown(html_table, unsafe_allow_html=True)
-        else:
-            st.warning(
-                "Колонка 'project name' не найдена в данных для построения гистограммы."
-            )
+    # Group by period first to get totals (one named-aggregation pass)
+    return filtered_df.groupby(period_col, as_index=False, observed=True).agg(
+        **{
+            "budget plan": pd.NamedAgg("budget plan", "sum"),
+            "budget fact": pd.NamedAgg("budget fact", "sum"),
+            "reserve budget": pd.NamedAgg("reserve budget", "sum"),
+        }
+    )
 
 
 # ==================== DASHBOARD 8.1: Budget Old Charts ====================
@@ -7903,7 +7856,7 @@ def dashboard_budget_old_charts(df):
 
     with col2:
         if "project name" in df.columns:
-            projects = ["Все"] + sorted(df["project name"].dropna().unique().tolist())
+            projects = ["Все"] + get_filter_options(df["project name"])
             selected_project = st.selectbox(
                 "Фильтр по проекту", projects, key="budget_old_project"
             )
@@ -7912,7 +7865,7 @@ def dashboard_budget_old_charts(df):
 
     with col3:
         if "section" in df.columns:
-            sections = ["Все"] + sorted(df["section"].dropna().unique().tolist())
+            sections = ["Все"] + get_filter_options(df["section"])
             selected_section = st.selectbox(
                 "Фильтр по этапу", sections, key="budget_old_section"
             )
@@ -7923,34 +7876,15 @@ def dashboard_budget_old_charts(df):
     col4 = st.columns(1)[0]
     with col4:
         if "block" in df.columns:
-            blocks = ["Все"] + sorted(df["block"].dropna().unique().tolist())
+            blocks = ["Все"] + get_filter_options(df["block"])
             selected_block = st.selectbox(
                 "Фильтр по блоку", blocks, key="budget_old_block"
             )
         else:
             selected_block = "Все"
 
-    # Apply filters
-    filtered_df = df.copy()
-    if selected_project != "Все" and "project name" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["project name"].astype(str).str.strip()
-            == str(selected_project).strip()
-        ]
-    if selected_section != "Все" and "section" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["section"].astype(str).str.strip()
-            == str(selected_section).strip()
-        ]
-    if selected_block != "Все" and "block" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["block"].astype(str).str.strip() == str(selected_block).strip()
-        ]
-
     # Check for budget columns
-    has_budget = (
-        "budget plan" in filtered_df.columns and "budget fact" in filtered_df.columns
-    )
+    has_budget = "budget plan" in df.columns and "budget fact" in df.columns
 
     if not has_budget:
         st.warning("Столбцы бюджета (budget plan, budget fact) не найдены в данных.")
@@ -7967,125 +7901,59 @@ def dashboard_budget_old_charts(df):
         period_col = "plan_year"
         period_label = "Год"
 
-    if period_col not in filtered_df.columns:
+    if period_col not in df.columns:
         st.warning(f"Столбец периода '{period_col}' не найден.")
         return
 
-    # Calculate reserve budget (plan - fact, negative means over budget)
-    # Convert to numeric first to avoid TypeError
-    filtered_df["budget plan"] = pd.to_numeric(
-        filtered_df["budget plan"], errors="coerce"
+    # Filtering, numeric conversion and grouping are cached per filter values
+    budget_by_period = prepare_budget_by_period(
+        df, period_col, selected_project, selected_section, selected_block
     )
-    filtered_df["budget fact"] = pd.to_numeric(
-        filtered_df["budget fact"], errors="coerce"
+
+    if budget_by_period is None:
+        st.info("Нет данных бюджета для выбранных фильтров.")
+        return
+
+    if isinstance(budget_by_period[period_col].dtype, pd.PeriodDtype):
+        budget_by_period[period_col] = format_period_values(
+            budget_by_period[period_col]
+        )
+    else:
+        # Mixed object columns still go through the per-value formatter
+        budget_by_period[period_col] = budget_by_period[period_col].apply(
+            format_period_display
+        )
+
+    # Checkbox to hide/show reserve budget (default: hidden)
+    hide_reserve = st.checkbox(
+        "Скрыть резерв", value=True, key="budget_old_hide_reserve"
     )
-    filtered_df["reserve budget"] = (
-        filtered_df["budget plan"] - filtered_df["budget fact"]
+
+    # Transform data to long format - group by budget type
+    budget_types = {"budget plan": "Бюджет План", "budget fact": "Бюджет Факт"}
+    # Add reserve only if not hidden
+    if not hide_reserve:
+        budget_types["reserve budget"] = "Резерв бюджета"
+    budget_by_type_df = budget_by_period.rename(columns=budget_types).melt(
+        id_vars=period_col,
+        value_vars=list(budget_types.values()),
+        var_name="Тип бюджета",
+        value_name="Сумма",
     )
 
-    # Group by period first to get totals
-    budget_by_period = (
-        filtered_df.groupby(period_col)
-        .agg({"budget plan": "sum", "budget fact": "sum", "reserve budget": "sum"})
-        .reset_index()
+    # Convert to millions
+    budget_by_type_df["Сумма_млн"] = (budget_by_type_df["Сумма"] / 1_000_000).round(2)
+
+    # The same totals in wide form (period x budget type) come straight from the
+    # aggregated frame, so the metrics and tables don't filter or pivot the
+    # long frame back
+    pivot_table = (
+        (budget_by_period.set_index(period_col)[list(budget_types)] / 1_000_000)
+        .round(2)
+        .rename(columns=budget_types)
+        .rename_axis(columns="Тип бюджета")
     )
 
-    # Format period for display
-    def format_period_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        if isinstance(period_val, pd.Period):
-            try:
-                if period_val.freqstr == "M" or period_val.freqstr.startswith(
-                    "M"
-                ):  # Month
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-                elif period_val.freqstr == "Q" or period_val.freqstr.startswith(
-                    "Q"
-                ):  # Quarter
-                    return f"Q{period_val.quarter} {period_val.year}"
-                elif period_val.freqstr == "Y" or period_val.freqstr == "A-DEC":  # Year
-                    return str(period_val.year)
-                else:
-                    month_name = get_russian_month_name(period_val)
-                    year = period_val.year
-                    return f"{month_name} {year}"
-            except:
-                # Try parsing as string
-                period_str = str(period_val)
-                try:
-                    if "-" in period_str:
-                        parts = period_str.split("-")
-                        if len(parts) >= 2:
-                            year = parts[0]
-                            month = parts[1]
-                            month_num = int(month)
-                            month_name = RUSSIAN_MONTHS.get(month_num, "")
-                            if month_name:
-                                return f"{month_name} {year}"
-                except:
-                    pass
-                return str(period_val)
-        elif isinstance(period_val, str):
-            # Try parsing string like "2025-01"
-            try:
-                if "-" in period_val:
-                    parts = period_val.split("-")
-                    if len(parts) >= 2:
-                        year = parts[0]
-                        month = parts[1]
-                        month_num = int(month)
-                        month_name = RUSSIAN_MONTHS.get(month_num, "")
-                        if month_name:
-                            return f"{month_name} {year}"
-            except:
-                pass
-        return str(period_val)
-
-    budget_by_period[period_col] = budget_by_period[period_col].apply(
-        format_period_display
-    )
-
-    # Checkbox to hide/show reserve budget (default: hidden)
-    hide_reserve = st.checkbox(
-        "Скрыть резерв", value=True, key="budget_old_hide_reserve"
-    )
-
-    # Transform data to long format - group by budget type
-    budget_melted = []
-    for idx, row in budget_by_period.iterrows():
-        period = row[period_col]
-        budget_melted.append(
-            {
-                period_col: period,
-                "Тип бюджета": "Бюджет План",
-                "Сумма": row["budget plan"],
-            }
-        )
-        budget_melted.append(
-            {
-                period_col: period,
-                "Тип бюджета": "Бюджет Факт",
-                "Сумма": row["budget fact"],
-            }
-        )
-        # Add reserve only if not hidden
-        if not hide_reserve:
-            budget_melted.append(
-                {
-                    period_col: period,
-                    "Тип бюджета": "Резерв бюджета",
-                    "Сумма": row["reserve budget"],
-                }
-            )
-
-    budget_by_type_df = pd.DataFrame(budget_melted)
-
-    # Convert to millions
-    budget_by_type_df["Сумма_млн"] = (budget_by_type_df["Сумма"] / 1_000_000).round(2)
-
     # Visualizations
     col1, col2 = st.columns(2)
 
@@ -8106,21 +7974,33 @@ def dashboard_budget_old_charts(df):
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
-        # Grouped bar chart
-        fig = px.bar(
-            budget_by_type_df,
-            x=period_col,
-            y="Сумма_млн",
-            color="Тип бюджета",
+        # Grouped bar chart - one go.Bar per budget type from the wide totals
+        budget_type_colors = {
+            "Бюджет План": "#2E86AB",
+            "Бюджет Факт": "#A23B72",
+            "Резерв бюджета": "#06A77D",
+        }
+        fig = go.Figure()
+        for budget_type in pivot_table.columns:
+            fig.add_trace(
+                go.Bar(
+                    x=pivot_table.index,
+                    y=pivot_table[budget_type],
+                    name=budget_type,
+                    marker_color=budget_type_colors[budget_type],
+                    text=pivot_table[budget_type],
+                    hovertemplate=(
+                        f"Тип бюджета={budget_type}<br>{period_label}=%{{x}}<br>"
+                        "Сумма бюджета, млн руб.=%{y}<extra></extra>"
+                    ),
+                )
+            )
+        fig.update_layout(
             title="Бюджет по типам по периоду",
-            labels={period_col: period_label, "Сумма_млн": "Сумма бюджета, млн руб."},
             barmode="group",
-            text="Сумма_млн",
-            color_discrete_map={
-                "Бюджет План": "#2E86AB",
-                "Бюджет Факт": "#A23B72",
-                "Резерв бюджета": "#06A77D",
-            },
+            legend_title_text="Тип бюджета",
+            xaxis_title=period_label,
+            yaxis_title="Сумма бюджета, млн руб.",
         )
         fig.update_xaxes(tickangle=-75, tickfont=dict(size=8), automargin=True)
         fig.update_traces(textposition="outside", texttemplate="%{text:.2f} млн руб.", textfont=dict(size=14, color="white"))
@@ -8146,21 +8026,15 @@ def dashboard_budget_old_charts(df):
     # Summary metrics - convert to millions
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        total_plan = budget_by_type_df[
-            budget_by_type_df["Тип бюджета"] == "Бюджет План"
-        ]["Сумма_млн"].sum()
+        total_plan = pivot_table["Бюджет План"].sum()
         st.metric("Всего План", f"{total_plan:.2f} млн руб." if pd.notna(total_plan) else "Н/Д")
     with col2:
-        total_fact = budget_by_type_df[
-            budget_by_type_df["Тип бюджета"] == "Бюджет Факт"
-        ]["Сумма_млн"].sum()
+        total_fact = pivot_table["Бюджет Факт"].sum()
         st.metric("Всего Факт", f"{total_fact:.2f} млн руб." if pd.notna(total_fact) else "Н/Д")
     with col3:
         total_reserve = (
-            budget_by_type_df[budget_by_type_df["Тип бюджета"] == "Резерв бюджета"][
-                "Сумма_млн"
-            ].sum()
-            if "Резерв бюджета" in budget_by_type_df["Тип бюджета"].values
+            pivot_table["Резерв бюджета"].sum()
+            if "Резерв бюджета" in pivot_table.columns
             else 0
         )
         st.metric(
@@ -8182,15 +8056,15 @@ def dashboard_budget_old_charts(df):
             ),
         )
 
-    # Pivot table for better readability - use millions
-    pivot_table = budget_by_type_df.pivot(
-        index=period_col, columns="Тип бюджета", values="Сумма_млн"
-    ).fillna(0)
+    # Pivot table for better readability - use millions. Rows keep the
+    # chronological order of the groupby on the raw periods: sorting the
+    # formatted labels would put "Август" before "Январь"
+    pivot_table = pivot_table.fillna(0)
 
     # Detailed table - format with budget types as separate columns
     st.subheader("Детальная таблица")
     # Use pivot table format for detailed table (same as summary but with better formatting)
-    detailed_table = pivot_table.copy()
+    detailed_table = pivot_table
 
     # Round to 2 decimal places
     for col in detailed_table.columns:
@@ -8214,6 +8088,7 @@ def dashboard_budget_old_charts(df):
 
 
 # ==================== DASHBOARD: Approved Budget ====================
+@st.cache_data(show_spinner=False, max_entries=32)
 def calculate_approved_budget(df, rule_name="default"):
     """
     Рассчитывает утвержденный бюджет на основе правил распределения.
@@ -8259,17 +8134,11 @@ def calculate_approved_budget(df, rule_name="default"):
             f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}",
         )
 
-    # Копируем данные для работы
-    work_df = df.copy()
-
-    # Конвертируем даты
-    work_df["plan start"] = pd.to_datetime(
-        work_df["plan start"], errors="coerce", dayfirst=True
-    )
-    work_df["plan end"] = pd.to_datetime(
-        work_df["plan end"], errors="coerce", dayfirst=True
-    )
-    work_df["budget plan"] = pd.to_numeric(work_df["budget plan"], errors="coerce")
+    # Берем только нужные колонки: даты и бюджет уже приведены к типам в load_data
+    key_cols = [
+        col for col in ("project name", "section", "task name") if col in df.columns
+    ]
+    work_df = df[key_cols + required_cols]
 
     # Фильтруем строки с валидными данными
     valid_mask = (
@@ -8279,7 +8148,7 @@ def calculate_approved_budget(df, rule_name="default"):
         & (work_df["budget plan"] > 0)
         & (work_df["plan start"] <= work_df["plan end"])
     )
-    work_df = work_df[valid_mask].copy()
+    work_df = work_df[valid_mask]
 
     if work_df.empty:
         return pd.DataFrame(), "Нет данных с валидными датами и бюджетом"
@@ -8296,139 +8165,94 @@ def calculate_approved_budget(df, rule_name="default"):
 
     # Если нет колонок для группировки, обрабатываем все задачи вместе
     if not grouping_cols:
-        # Создаем фиктивную группу для всех задач
-        work_df["_group"] = "all"
+        # Создаем фиктивную группу для всех задач (assign не трогает входной df)
+        work_df = work_df.assign(_group="all")
         grouping_cols = ["_group"]
 
-    # Список для хранения результатов
-    approved_budget_rows = []
-
-    # Группируем задачи
-    if grouping_cols:
-        grouped = work_df.groupby(grouping_cols)
-    else:
-        # Если нет колонок для группировки, создаем одну группу
-        grouped = [("all", work_df)]
-
-    for group_key, group_df in grouped:
-        # Находим минимальную дату начала и максимальную дату окончания для группы
-        min_start = group_df["plan start"].min()
-        max_end = group_df["plan end"].max()
-
-        if pd.isna(min_start) or pd.isna(max_end):
-            continue
-
-        # Генерируем все месяцы этапа
-        current_date = min_start.replace(day=1)
-        end_month = max_end.replace(day=1)
-
-        months = []
-        while current_date <= end_month:
-            months.append(current_date.to_period("M"))
-            # Переходим к следующему месяцу
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
-
-        if len(months) == 0:
-            continue
-
-        # Для каждого месяца находим активные задачи и суммируем их плановый бюджет
-        monthly_budgets = {}
-        for month in months:
-            month_start = month.start_time
-            month_end = month.end_time
-
-            # Находим задачи, активные в этом месяце
-            active_tasks = group_df[
-                (group_df["plan start"] <= month_end)
-                & (group_df["plan end"] >= month_start)
-            ]
-
-            # Суммируем плановый бюджет активных задач - это 100% для месяца
-            total_budget = active_tasks["budget plan"].sum()
-            monthly_budgets[month] = total_budget
-
-        # Рассчитываем распределение бюджета по правилу
-        num_months = len(months)
-
-        if num_months == 1:
-            # Если только один месяц, весь бюджет идет туда
-            first_month_percent = 1.0
-            middle_months_percent = 0.0
-            last_month_percent = 0.0
-        elif num_months == 2:
-            # Если два месяца: 50% на первый, 50% на последний
-            first_month_percent = rule["first_month_percent"]
-            middle_months_percent = 0.0
-            last_month_percent = (
-                rule["middle_months_percent"] + rule["last_month_percent"]
-            )
-        else:
-            # Если больше двух месяцев: 50% на первый, 45% равномерно на промежуточные, 5% на последний
-            first_month_percent = rule["first_month_percent"]
-            last_month_percent = rule["last_month_percent"]
-            middle_months_percent = rule["middle_months_percent"] / (num_months - 2)
-
-        # Распределяем бюджет по месяцам
-        for i, month in enumerate(months):
-            # Берем бюджет для этого месяца (100%)
-            month_total_budget = monthly_budgets.get(month, 0)
-
-            if month_total_budget == 0:
-                continue
-
-            # Определяем процент для этого месяца
-            if i == 0:
-                # Первый месяц
-                month_percent = first_month_percent
-            elif i == len(months) - 1:
-                # Последний месяц
-                month_percent = last_month_percent
-            else:
-                # Промежуточные месяцы
-                month_percent = middle_months_percent
-
-            # Рассчитываем утвержденный бюджет для месяца
-            approved_budget = month_total_budget * month_percent
-
-            # Получаем значения группировки
-            group_dict = {}
-            if grouping_cols:
-                if isinstance(group_key, tuple):
-                    group_dict = dict(zip(grouping_cols, group_key))
-                elif len(grouping_cols) == 1:
-                    group_dict = {grouping_cols[0]: group_key}
-                else:
-                    # Если group_key не кортеж и колонок несколько, возможно это одна группа
-                    for col in grouping_cols:
-                        if col in group_df.columns:
-                            # Берем первое значение из группы
-                            group_dict[col] = (
-                                group_df[col].iloc[0] if len(group_df) > 0 else ""
-                            )
-
-            # Создаем строку с данными
-            approved_row = {
-                "month": month,
-                "approved budget": approved_budget,
-                "budget plan": month_total_budget,  # Плановый бюджет для месяца (100%)
-                "rule_name": rule_name,
-            }
-
-            # Добавляем значения группировки (исключаем фиктивную колонку _group)
-            for col in grouping_cols:
-                if col != "_group":
-                    approved_row[col] = group_dict.get(col, "")
+    # Номер группы для каждой задачи; строки с пустыми ключами, как и в groupby,
+    # в расчет не попадают
+    group_ids = work_df.groupby(grouping_cols).ngroup()
+    in_group = group_ids.notna().to_numpy()
+    if not in_group.any():
+        return pd.DataFrame(), "Нет данных для расчета утвержденного бюджета"
+    work_df = work_df[in_group]
+    group_ids = group_ids.to_numpy()[in_group].astype(np.int64)
 
-            approved_budget_rows.append(approved_row)
+    # Месяцы задач как целые числа (номер месяца от 1970-01): вся арифметика
+    # по месяцам выполняется на массивах, без перебора дат в цикле
+    start_months = (
+        work_df["plan start"].to_numpy().astype("datetime64[M]").astype(np.int64)
+    )
+    end_months = work_df["plan end"].to_numpy().astype("datetime64[M]").astype(np.int64)
+    budgets = work_df["budget plan"].to_numpy(dtype=float)
+
+    # Все месяцы этапа: от минимальной даты начала до максимальной даты окончания
+    group_bounds = (
+        pd.DataFrame({"group": group_ids, "start": start_months, "end": end_months})
+        .groupby("group")
+        .agg(first=("start", "min"), last=("end", "max"))
+    )
+    first_months = group_bounds["first"].to_numpy()
+    last_months = group_bounds["last"].to_numpy()
+
+    # Сумма планового бюджета активных задач по (группа, месяц) - это 100% для
+    # месяца. Месяцы всех групп лежат подряд в одной шкале; задача добавляет
+    # бюджет в месяце начала и снимает его после месяца окончания, а накопленная
+    # сумма дает бюджет каждого месяца за O(задачи + месяцы) без перебора
+    # месяцев каждой задачи. Месяцы без активных задач не попадают в результат
+    spans = last_months - first_months + 1
+    group_offsets = np.cumsum(spans) - spans
+    open_pos = group_offsets[group_ids] + (start_months - first_months[group_ids])
+    close_pos = group_offsets[group_ids] + (end_months - first_months[group_ids]) + 1
+    timeline_len = int(spans.sum()) + 1
+    active_budget = np.cumsum(
+        np.bincount(open_pos, weights=budgets, minlength=timeline_len)
+        - np.bincount(close_pos, weights=budgets, minlength=timeline_len)
+    )[:-1]
+    active_tasks = np.cumsum(
+        np.bincount(open_pos, minlength=timeline_len)
+        - np.bincount(close_pos, minlength=timeline_len)
+    )[:-1]
+    active_pos = np.flatnonzero(active_tasks > 0)
+    month_groups = np.repeat(np.arange(len(spans)), spans)[active_pos]
+    months = first_months[month_groups] + (active_pos - group_offsets[month_groups])
+    month_total_budget = active_budget[active_pos]
+
+    # Рассчитываем распределение бюджета по правилу
+    num_months = last_months[month_groups] - first_months[month_groups] + 1
+    position = months - first_months[month_groups]
+    # Если два месяца: 50% на первый, 50% на последний; если больше двух:
+    # 50% на первый, 45% равномерно на промежуточные, 5% на последний
+    last_month_percent = np.where(
+        num_months == 2,
+        rule["middle_months_percent"] + rule["last_month_percent"],
+        rule["last_month_percent"],
+    )
+    middle_months_percent = rule["middle_months_percent"] / np.maximum(
+        num_months - 2, 1
+    )
+    month_percent = np.select(
+        [num_months == 1, position == 0, position == num_months - 1],
+        # Если только один месяц, весь бюджет идет туда
+        [1.0, rule["first_month_percent"], last_month_percent],
+        default=middle_months_percent,
+    )
 
     # Создаем DataFrame из результатов
-    if not approved_budget_rows:
-        return pd.DataFrame(), "Нет данных для расчета утвержденного бюджета"
+    approved_budget_df = pd.DataFrame(
+        {
+            "month": pd.DatetimeIndex(months.astype("datetime64[M]")).to_period("M"),
+            "approved budget": month_total_budget * month_percent,
+            "budget plan": month_total_budget,  # Плановый бюджет для месяца (100%)
+            "rule_name": rule_name,
+        }
+    )
 
-    approved_budget_df = pd.DataFrame(approved_budget_rows)
+    # Добавляем значения группировки (исключаем фиктивную колонку _group)
+    _, first_rows = np.unique(group_ids, return_index=True)
+    for col in grouping_cols:
+        if col != "_group":
+            approved_budget_df[col] = work_df[col].to_numpy()[first_rows][month_groups]
 
     return approved_budget_df, None
 
@@ -8471,18 +8295,14 @@ def dashboard_approved_budget(df):
         else:
             selected_section = "Все"
 
-    # Применяем фильтры
-    filtered_df = df.copy()
-    if selected_project != "Все" and "project name" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["project name"].astype(str).str.strip()
-            == str(selected_project).strip()
-        ]
-    if selected_section != "Все" and "section" in filtered_df.columns:
-        filtered_df = filtered_df[
-            filtered_df["section"].astype(str).str.strip()
-            == str(selected_section).strip()
-        ]
+    # Применяем фильтры: ключевые колонки очищены от пробелов в load_data,
+    # поэтому достаточно прямого сравнения одной общей маской
+    keep_mask = np.ones(len(df), dtype=bool)
+    if selected_project != "Все" and "project name" in df.columns:
+        keep_mask &= (df["project name"] == selected_project).to_numpy()
+    if selected_section != "Все" and "section" in df.columns:
+        keep_mask &= (df["section"] == selected_section).to_numpy()
+    filtered_df = df[keep_mask]
 
     # Рассчитываем утвержденный бюджет
     approved_budget_df, error = calculate_approved_budget(
@@ -8497,48 +8317,24 @@ def dashboard_approved_budget(df):
         st.info("Нет данных для построения графика утвержденного бюджета.")
         return
 
-    # Группируем по месяцам для графика
+    # Группируем по месяцам для графика; groupby уже возвращает месяцы по
+    # возрастанию (сортировка по ordinal period[M]), отдельный sort не нужен
     monthly_approved = (
         approved_budget_df.groupby("month")
         .agg({"approved budget": "sum", "budget plan": "sum"})  # Для сравнения
         .reset_index()
     )
 
-    # Сортируем по месяцам
-    monthly_approved = monthly_approved.sort_values("month")
-
-    # Форматируем месяц для отображения
-    def format_month_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        try:
-            if isinstance(period_val, pd.Period):
-                month_num = period_val.month
-                year = period_val.year
-                RUSSIAN_MONTHS = {
-                    1: "Январь",
-                    2: "Февраль",
-                    3: "Март",
-                    4: "Апрель",
-                    5: "Май",
-                    6: "Июнь",
-                    7: "Июль",
-                    8: "Август",
-                    9: "Сентябрь",
-                    10: "Октябрь",
-                    11: "Ноябрь",
-                    12: "Декабрь",
-                }
-                return f"{RUSSIAN_MONTHS.get(month_num, 'Н/Д')} {year}"
-            return str(period_val)
-        except:
-            return str(period_val)
-
-    monthly_approved["Месяц"] = monthly_approved["month"].apply(format_month_display)
+    # Форматируем месяц для отображения (month - period[M] из расчета бюджета)
+    monthly_approved["Месяц"] = format_period_labels(monthly_approved["month"])
 
     # Convert to millions
-    monthly_approved["approved budget_millions"] = (monthly_approved["approved budget"] / 1_000_000).round(2)
-    monthly_approved["budget plan_millions"] = (monthly_approved["budget plan"] / 1_000_000).round(2)
+    monthly_approved["approved budget_millions"] = np.round(
+        monthly_approved["approved budget"].to_numpy() / 1_000_000, 2
+    )
+    monthly_approved["budget plan_millions"] = np.round(
+        monthly_approved["budget plan"].to_numpy() / 1_000_000, 2
+    )
 
     # Создаем график
     fig = go.Figure()
@@ -8600,10 +8396,14 @@ def dashboard_approved_budget(df):
                 "approved budget",
             ]
         ].copy()
-        detail_table["month"] = detail_table["month"].apply(format_month_display)
+        detail_table["month"] = format_period_labels(detail_table["month"])
         # Convert to millions
-        detail_table["budget plan"] = (detail_table["budget plan"] / 1_000_000).round(2)
-        detail_table["approved budget"] = (detail_table["approved budget"] / 1_000_000).round(2)
+        detail_table["budget plan"] = np.round(
+            detail_table["budget plan"].to_numpy() / 1_000_000, 2
+        )
+        detail_table["approved budget"] = np.round(
+            detail_table["approved budget"].to_numpy() / 1_000_000, 2
+        )
         detail_table.columns = [
             "Проект",
             "Раздел",
@@ -8617,20 +8417,20 @@ def dashboard_approved_budget(df):
 
 
 # ==================== DASHBOARD: Forecast Budget ====================
-def calculate_forecast_budget(df, edited_data=None, rule_name="default"):
+@st.cache_data(show_spinner=False, max_entries=32)
+def calculate_forecast_budget(work_df, rule_name="default"):
     """
     Рассчитывает прогнозный бюджет на основе утвержденного бюджета с учетом возможных изменений.
 
     Args:
-        df: DataFrame с исходными данными проектов
-        edited_data: DataFrame с отредактированными данными (даты, утвержденный бюджет)
+        work_df: DataFrame с данными проекта - отредактированная таблица
+            (даты, утвержденный бюджет) или исходные данные
         rule_name: название правила распределения
 
     Returns:
         DataFrame с распределением прогнозного бюджета по месяцам
     """
-    # Используем отредактированные данные, если они есть, иначе исходные
-    work_df = edited_data.copy() if edited_data is not None else df.copy()
+    # Результат кэшируется по данным и правилу, копии входа не нужны
 
     # Рассчитываем утвержденный бюджет на основе текущих данных
     approved_budget_df, error = calculate_approved_budget(work_df, rule_name=rule_name)
@@ -8640,11 +8440,13 @@ def calculate_forecast_budget(df, edited_data=None, rule_name="default"):
 
     # Прогнозный бюджет = утвержденный бюджет (но может быть изменен пользователем)
     # Если пользователь изменил утвержденный бюджет вручную, используем эти значения
-    forecast_budget_df = approved_budget_df.copy()
+    forecast_budget_df = approved_budget_df
 
     # Переименовываем колонку для ясности
     if "approved budget" in forecast_budget_df.columns:
-        forecast_budget_df["forecast budget"] = forecast_budget_df["approved budget"]
+        forecast_budget_df = forecast_budget_df.assign(
+            **{"forecast budget": forecast_budget_df["approved budget"]}
+        )
 
     return forecast_budget_df, None
 
@@ -8681,14 +8483,17 @@ def dashboard_forecast_budget(df):
         "Выберите проект", projects, key="forecast_budget_project"
     )
 
-    # Фильтруем данные по выбранному проекту
-    project_df = df[
-        df["project name"].astype(str).str.strip() == str(selected_project).strip()
-    ].copy()
-
-    if project_df.empty:
-        st.info("Нет данных для выбранного проекта.")
-        return
+    # Данные проекта фильтруются один раз и хранятся в session_state; на
+    # следующих rerun берутся оттуда без повторной фильтрации и копирования
+    # (названия очищены в load_data)
+    edited_data_key = f"forecast_edited_data_{selected_project}"
+    if edited_data_key not in st.session_state:
+        project_df = df[df["project name"] == selected_project]
+        if project_df.empty:
+            st.info("Нет данных для выбранного проекта.")
+            return
+        st.session_state[edited_data_key] = project_df
+    project_df = st.session_state[edited_data_key]
 
     # Проверяем наличие необходимых колонок
     required_cols = ["budget plan", "plan start", "plan end", "task name"]
@@ -8697,14 +8502,10 @@ def dashboard_forecast_budget(df):
         st.warning(f"Отсутствуют необходимые колонки: {', '.join(missing_cols)}")
         return
 
-    # Инициализируем session_state для хранения отредактированных данных
-    if f"forecast_edited_data_{selected_project}" not in st.session_state:
-        st.session_state[f"forecast_edited_data_{selected_project}"] = project_df.copy()
-
     # Инициализируем session_state для хранения отредактированной таблицы (для отображения)
     if f"forecast_edit_table_{selected_project}" not in st.session_state:
         # Подготавливаем данные для редактирования в первый раз
-        current_data = project_df.copy()
+        current_data = project_df
 
         # Проверяем наличие всех необходимых колонок
         required_cols = ["task name", "section", "plan start", "plan end", "budget plan"]
@@ -8717,21 +8518,14 @@ def dashboard_forecast_budget(df):
 
         edit_df = current_data[required_cols].copy()
 
-        # Конвертируем даты в datetime для корректного отображения
+        # Конвертируем даты в datetime и оставляем только дату для отображения
+        # (пустые даты остаются NaT)
         edit_df["plan start"] = pd.to_datetime(
             edit_df["plan start"], errors="coerce", dayfirst=True
-        )
+        ).dt.date
         edit_df["plan end"] = pd.to_datetime(
             edit_df["plan end"], errors="coerce", dayfirst=True
-        )
-
-        # Форматируем для отображения - только если дата не NaN
-        edit_df["plan start"] = edit_df["plan start"].apply(
-            lambda x: x.date() if pd.notna(x) else None
-        )
-        edit_df["plan end"] = edit_df["plan end"].apply(
-            lambda x: x.date() if pd.notna(x) else None
-        )
+        ).dt.date
 
         # Переименовываем колонки для удобства
         edit_df.columns = [
@@ -8773,54 +8567,21 @@ def dashboard_forecast_budget(df):
     with st.form("edit_tasks_form", clear_on_submit=False):
         st.subheader("Редактирование данных")
 
-        # Создаем поля для редактирования каждой задачи
-        edited_data = []
-        for idx, row in edit_df.iterrows():
-            with st.expander(f"Задача: {row['Задача']}", expanded=False):
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    plan_start = st.date_input(
-                        "План. начало",
-                        value=row['План. начало'] if pd.notna(row['План. начало']) else None,
-                        key=f"plan_start_{idx}"
-                    )
-
-                with col2:
-                    plan_end = st.date_input(
-                        "План. окончание",
-                        value=row['План. окончание'] if pd.notna(row['План. окончание']) else None,
-                        key=f"plan_end_{idx}"
-                    )
-
-                with col3:
-                    # Преобразуем значение бюджета в float, учитывая возможную запятую как разделитель
-                    budget_value = row['Плановый бюджет']
-                    if pd.notna(budget_value):
-                        # Если это строка, заменяем запятую на точку
-                        if isinstance(budget_value, str):
-                            budget_value = budget_value.replace(',', '.')
-                        try:
-                            budget_value = float(budget_value)
-                        except (ValueError, TypeError):
-                            budget_value = 0.0
-                    else:
-                        budget_value = 0.0
-
-                    budget = st.number_input(
-                        "Плановый бюджет",
-                        value=budget_value,
-                        step=1000.0,
-                        key=f"budget_{idx}"
-                    )
-
-                edited_data.append({
-                    "Задача": row['Задача'],
-                    "Раздел": row['Раздел'],
-                    "План. начало": plan_start,
-                    "План. окончание": plan_end,
-                    "Плановый бюджет": budget
-                })
+        # Одна таблица-редактор вместо expander и трех полей на каждую задачу:
+        # число виджетов не растет с количеством задач
+        edited_data = st.data_editor(
+            edit_df,
+            num_rows="fixed",
+            disabled=["Задача", "Раздел"],
+            column_config={
+                "План. начало": st.column_config.DateColumn("План. начало"),
+                "План. окончание": st.column_config.DateColumn("План. окончание"),
+                "Плановый бюджет": st.column_config.NumberColumn(
+                    "Плановый бюджет", step=1000.0
+                ),
+            },
+            key=f"forecast_editor_{selected_project}",
+        )
 
         # Кнопки формы должны быть вне колонок для корректной работы
         submitted = st.form_submit_button("✅ Применить изменения", type="primary", use_container_width=False)
@@ -8828,7 +8589,7 @@ def dashboard_forecast_budget(df):
 
         if submitted:
             # Обновляем данные
-            edited_df = pd.DataFrame(edited_data)
+            edited_df = edited_data
             st.session_state[f"forecast_edit_table_{selected_project}"] = edited_df.copy()
             st.success("✅ Изменения применены!")
             st.rerun()
@@ -8837,8 +8598,8 @@ def dashboard_forecast_budget(df):
     edited_df = st.session_state[f"forecast_edit_table_{selected_project}"].copy()
 
     # Обновляем исходные данные проекта с учетом изменений из формы
-    current_data = st.session_state[f"forecast_edited_data_{selected_project}"].copy()
-    updated_data = current_data.copy().reset_index(drop=True)
+    # (reset_index возвращает новый DataFrame, исходный в session_state не меняется)
+    updated_data = st.session_state[edited_data_key].reset_index(drop=True)
     edited_df_reset = edited_df.reset_index(drop=True)
 
     # Обновляем даты и бюджет по индексам
@@ -8858,7 +8619,7 @@ def dashboard_forecast_budget(df):
             )
 
         # Сохраняем обновленные данные в session_state
-        st.session_state[f"forecast_edited_data_{selected_project}"] = updated_data
+        st.session_state[edited_data_key] = updated_data
 
     # ВСЕГДА используем актуальные данные из отредактированной таблицы для расчета
     # Это позволяет видеть изменения сразу после применения
@@ -8866,7 +8627,7 @@ def dashboard_forecast_budget(df):
 
     # Рассчитываем прогнозный бюджет с актуальными данными
     forecast_budget_df, error = calculate_forecast_budget(
-        df, edited_data=current_data, rule_name="default"
+        current_data, rule_name="default"
     )
 
     if error:
@@ -8877,48 +8638,24 @@ def dashboard_forecast_budget(df):
         st.info("Нет данных для построения графика прогнозного бюджета.")
         return
 
-    # Группируем по месяцам для графика
+    # Группируем по месяцам для графика; groupby уже возвращает месяцы по
+    # возрастанию (сортировка по ordinal period[M]), отдельный sort не нужен
     monthly_forecast = (
         forecast_budget_df.groupby("month")
         .agg({"forecast budget": "sum", "budget plan": "sum"})  # Для сравнения
         .reset_index()
     )
 
-    # Сортируем по месяцам
-    monthly_forecast = monthly_forecast.sort_values("month")
-
-    # Форматируем месяц для отображения
-    def format_month_display(period_val):
-        if pd.isna(period_val):
-            return "Н/Д"
-        try:
-            if isinstance(period_val, pd.Period):
-                month_num = period_val.month
-                year = period_val.year
-                RUSSIAN_MONTHS = {
-                    1: "Январь",
-                    2: "Февраль",
-                    3: "Март",
-                    4: "Апрель",
-                    5: "Май",
-                    6: "Июнь",
-                    7: "Июль",
-                    8: "Август",
-                    9: "Сентябрь",
-                    10: "Октябрь",
-                    11: "Ноябрь",
-                    12: "Декабрь",
-                }
-                return f"{RUSSIAN_MONTHS.get(month_num, 'Н/Д')} {year}"
-            return str(period_val)
-        except:
-            return str(period_val)
-
-    monthly_forecast["Месяц"] = monthly_forecast["month"].apply(format_month_display)
+    # Форматируем месяц для отображения (month - period[M] из расчета бюджета)
+    monthly_forecast["Месяц"] = format_period_labels(monthly_forecast["month"])
 
     # Convert to millions
-    monthly_forecast["forecast budget_millions"] = (monthly_forecast["forecast budget"] / 1_000_000).round(2)
-    monthly_forecast["budget plan_millions"] = (monthly_forecast["budget plan"] / 1_000_000).round(2)
+    monthly_forecast["forecast budget_millions"] = np.round(
+        monthly_forecast["forecast budget"].to_numpy() / 1_000_000, 2
+    )
+    monthly_forecast["budget plan_millions"] = np.round(
+        monthly_forecast["budget plan"].to_numpy() / 1_000_000, 2
+    )
 
     # Создаем график
     fig = go.Figure()
@@ -8982,10 +8719,14 @@ def dashboard_forecast_budget(df):
                 "forecast budget",
             ]
         ].copy()
-        detail_table["month"] = detail_table["month"].apply(format_month_display)
+        detail_table["month"] = format_period_labels(detail_table["month"])
         # Convert to millions
-        detail_table["budget plan"] = (detail_table["budget plan"] / 1_000_000).round(2)
-        detail_table["forecast budget"] = (detail_table["forecast budget"] / 1_000_000).round(2)
+        detail_table["budget plan"] = np.round(
+            detail_table["budget plan"].to_numpy() / 1_000_000, 2
+        )
+        detail_table["forecast budget"] = np.round(
+            detail_table["forecast budget"].to_numpy() / 1_000_000, 2
+        )
         detail_table.columns = [
             "Проект",
             "Раздел",
@@ -8998,14 +8739,119 @@ def dashboard_forecast_budget(df):
         st.markdown(html_table, unsafe_allow_html=True)
 
 
+# Название панели -> функция отрисовки; словарь строится один раз при импорте
+DASHBOARD_RENDERERS = {
+    "Причины отклонений по месяцам": dashboard_reasons_of_deviation,
+    "Причины отклонений (по видам причин)": dashboard_dynamics_of_deviations,
+    "БДДС по месяцам": dashboard_budget_by_period,
+    "БДДС по лотам": dashboard_budget_by_section,
+    "БДДС накопительно": dashboard_budget_cumulative,
+    "БДДР по месяцам": dashboard_bddr_by_period,
+    "БДДР по лотам": dashboard_bddr_by_section,
+    "Бюджет План/Прогноз/Факт": dashboard_budget_by_type,
+    "Утвержденный бюджет": dashboard_approved_budget,
+    "Прогнозный бюджет": dashboard_forecast_budget,
+    "Отклонение текущего срока от базового плана": dashboard_plan_fact_dates,
+    "Значения отклонений от базового плана": dashboard_deviation_by_tasks_current_month,
+    "Динамика причин отклонений": dashboard_dynamics_of_reasons,
+    "Выдача рабочей/проектной документации": dashboard_documentation,
+    "Аналитика по технике": dashboard_technique,
+    "График движения рабочей силы": dashboard_workforce_movement,
+    "СКУД стройка": dashboard_skud_stroyka,
+}
+
+
+# Варианты панелей в группах выбора на главной странице
+REASON_DASHBOARD_OPTIONS = (
+    "Причины отклонений по месяцам",
+    "Причины отклонений (по видам причин)",
+    "Динамика причин отклонений",
+)
+BUDGET_DASHBOARD_OPTIONS = (
+    "БДДС по месяцам",
+    "БДДС по лотам",
+    "БДДС накопительно",
+    "БДДР по месяцам",
+    "БДДР по лотам",
+    "Утвержденный бюджет",
+    "Прогнозный бюджет",
+    "Бюджет План/Прогноз/Факт",
+)
+PLAN_FACT_DASHBOARD_OPTIONS = (
+    "Отклонение текущего срока от базового плана",
+    "Значения отклонений от базового плана",
+    "Причины отклонений по месяцам",
+    "Причины отклонений (по видам причин)",
+    "Динамика причин отклонений",
+)
+OTHER_DASHBOARD_OPTIONS = (
+    "Выдача рабочей/проектной документации",
+    "Аналитика по технике",
+    "График движения рабочей силы",
+    "СКУД стройка",
+)
+
+# Группы выбора в порядке приоритета: ключ st.radio и варианты панелей
+DASHBOARD_RADIO_GROUPS = (
+    ("reason_radio", REASON_DASHBOARD_OPTIONS),
+    ("budget_radio", BUDGET_DASHBOARD_OPTIONS),
+    ("plan_fact_radio", PLAN_FACT_DASHBOARD_OPTIONS),
+    ("other_radio", OTHER_DASHBOARD_OPTIONS),
+)
+
+# Позиции вариантов в каждой группе: ключ st.radio -> {панель: индекс}
+DASHBOARD_OPTION_INDEX = {
+    key: {option: i for i, option in enumerate(options)}
+    for key, options in DASHBOARD_RADIO_GROUPS
+}
+
+# Раздел (expander) страницы выбора, в котором находится панель
+DASHBOARD_SECTIONS = {
+    **dict.fromkeys(OTHER_DASHBOARD_OPTIONS, "other"),
+    **dict.fromkeys(BUDGET_DASHBOARD_OPTIONS, "budget"),
+    **dict.fromkeys(
+        PLAN_FACT_DASHBOARD_OPTIONS + REASON_DASHBOARD_OPTIONS, "plan_fact"
+    ),
+}
+
+
+@st.fragment
+def render_dashboard_fragment(selected_dashboard, df):
+    """
+    Отрисовывает выбранную панель как фрагмент Streamlit.
+
+    Изменение фильтров внутри панели перезапускает только эту функцию: загрузка
+    файлов, меню и стили страницы при этом не выполняются заново.
+
+    Args:
+        selected_dashboard: Название панели (ключ DASHBOARD_RENDERERS)
+        df: DataFrame с данными проекта
+    """
+    try:
+        DASHBOARD_RENDERERS[selected_dashboard](df)
+    except Exception as e:
+        st.error(f"Ошибка при отображении графика '{selected_dashboard}': {str(e)}")
+        st.exception(e)
+
+
 # ==================== MAIN APP ====================
-def main():
-    # Проверка авторизации - если не авторизован, показываем форму входа
-    if not check_authentication():
-        # Скрываем боковую панель на странице входа и настраиваем ширину формы
-        st.markdown(
-            """
-            <style>
+def minify_css(css):
+    """
+    Сжимает CSS: убирает комментарии и лишние пробелы.
+
+    Args:
+        css: Текст CSS
+
+    Returns:
+        Строка CSS без комментариев и переносов строк
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};,])\s*", r"\1", css).strip()
+
+
+# Стили страницы входа (исходный вид для правки)
+LOGIN_PAGE_CSS = """
             /* Фон приложения - новый цвет */
             .stApp {
                 background-color: #12385C !important;
@@ -9130,13 +8976,11 @@ def main():
             }
 
             /* Стилизация кнопок - фон цвета основного фона #12385C */
+            /* Одно правило на все кнопки: копии с префиксами form и
+               [data-testid="column"] задавали те же значения */
             .stButton > button {
                 width: 100% !important;
-                min-width: 100% !important;
-                max-width: 100% !important;
-                min-height: 45px !important;
                 height: 45px !important;
-                max-height: 45px !important;
                 background-color: #12385C !important;
                 color: #ffffff !important;
                 border: 1px solid rgba(255, 255, 255, 0.3) !important;
@@ -9174,73 +9018,7 @@ def main():
                 border-color: rgba(255, 255, 255, 0.5) !important;
             }
             /* Стилизация внутренних элементов кнопки */
-            .stButton > button > div,
-            .stButton > button > span,
-            .stButton > button > p {
-                margin: 0 !important;
-                padding: 0.5rem 1rem !important;
-                line-height: 1 !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                max-width: 100% !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            /* Убеждаемся, что кнопки в колонках имеют одинаковую ширину и высоту */
-            [data-testid="column"] .stButton > button {
-                width: 100% !important;
-                min-width: 100% !important;
-                max-width: 100% !important;
-                min-height: 45px !important;
-                height: 45px !important;
-                max-height: 45px !important;
-                padding: 0 !important;
-                box-sizing: border-box !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                line-height: 1 !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            /* Стилизация внутренних элементов кнопки в колонках */
-            [data-testid="column"] .stButton > button > div,
-            [data-testid="column"] .stButton > button > span,
-            [data-testid="column"] .stButton > button > p {
-                margin: 0 !important;
-                padding: 0.5rem 1rem !important;
-                line-height: 1 !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                max-width: 100% !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            /* Кнопки в формах также должны иметь одинаковую высоту и ширину */
-            form .stButton > button {
-                min-height: 45px !important;
-                height: 45px !important;
-                max-height: 45px !important;
-                width: 100% !important;
-                padding: 0 !important;
-                box-sizing: border-box !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                line-height: 1 !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            /* Стилизация внутренних элементов кнопки в формах */
-            form .stButton > button > div,
-            form .stButton > button > span,
-            form .stButton > button > p {
+            .stButton > button > :is(div, span, p) {
                 margin: 0 !important;
                 padding: 0.5rem 1rem !important;
                 line-height: 1 !important;
@@ -9252,279 +9030,259 @@ def main():
                 align-items: center !important;
                 justify-content: center !important;
             }
-            /* Дополнительно для кнопок в колонках формы входа */
-            form [data-testid="column"] .stButton > button {
-                width: 100% !important;
-                min-width: 100% !important;
-                max-width: 100% !important;
-                min-height: 45px !important;
-                height: 45px !important;
-                max-height: 45px !important;
-                padding: 0 !important;
-                box-sizing: border-box !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                line-height: 1 !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            /* Стилизация внутренних элементов кнопки в колонках формы входа */
-            form [data-testid="column"] .stButton > button > div,
-            form [data-testid="column"] .stButton > button > span,
-            form [data-testid="column"] .stButton > button > p {
-                margin: 0 !important;
-                padding: 0.5rem 1rem !important;
-                line-height: 1 !important;
-                white-space: nowrap !important;
-                overflow: hidden !important;
-                text-overflow: ellipsis !important;
-                max-width: 100% !important;
-                display: flex !important;
-                align-items: center !important;
-                justify-content: center !important;
-            }
-            </style>
-            <script>
-            // Принудительно применяем ширину контейнера после загрузки
-            function setContainerWidth() {
-                const containers = document.querySelectorAll('.main .block-container, .main > div');
-                containers.forEach(container => {
-                    container.style.setProperty('max-width', '75%', 'important');
-                    container.style.setProperty('width', '75%', 'important');
-                    container.style.setProperty('margin-left', 'auto', 'important');
-                    container.style.setProperty('margin-right', 'auto', 'important');
-                });
-            }
-            // Применяем сразу и после загрузки DOM
-            if (document.readyState === 'loading') {
-                document.addEventListener('DOMContentLoaded', setContainerWidth);
-            } else {
-                setContainerWidth();
-            }
-            // Также применяем после небольшой задержки для Streamlit
-            setTimeout(setContainerWidth, 100);
-            setTimeout(setContainerWidth, 500);
-            setTimeout(setContainerWidth, 1000);
-            // Наблюдаем за изменениями DOM (Streamlit динамически обновляет страницу)
-            const observer = new MutationObserver(setContainerWidth);
-            observer.observe(document.body, { childList: true, subtree: true });
-            </script>
-        """,
-            unsafe_allow_html=True,
-        )
+"""
+
+# Готовый блок страницы входа: CSS сжимается один раз при импорте модуля,
+# поэтому на каждом rerun передается компактная строка. Ширина формы (75%)
+# задается только правилами .main .block-container / .main > div, без скрипта
+LOGIN_PAGE_STYLE = f"<style>{minify_css(LOGIN_PAGE_CSS)}</style>"
+
+# Значения session_state по умолчанию: восстановление пароля и загруженные данные
+SESSION_STATE_DEFAULTS = {
+    "reset_mode": False,
+    "reset_token": None,
+    "project_data": None,
+    "resources_data": None,
+    "technique_data": None,
+    "loaded_files_info": {},
+    "previous_uploaded_files": [],
+}
 
-        # Заголовок страницы входа
-        st.markdown(
-            """
-            <div style="text-align: center; margin-bottom: 2rem;">
-                <h1 style="color: #ffffff; font-size: 3rem; margin-bottom: 0.5rem;">🔐</h1>
-                <h1 style="color: #ffffff; font-size: 2rem; margin-bottom: 0.5rem;">BI Analytics</h1>
-                <p style="color: #a0a0a0; font-size: 1.1rem;">Войдите в систему для доступа к панели аналитики</p>
-            </div>
-        """,
-            unsafe_allow_html=True,
-        )
 
-        # Инициализация переменных для восстановления пароля
-        if "reset_mode" not in st.session_state:
+def init_session_state():
+    """
+    Заполняет отсутствующие ключи st.session_state значениями по умолчанию.
+
+    Изменяемые значения ({} и []) копируются, чтобы сессии не делили
+    один и тот же объект из SESSION_STATE_DEFAULTS.
+    """
+    for key, default in SESSION_STATE_DEFAULTS.items():
+        st.session_state.setdefault(key, copy.copy(default))
+
+
+@st.fragment
+def render_login_form():
+    """
+    Форма входа и восстановления пароля.
+
+    Выполняется как фрагмент: кнопки режима восстановления перезапускают
+    только форму (st.rerun(scope="fragment")), а стили и заголовок страницы
+    входа не отправляются заново. Перезапуск всего приложения нужен только
+    после успешного входа.
+    """
+    # Режим восстановления пароля по токену
+    if st.session_state.reset_mode and st.session_state.reset_token:
+        st.subheader("Восстановление пароля")
+
+        token = st.session_state.reset_token
+        username = verify_reset_token(token)
+
+        if not username:
+            st.error("⚠️ Токен восстановления недействителен или истек")
             st.session_state.reset_mode = False
-        if "reset_token" not in st.session_state:
             st.session_state.reset_token = None
+            if st.button("Вернуться к входу"):
+                st.rerun(scope="fragment")
+            return
 
-        # Режим восстановления пароля по токену
-        if st.session_state.reset_mode and st.session_state.reset_token:
-            st.subheader("Восстановление пароля")
+        st.info(f"Восстановление пароля для пользователя: **{username}**")
 
-            token = st.session_state.reset_token
-            username = verify_reset_token(token)
+        new_password = st.text_input(
+            "Новый пароль", type="password", key="new_password"
+        )
+        confirm_password = st.text_input(
+            "Подтвердите пароль", type="password", key="confirm_password"
+        )
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            if st.button("Сбросить пароль", type="primary"):
+                if not new_password or len(new_password) < 6:
+                    st.error("Пароль должен содержать минимум 6 символов")
+                elif new_password != confirm_password:
+                    st.error("Пароли не совпадают")
+                else:
+                    if reset_password(token, new_password):
+                        st.success("✅ Пароль успешно изменен!")
+                        st.info("Теперь вы можете войти с новым паролем")
+                        st.session_state.reset_mode = False
+                        st.session_state.reset_token = None
+                        if st.button("Перейти к входу"):
+                            st.rerun(scope="fragment")
+                    else:
+                        st.error("Ошибка при сбросе пароля")
 
-            if not username:
-                st.error("⚠️ Токен восстановления недействителен или истек")
+        with col2:
+            if st.button("Отмена"):
                 st.session_state.reset_mode = False
                 st.session_state.reset_token = None
-                if st.button("Вернуться к входу"):
-                    st.rerun()
-                st.stop()
+                st.rerun(scope="fragment")
+        return
 
-            st.info(f"Восстановление пароля для пользователя: **{username}**")
+    # Режим запроса восстановления пароля
+    elif st.session_state.reset_mode:
+        st.subheader("Восстановление пароля")
 
-            new_password = st.text_input(
-                "Новый пароль", type="password", key="new_password"
-            )
-            confirm_password = st.text_input(
-                "Подтвердите пароль", type="password", key="confirm_password"
+        tab1, tab2 = st.tabs(["По имени пользователя", "По токену"])
+
+        with tab1:
+            username = st.text_input(
+                "Введите имя пользователя", key="reset_username"
             )
 
             col1, col2 = st.columns(2)
 
             with col1:
-                if st.button("Сбросить пароль", type="primary"):
-                    if not new_password or len(new_password) < 6:
-                        st.error("Пароль должен содержать минимум 6 символов")
-                    elif new_password != confirm_password:
-                        st.error("Пароли не совпадают")
-                    else:
-                        if reset_password(token, new_password):
-                            st.success("✅ Пароль успешно изменен!")
-                            st.info("Теперь вы можете войти с новым паролем")
-                            st.session_state.reset_mode = False
-                            st.session_state.reset_token = None
-                            if st.button("Перейти к входу"):
-                                st.rerun()
+                if st.button("Создать токен восстановления", type="primary"):
+                    if username:
+                        user = get_user_by_username(username)
+                        if user:
+                            token = generate_reset_token(username)
+                            if token:
+                                st.success("✅ Токен восстановления создан!")
+                                st.info(f"**Токен восстановления:** `{token}`")
+                                st.warning(
+                                    "⚠️ В реальном приложении токен будет отправлен на email пользователя"
+                                )
+                                st.info(
+                                    "Для демонстрации скопируйте токен и используйте вкладку 'По токену'"
+                                )
+
+                                st.session_state.reset_token = token
+                                st.rerun(scope="fragment")
+                            else:
+                                st.error("Ошибка при создании токена")
                         else:
-                            st.error("Ошибка при сбросе пароля")
+                            st.error("Пользователь не найден")
+                    else:
+                        st.warning("Введите имя пользователя")
 
             with col2:
                 if st.button("Отмена"):
                     st.session_state.reset_mode = False
-                    st.session_state.reset_token = None
-                    st.rerun()
-            st.stop()
-
-        # Режим запроса восстановления пароля
-        elif st.session_state.reset_mode:
-            st.subheader("Восстановление пароля")
+                    st.rerun(scope="fragment")
 
-            tab1, tab2 = st.tabs(["По имени пользователя", "По токену"])
-
-            with tab1:
-                username = st.text_input(
-                    "Введите имя пользователя", key="reset_username"
-                )
+        with tab2:
+            token_input = st.text_input(
+                "Введите токен восстановления", key="token_input"
+            )
 
-                col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
 
-                with col1:
-                    if st.button("Создать токен восстановления", type="primary"):
+            with col1:
+                if st.button("Использовать токен", type="primary"):
+                    if token_input:
+                        username = verify_reset_token(token_input)
                         if username:
-                            user = get_user_by_username(username)
-                            if user:
-                                token = generate_reset_token(username)
-                                if token:
-                                    st.success("✅ Токен восстановления создан!")
-                                    st.info(f"**Токен восстановления:** `{token}`")
-                                    st.warning(
-                                        "⚠️ В реальном приложении токен будет отправлен на email пользователя"
-                                    )
-                                    st.info(
-                                        "Для демонстрации скопируйте токен и используйте вкладку 'По токену'"
-                                    )
-
-                                    st.session_state.reset_token = token
-                                    st.rerun()
-                                else:
-                                    st.error("Ошибка при создании токена")
-                            else:
-                                st.error("Пользователь не найден")
+                            st.session_state.reset_token = token_input
+                            st.rerun(scope="fragment")
                         else:
-                            st.warning("Введите имя пользователя")
+                            st.error("⚠️ Токен недействителен или истек")
+                    else:
+                        st.warning("Введите токен")
 
-                with col2:
-                    if st.button("Отмена"):
-                        st.session_state.reset_mode = False
-                        st.rerun()
+            with col2:
+                if st.button("Отмена", key="cancel_token"):
+                    st.session_state.reset_mode = False
+                    st.rerun(scope="fragment")
+
+        st.markdown("---")
+        if st.button("← Вернуться к входу"):
+            st.session_state.reset_mode = False
+            st.rerun(scope="fragment")
+        return
+
+    # Режим входа
+    else:
+        # Форма входа в центрированном контейнере (50% ширины экрана)
+        # Используем пустые колонки для центрирования
+        col_left, col_center, col_right = st.columns([1, 1, 1])
+        with col_center:
+            with st.form("login_form", clear_on_submit=False):
+                st.markdown("### Вход в систему")
+                st.markdown("---")
 
-            with tab2:
-                token_input = st.text_input(
-                    "Введите токен восстановления", key="token_input"
+                username = st.text_input(
+                    "👤 Имя пользователя",
+                    key="login_username",
+                    placeholder="Введите имя пользователя",
+                    autocomplete="username",
+                )
+
+                password = st.text_input(
+                    "🔒 Пароль",
+                    type="password",
+                    key="login_password",
+                    placeholder="Введите пароль",
+                    autocomplete="current-password",
                 )
 
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    if st.button("Использовать токен", type="primary"):
-                        if token_input:
-                            username = verify_reset_token(token_input)
-                            if username:
-                                st.session_state.reset_token = token_input
-                                st.rerun()
-                            else:
-                                st.error("⚠️ Токен недействителен или истек")
-                        else:
-                            st.warning("Введите токен")
+                    submit_button = st.form_submit_button(
+                        "🚀 Войти", type="primary", use_container_width=True
+                    )
 
                 with col2:
-                    if st.button("Отмена", key="cancel_token"):
-                        st.session_state.reset_mode = False
-                        st.rerun()
+                    if st.form_submit_button(
+                        "❓ Забыли пароль?", use_container_width=True
+                    ):
+                        st.session_state.reset_mode = True
+                        st.rerun(scope="fragment")
+
+                if submit_button:
+                    if username and password:
+                        success, user = authenticate(username, password)
+                        if success and user:
+                            st.session_state.authenticated = True
+                            st.session_state.user = user
+                            # Тост переживает rerun, поэтому ждать перед ним не нужно
+                            st.toast(f"✅ Добро пожаловать, {user['username']}!")
+                            st.rerun()
+                        else:
+                            st.error("❌ Неверное имя пользователя или пароль")
+                    else:
+                        st.warning("⚠️ Заполните все поля")
 
             st.markdown("---")
-            if st.button("← Вернуться к входу"):
-                st.session_state.reset_mode = False
-                st.rerun()
-            st.stop()
 
-        # Режим входа
-        else:
-            # Форма входа в центрированном контейнере (50% ширины экрана)
-            # Используем пустые колонки для центрирования
-            col_left, col_center, col_right = st.columns([1, 1, 1])
-            with col_center:
-                with st.form("login_form", clear_on_submit=False):
-                    st.markdown("### Вход в систему")
-                    st.markdown("---")
-
-                    username = st.text_input(
-                        "👤 Имя пользователя",
-                        key="login_username",
-                        placeholder="Введите имя пользователя",
-                        autocomplete="username",
-                    )
-
-                    password = st.text_input(
-                        "🔒 Пароль",
-                        type="password",
-                        key="login_password",
-                        placeholder="Введите пароль",
-                        autocomplete="current-password",
-                    )
-
-                    col1, col2 = st.columns(2)
-
-                    with col1:
-                        submit_button = st.form_submit_button(
-                            "🚀 Войти", type="primary", use_container_width=True
-                        )
+            # Информация о демо-доступе
+            with st.expander("ℹ️ Демо-доступ", expanded=False):
+                st.markdown(
+                    """
+                **Тестовые учетные данные:**
+                - **Имя пользователя:** `admin`
+                - **Пароль:** `admin123`
+                - **Роль:** Суперадминистратор
+                """
+                )
 
-                    with col2:
-                        if st.form_submit_button(
-                            "❓ Забыли пароль?", use_container_width=True
-                        ):
-                            st.session_state.reset_mode = True
-                            st.rerun()
 
-                    if submit_button:
-                        if username and password:
-                            success, user = authenticate(username, password)
-                            if success and user:
-                                st.session_state.authenticated = True
-                                st.session_state.user = user
-                                st.success(f"✅ Добро пожаловать, {user['username']}!")
-                                st.balloons()
-                                import time
-
-                                time.sleep(1)
-                                st.rerun()
-                            else:
-                                st.error("❌ Неверное имя пользователя или пароль")
-                        else:
-                            st.warning("⚠️ Заполните все поля")
+def main():
+    init_session_state()
 
-                st.markdown("---")
+    # Проверка авторизации - если не авторизован, показываем форму входа
+    if not check_authentication():
+        # Скрываем боковую панель на странице входа и настраиваем ширину формы.
+        # Стили выводятся на каждом rerun: Streamlit удаляет элементы, которые
+        # не были отрисованы в текущем прогоне. Чистый HTML/CSS выводится через
+        # st.html, минуя разбор markdown
+        st.html(LOGIN_PAGE_STYLE)
 
-                # Информация о демо-доступе
-                with st.expander("ℹ️ Демо-доступ", expanded=False):
-                    st.markdown(
-                        """
-                    **Тестовые учетные данные:**
-                    - **Имя пользователя:** `admin`
-                    - **Пароль:** `admin123`
-                    - **Роль:** Суперадминистратор
-                    """
-                    )
+        # Заголовок страницы входа
+        st.html(
+            """
+            <div style="text-align: center; margin-bottom: 2rem;">
+                <h1 style="color: #ffffff; font-size: 3rem; margin-bottom: 0.5rem;">🔐</h1>
+                <h1 style="color: #ffffff; font-size: 2rem; margin-bottom: 0.5rem;">BI Analytics</h1>
+                <p style="color: #a0a0a0; font-size: 1.1rem;">Войдите в систему для доступа к панели аналитики</p>
+            </div>
+        """
+        )
 
+        render_login_form()
         st.stop()
 
     user = get_current_user()
@@ -9547,14 +9305,20 @@ def main():
             st.rerun()
         st.stop()
 
-    st.markdown(
-        '<h1 class="main-header">📊 Панель аналитики проектов</h1>',
-        unsafe_allow_html=True,
-    )
+    st.html('<h1 class="main-header">📊 Панель аналитики проектов</h1>')
 
     # Боковая панель с меню навигации
     render_sidebar_menu(current_page="reports")
 
+    # Режим отладки доступен только администраторам: включает диагностические
+    # таблицы панелей (st.session_state["debug_mode"])
+    if has_admin_access(user["role"]):
+        st.sidebar.checkbox(
+            "🐞 Режим отладки",
+            key="debug_mode",
+            help="Показывать диагностические данные в панелях",
+        )
+
     # Загрузка данных - перенесена в основную область
     uploaded_files = st.file_uploader(
         "📁 Загрузите файлы с данными (можно несколько)",
@@ -9563,42 +9327,31 @@ def main():
         help="Загрузите CSV или Excel файлы с данными проекта, ресурсов или техники",
     )
 
-    # Initialize session state for storing different data types
-    if "project_data" not in st.session_state:
-        st.session_state.project_data = None
-    if "resources_data" not in st.session_state:
-        st.session_state.resources_data = None
-    if "technique_data" not in st.session_state:
-        st.session_state.technique_data = None
-    if "loaded_files_info" not in st.session_state:
-        st.session_state.loaded_files_info = {}
-    if "previous_uploaded_files" not in st.session_state:
-        st.session_state.previous_uploaded_files = []
-
     # Initialize df variable
     df = None
 
-    # Track uploaded files to distinguish between rerun and user removing files
-    current_file_names = [f.name for f in uploaded_files] if uploaded_files else []
-
     # Don't clear data automatically after rerun - keep it for navigation
     # After st.rerun(), uploaded_files will be None/empty, but data in session_state persists
     # This allows navigation in sidebar to work after CSV files are loaded
     # Data will only be cleared if user explicitly removes files through UI
     # (which is handled in the file processing section below)
 
-    if uploaded_files is not None and len(uploaded_files) > 0:
-        # Get list of current file names
-        current_file_names = [f.name for f in uploaded_files]
+    if uploaded_files:
+        # Content hash of every current file: a file re-uploaded under the same
+        # name with different content must be reloaded, not skipped
+        current_file_hashes = {
+            f.name: hashlib.blake2b(f.getvalue(), digest_size=16).hexdigest()
+            for f in uploaded_files
+        }
 
-        # Remove info for files that are no longer uploaded
+        # Remove info for files that are no longer uploaded or have changed
         files_to_remove = [
             f
-            for f in st.session_state.loaded_files_info.keys()
-            if f not in current_file_names
+            for f, info in st.session_state.loaded_files_info.items()
+            if info.get("hash") != current_file_hashes.get(f)
         ]
         for file_name in files_to_remove:
-            file_info = st.session_state.loaded_files_info[file_name]
+            file_info = st.session_state.loaded_files_info.pop(file_name)
             file_type = file_info["type"]
 
             # Clear the corresponding data
@@ -9609,8 +9362,6 @@ def main():
             elif file_type == "technique":
                 st.session_state.technique_data = None
 
-            del st.session_state.loaded_files_info[file_name]
-
         # Reset and reload data if files changed
         if files_to_remove:
             # Clear all data and reload from remaining files
@@ -9619,14 +9370,16 @@ def main():
             st.session_state.technique_data = None
             st.session_state.loaded_files_info = {}
 
-        # Process each uploaded file
+        # Process each uploaded file; new frames are collected per data type and
+        # concatenated once after the loop instead of re-copying the accumulated
+        # data for every file
+        new_frames = {"project": [], "resources": [], "technique": []}
         for uploaded_file in uploaded_files:
             file_id = uploaded_file.name
 
-            # Skip if already processed and file hasn't changed
+            # Skip if already processed and file hasn't changed (changed files
+            # were dropped from loaded_files_info above)
             if file_id in st.session_state.loaded_files_info:
-                # Check if file content might have changed by checking file size
-                # For now, we'll reload if files were removed (handled above)
                 continue
 
             df = load_data(uploaded_file, file_id)
@@ -9635,54 +9388,42 @@ def main():
                 data_type = df.attrs.get("data_type", "project")
 
                 # Store data based on type
-                if data_type == "project":
-                    if st.session_state.project_data is None:
-                        st.session_state.project_data = df
-                    else:
-                        # Concatenate if multiple project files
-                        st.session_state.project_data = pd.concat(
-                            [st.session_state.project_data, df], ignore_index=True
-                        )
-                    st.session_state.loaded_files_info[file_id] = {
-                        "type": "project",
-                        "rows": len(df),
-                        "columns": list(df.columns),
-                    }
-                elif data_type == "resources":
-                    if st.session_state.resources_data is None:
-                        st.session_state.resources_data = df
-                    else:
-                        st.session_state.resources_data = pd.concat(
-                            [st.session_state.resources_data, df], ignore_index=True
-                        )
+                if data_type in new_frames:
+                    new_frames[data_type].append(df)
                     st.session_state.loaded_files_info[file_id] = {
-                        "type": "resources",
-                        "rows": len(df),
-                        "columns": list(df.columns),
-                    }
-                elif data_type == "technique":
-                    if st.session_state.technique_data is None:
-                        st.session_state.technique_data = df
-                    else:
-                        st.session_state.technique_data = pd.concat(
-                            [st.session_state.technique_data, df], ignore_index=True
-                        )
-                    st.session_state.loaded_files_info[file_id] = {
-                        "type": "technique",
+                        "type": data_type,
                         "rows": len(df),
                         "columns": list(df.columns),
+                        "hash": current_file_hashes[file_id],
                     }
 
+        for data_type, frames in new_frames.items():
+            if not frames:
+                continue
+            state_key = f"{data_type}_data"
+            existing = st.session_state[state_key]
+            if existing is not None:
+                frames = [existing] + frames
+            # A single frame is stored as is (keeps its attrs); multiple files
+            # of one type are concatenated in one pass
+            st.session_state[state_key] = (
+                frames[0]
+                if len(frames) == 1
+                else pd.concat(frames, ignore_index=True)
+            )
+
     # Use project data as main df for backward compatibility
     df = st.session_state.project_data
 
     # Dashboard selection - allow access if any data is loaded (project, resources, or technique)
-    has_project_data = df is not None and not df.empty
-    resources_data = st.session_state.get("resources_data")
-    technique_data = st.session_state.get("technique_data")
-    has_resources_data = resources_data is not None and not resources_data.empty
-    has_technique_data = technique_data is not None and not technique_data.empty
-    has_any_data = has_project_data or has_resources_data or has_technique_data
+    has_any_data = any(
+        data is not None and len(data.index) > 0
+        for data in (
+            df,
+            st.session_state.resources_data,
+            st.session_state.technique_data,
+        )
+    )
 
     if has_any_data:
         # Initialize session state for dashboard selection
@@ -9711,48 +9452,12 @@ def main():
                 st.session_state.dashboard_selected_from_menu = False
 
             # Route to selected dashboard
-            try:
-                if selected_dashboard == "Причины отклонений по месяцам":
-                    dashboard_reasons_of_deviation(df)
-                elif selected_dashboard == "Причины отклонений (по видам причин)":
-                    dashboard_dynamics_of_deviations(df)
-                elif selected_dashboard == "БДДС по месяцам":
-                    dashboard_budget_by_period(df)
-                elif selected_dashboard == "БДДС по лотам":
-                    dashboard_budget_by_section(df)
-                elif selected_dashboard == "БДДС накопительно":
-                    dashboard_budget_cumulative(df)
-                elif selected_dashboard == "Бюджет План/Прогноз/Факт":
-                    dashboard_budget_by_type(df)
-                elif selected_dashboard == "Утвержденный бюджет":
-                    dashboard_approved_budget(df)
-                elif selected_dashboard == "Прогнозный бюджет":
-                    dashboard_forecast_budget(df)
-                elif (
-                    selected_dashboard == "Отклонение текущего срока от базового плана"
-                ):
-                    dashboard_plan_fact_dates(df)
-                elif selected_dashboard == "Значения отклонений от базового плана":
-                    dashboard_deviation_by_tasks_current_month(df)
-                elif selected_dashboard == "Динамика причин отклонений":
-                    dashboard_dynamics_of_reasons(df)
-                elif selected_dashboard == "Выдача рабочей/проектной документации":
-                    dashboard_documentation(df)
-                elif selected_dashboard == "Аналитика по технике":
-                    dashboard_technique(df)
-                elif selected_dashboard == "График движения рабочей силы":
-                    dashboard_workforce_movement(df)
-                elif selected_dashboard == "СКУД стройка":
-                    dashboard_skud_stroyka(df)
-                else:
-                    st.warning(
-                        f"График '{selected_dashboard}' не найден. Пожалуйста, выберите другой график."
-                    )
-            except Exception as e:
-                st.error(
-                    f"Ошибка при отображении графика '{selected_dashboard}': {str(e)}"
+            if selected_dashboard in DASHBOARD_RENDERERS:
+                render_dashboard_fragment(selected_dashboard, df)
+            else:
+                st.warning(
+                    f"График '{selected_dashboard}' не найден. Пожалуйста, выберите другой график."
                 )
-                st.exception(e)
 
             # Stop here - don't show selection panels
             st.stop()
@@ -9760,205 +9465,91 @@ def main():
         # Выбор панели - перенесен в основную область
         st.markdown("### 📊 Выбор панели")
 
-        # Define all options
-        reason_options = [
-            "Причины отклонений по месяцам",
-            "Причины отклонений (по видам причин)",
-            "Динамика причин отклонений",
-        ]
-        budget_options = [
-            "БДДС по месяцам",
-            "БДДС по лотам",
-            "БДДС накопительно",
-            "БДДР по месяцам",
-            "БДДР по лотам",
-            "Утвержденный бюджет",
-            "Прогнозный бюджет",
-            "Бюджет План/Прогноз/Факт",
-        ]
-        plan_fact_options = [
-            "Отклонение текущего срока от базового плана",
-            "Значения отклонений от базового плана",
-            "Причины отклонений по месяцам",
-            "Причины отклонений (по видам причин)",
-            "Динамика причин отклонений",
-        ]
-        other_options = [
-            "Выдача рабочей/проектной документации",
-            "Аналитика по технике",
-            "График движения рабочей силы",
-            "СКУД стройка",
-        ]
-
         # Determine current selection indices based on current_dashboard
         # Also sync radio button values in session_state when dashboard is selected from menu
-        dashboard_selected_from_menu = st.session_state.get(
-            "dashboard_selected_from_menu", False
-        )
-
-        # Determine indices and sync session_state for radio buttons
-        # When dashboard is selected from menu, we need to ensure radio buttons reflect the selection
-        current_dashboard = st.session_state.get("current_dashboard", "")
+        # (dashboard_selected_from_menu and current_dashboard were read above and
+        # are unchanged at this point)
 
         # If dashboard was selected from menu, sync all radio buttons
         # We need to set the actual option value, not the index, for Streamlit radio buttons
         if dashboard_selected_from_menu and current_dashboard:
-            # Set the selected radio button to the correct value (not index)
-            if current_dashboard in reason_options:
-                st.session_state.reason_radio = current_dashboard
-                # Reset other radio buttons to first option value
-                if budget_options:
-                    st.session_state.budget_radio = budget_options[0]
-                if plan_fact_options:
-                    st.session_state.plan_fact_radio = plan_fact_options[0]
-                if other_options:
-                    st.session_state.other_radio = other_options[0]
-            elif current_dashboard in budget_options:
-                st.session_state.budget_radio = current_dashboard
-                # Reset other radio buttons to first option value
-                if reason_options:
-                    st.session_state.reason_radio = reason_options[0]
-                if plan_fact_options:
-                    st.session_state.plan_fact_radio = plan_fact_options[0]
-                if other_options:
-                    st.session_state.other_radio = other_options[0]
-            elif current_dashboard in plan_fact_options:
-                st.session_state.plan_fact_radio = current_dashboard
-                # Reset other radio buttons to first option value
-                if reason_options:
-                    st.session_state.reason_radio = reason_options[0]
-                if budget_options:
-                    st.session_state.budget_radio = budget_options[0]
-                if other_options:
-                    st.session_state.other_radio = other_options[0]
-            elif current_dashboard in other_options:
-                st.session_state.other_radio = current_dashboard
-                # Reset other radio buttons to first option value
-                if reason_options:
-                    st.session_state.reason_radio = reason_options[0]
-                if budget_options:
-                    st.session_state.budget_radio = budget_options[0]
-                if plan_fact_options:
-                    st.session_state.plan_fact_radio = plan_fact_options[0]
+            # The first group containing the dashboard gets it selected,
+            # other radio buttons are reset to their first option value
+            selected_key = next(
+                (
+                    key
+                    for key, positions in DASHBOARD_OPTION_INDEX.items()
+                    if current_dashboard in positions
+                ),
+                None,
+            )
+            if selected_key is not None:
+                for key, options in DASHBOARD_RADIO_GROUPS:
+                    st.session_state[key] = (
+                        current_dashboard if key == selected_key else options[0]
+                    )
 
         # Determine indices from session_state or current_dashboard
         # Streamlit radio stores the actual option value, not the index
-        # So we need to find the index of the value in the options list
-        reason_index = 0
-        if current_dashboard in reason_options:
-            reason_index = reason_options.index(current_dashboard)
-        elif "reason_radio" in st.session_state:
-            try:
-                # session_state contains the actual option value, not index
-                if st.session_state.reason_radio in reason_options:
-                    reason_index = reason_options.index(st.session_state.reason_radio)
-                else:
-                    # If value is not in options, use default
-                    reason_index = 0
-            except (ValueError, TypeError, IndexError):
-                reason_index = 0
-
-        budget_index = 0
-        if current_dashboard in budget_options:
-            budget_index = budget_options.index(current_dashboard)
-        elif "budget_radio" in st.session_state:
-            try:
-                if st.session_state.budget_radio in budget_options:
-                    budget_index = budget_options.index(st.session_state.budget_radio)
-                else:
-                    budget_index = 0
-            except (ValueError, TypeError, IndexError):
-                budget_index = 0
-
-        plan_fact_index = 0
-        if current_dashboard in plan_fact_options:
-            plan_fact_index = plan_fact_options.index(current_dashboard)
-        elif "plan_fact_radio" in st.session_state:
-            try:
-                if st.session_state.plan_fact_radio in plan_fact_options:
-                    plan_fact_index = plan_fact_options.index(
-                        st.session_state.plan_fact_radio
-                    )
-                else:
-                    plan_fact_index = 0
-            except (ValueError, TypeError, IndexError):
-                plan_fact_index = 0
-
-        other_index = 0
-        if current_dashboard in other_options:
-            other_index = other_options.index(current_dashboard)
-        elif "other_radio" in st.session_state:
-            try:
-                if st.session_state.other_radio in other_options:
-                    other_index = other_options.index(st.session_state.other_radio)
-                else:
-                    other_index = 0
-            except (ValueError, TypeError, IndexError):
-                other_index = 0
-
-        # Определяем, какой expander должен быть развернут при выборе из меню
-        current_dashboard = st.session_state.get("current_dashboard", "")
-
-        # По умолчанию разворачиваем блок «Отклонения от базового плана»
-        expand_plan_fact = True
-        expand_budget = False
-        expand_other = False
+        # So the index is looked up in the option positions of each group
+        radio_indices = {}
+        for key, positions in DASHBOARD_OPTION_INDEX.items():
+            if current_dashboard in positions:
+                radio_indices[key] = positions[current_dashboard]
+            else:
+                # If value is not in options, use default
+                radio_indices[key] = positions.get(st.session_state.get(key), 0)
 
+        # Определяем, какой expander должен быть развернут при выборе из меню.
+        # По умолчанию разворачиваем блок «Отклонения от базового плана»,
+        # при выборе из меню - раздел выбранной панели
+        expanded_section = "plan_fact"
         if dashboard_selected_from_menu and current_dashboard:
-            # Если выбор сделан из меню, разворачиваем соответствующий expander
-            if current_dashboard in reason_options or current_dashboard in plan_fact_options:
-                expand_plan_fact = True
-                expand_budget = False
-                expand_other = False
-            elif current_dashboard in budget_options:
-                expand_plan_fact = False
-                expand_budget = True
-                expand_other = False
-            elif current_dashboard in other_options:
-                expand_plan_fact = False
-                expand_budget = False
-                expand_other = True
+            expanded_section = DASHBOARD_SECTIONS.get(current_dashboard, "plan_fact")
 
         # Section 1: Отклонения от базового плана (включая причины отклонений)
         with st.expander(
-            "📅 Отклонения от базового плана", expanded=expand_plan_fact
+            "📅 Отклонения от базового плана",
+            expanded=expanded_section == "plan_fact",
         ):
             st.markdown("**Отклонения от базового плана**")
             plan_fact_dashboard = st.radio(
                 "",
-                plan_fact_options,
+                PLAN_FACT_DASHBOARD_OPTIONS,
                 key="plan_fact_radio",
                 label_visibility="collapsed",
-                index=plan_fact_index,
+                index=radio_indices["plan_fact_radio"],
             )
 
             st.markdown("**Причины отклонений**")
             reason_dashboard = st.radio(
                 "",
-                reason_options,
+                REASON_DASHBOARD_OPTIONS,
                 key="reason_radio",
                 label_visibility="collapsed",
-                index=reason_index,
+                index=radio_indices["reason_radio"],
             )
 
         # Section 2: Аналитика по финансам
-        with st.expander("💰 Аналитика по финансам", expanded=expand_budget):
+        with st.expander(
+            "💰 Аналитика по финансам", expanded=expanded_section == "budget"
+        ):
             budget_dashboard = st.radio(
                 "",
-                budget_options,
+                BUDGET_DASHBOARD_OPTIONS,
                 key="budget_radio",
                 label_visibility="collapsed",
-                index=budget_index,
+                index=radio_indices["budget_radio"],
             )
 
         # Section 3: Прочее
-        with st.expander("🔧 Прочее", expanded=expand_other):
+        with st.expander("🔧 Прочее", expanded=expanded_section == "other"):
             other_dashboard = st.radio(
                 "",
-                other_options,
+                OTHER_DASHBOARD_OPTIONS,
                 key="other_radio",
                 label_visibility="collapsed",
-                index=other_index,
+                index=radio_indices["other_radio"],
             )
 
             # Determine selected dashboard based on radio button values
@@ -9966,56 +9557,34 @@ def main():
             # So this code only runs when user selects dashboard via radio buttons in main area
             # Always use current radio button values to determine selected dashboard
             # This ensures that clicking on a radio button (even if already selected) works correctly
-            if reason_dashboard != st.session_state.get(
-                "prev_reason", reason_options[0]
-            ):
-                selected_dashboard = reason_dashboard
-                st.session_state.current_dashboard = reason_dashboard
-                st.session_state.prev_reason = reason_dashboard
-                # Reset other prev values
-                st.session_state.prev_budget = budget_options[0]
-                st.session_state.prev_plan_fact = plan_fact_options[0]
-                st.session_state.prev_other = other_options[0]
-            elif budget_dashboard != st.session_state.get(
-                "prev_budget", budget_options[0]
-            ):
-                selected_dashboard = budget_dashboard
-                st.session_state.current_dashboard = budget_dashboard
-                st.session_state.prev_budget = budget_dashboard
-                # Reset other prev values
-                st.session_state.prev_reason = reason_options[0]
-                st.session_state.prev_plan_fact = plan_fact_options[0]
-                st.session_state.prev_other = other_options[0]
-            elif plan_fact_dashboard != st.session_state.get(
-                "prev_plan_fact", plan_fact_options[0]
-            ):
-                selected_dashboard = plan_fact_dashboard
-                st.session_state.current_dashboard = plan_fact_dashboard
-                st.session_state.prev_plan_fact = plan_fact_dashboard
-                # Reset other prev values
-                st.session_state.prev_reason = reason_options[0]
-                st.session_state.prev_budget = budget_options[0]
-                st.session_state.prev_other = other_options[0]
-            elif other_dashboard != st.session_state.get(
-                "prev_other", other_options[0]
-            ):
-                selected_dashboard = other_dashboard
-                st.session_state.current_dashboard = other_dashboard
-                st.session_state.prev_other = other_dashboard
-                # Reset other prev values
-                st.session_state.prev_reason = reason_options[0]
-                st.session_state.prev_budget = budget_options[0]
-                st.session_state.prev_plan_fact = plan_fact_options[0]
-            else:
+            radio_changes = (
+                (reason_dashboard, "prev_reason", REASON_DASHBOARD_OPTIONS),
+                (budget_dashboard, "prev_budget", BUDGET_DASHBOARD_OPTIONS),
+                (plan_fact_dashboard, "prev_plan_fact", PLAN_FACT_DASHBOARD_OPTIONS),
+                (other_dashboard, "prev_other", OTHER_DASHBOARD_OPTIONS),
+            )
+            selected_dashboard = None
+            for value, prev_key, options in radio_changes:
+                if value != st.session_state.get(prev_key, options[0]):
+                    selected_dashboard = value
+                    st.session_state.current_dashboard = value
+                    # Remember the changed value and reset other prev values
+                    for _, key, key_options in radio_changes:
+                        st.session_state[key] = (
+                            value if key == prev_key else key_options[0]
+                        )
+                    break
+
+            if selected_dashboard is None:
                 # If no radio button change detected, determine from current radio values
                 # This handles the case when user clicks on already selected radio button
-                if reason_dashboard in reason_options:
+                if reason_dashboard in DASHBOARD_OPTION_INDEX["reason_radio"]:
                     selected_dashboard = reason_dashboard
-                elif budget_dashboard in budget_options:
+                elif budget_dashboard in DASHBOARD_OPTION_INDEX["budget_radio"]:
                     selected_dashboard = budget_dashboard
-                elif plan_fact_dashboard in plan_fact_options:
+                elif plan_fact_dashboard in DASHBOARD_OPTION_INDEX["plan_fact_radio"]:
                     selected_dashboard = plan_fact_dashboard
-                elif other_dashboard in other_options:
+                elif other_dashboard in DASHBOARD_OPTION_INDEX["other_radio"]:
                     selected_dashboard = other_dashboard
                 else:
                     # Fallback to current_dashboard
@@ -10025,49 +9594,13 @@ def main():
                 st.session_state.current_dashboard = selected_dashboard
 
         # Route to selected dashboard
-        try:
-            if selected_dashboard == "Причины отклонений по месяцам":
-                dashboard_reasons_of_deviation(df)
-            elif selected_dashboard == "Причины отклонений (по видам причин)":
-                dashboard_dynamics_of_deviations(df)
-            elif selected_dashboard == "БДДС по месяцам":
-                dashboard_budget_by_period(df)
-            elif selected_dashboard == "БДДС по лотам":
-                dashboard_budget_by_section(df)
-            elif selected_dashboard == "БДДС накопительно":
-                dashboard_budget_cumulative(df)
-            elif selected_dashboard == "БДДР по месяцам":
-                dashboard_bddr_by_period(df)
-            elif selected_dashboard == "БДДР по лотам":
-                dashboard_bddr_by_section(df)
-            elif selected_dashboard == "Бюджет План/Прогноз/Факт":
-                dashboard_budget_by_type(df)
-            elif selected_dashboard == "Утвержденный бюджет":
-                dashboard_approved_budget(df)
-            elif selected_dashboard == "Прогнозный бюджет":
-                dashboard_forecast_budget(df)
-            elif selected_dashboard == "Отклонение текущего срока от базового плана":
-                dashboard_plan_fact_dates(df)
-            elif selected_dashboard == "Значения отклонений от базового плана":
-                dashboard_deviation_by_tasks_current_month(df)
-            elif selected_dashboard == "Динамика причин отклонений":
-                dashboard_dynamics_of_reasons(df)
-            elif selected_dashboard == "Выдача рабочей/проектной документации":
-                dashboard_documentation(df)
-            elif selected_dashboard == "Аналитика по технике":
-                dashboard_technique(df)
-            elif selected_dashboard == "График движения рабочей силы":
-                dashboard_workforce_movement(df)
-            elif selected_dashboard == "СКУД стройка":
-                dashboard_skud_stroyka(df)
-            else:
-                st.warning(
-                    f"График '{selected_dashboard}' не найден. Пожалуйста, выберите другой график."
-                )
-                st.info(f"Текущий выбор: {selected_dashboard}")
-        except Exception as e:
-            st.error(f"Ошибка при отображении графика '{selected_dashboard}': {str(e)}")
-            st.exception(e)
+        if selected_dashboard in DASHBOARD_RENDERERS:
+            render_dashboard_fragment(selected_dashboard, df)
+        else:
+            st.warning(
+                f"График '{selected_dashboard}' не найден. Пожалуйста, выберите другой график."
+            )
+            st.info(f"Текущий выбор: {selected_dashboard}")
     else:
         # Welcome message
         st.info(
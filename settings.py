@@ -2,8 +2,10 @@
 Модуль для управления настройками системы
 """
 import sqlite3
+import threading
 from datetime import datetime
 from typing import Optional, Dict
+import streamlit as st
 from auth import DB_PATH, init_db
 
 # Инициализация таблицы настроек
@@ -28,6 +30,44 @@ def init_settings_table():
 init_db()
 init_settings_table()
 
+# Блокировка общего соединения: запросы из разных потоков Streamlit не должны
+# пересекаться на одном соединении
+_settings_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_settings_connection() -> sqlite3.Connection:
+    """
+    Общее соединение с базой настроек на процесс сервера
+
+    Returns:
+        Соединение SQLite, используемое всеми функциями модуля
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# Тексты запросов неизменны, поэтому sqlite3 берет подготовленные выражения из
+# кэша соединения вместо повторного разбора SQL
+_SELECT_SETTING_SQL = "SELECT value FROM settings WHERE key = ?"
+_SELECT_ALL_SETTINGS_SQL = (
+    "SELECT key, value, description, updated_at, updated_by FROM settings"
+)
+# UPSERT обновляет строку на месте (INSERT OR REPLACE удалял ее и вставлял
+# заново с новым id); описание сохраняется, если новое не передано
+_UPSERT_SETTING_SQL = """
+    INSERT INTO settings (key, value, description, updated_at, updated_by)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+        value = excluded.value,
+        description = coalesce(excluded.description, description),
+        updated_at = excluded.updated_at,
+        updated_by = excluded.updated_by
+"""
+_DELETE_SETTING_SQL = "DELETE FROM settings WHERE key = ?"
+
 # Ключи настроек
 SETTING_KEYS = {
     'finance_files_path': 'Путь к файлам финансовых данных',
@@ -36,10 +76,14 @@ SETTING_KEYS = {
 }
 
 
+@st.cache_data(ttl=60, show_spinner=False)
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
     """
     Получение значения настройки
     
+    Результат кэшируется на 60 секунд; set_setting и delete_setting
+    сбрасывают кэш.
+    
     Args:
         key: Ключ настройки
         default: Значение по умолчанию
@@ -48,11 +92,9 @@ def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
         Значение настройки или default
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        result = cursor.fetchone()
-        conn.close()
+        conn = get_settings_connection()
+        with _settings_lock:
+            result = conn.execute(_SELECT_SETTING_SQL, (key,)).fetchone()
         
         if result:
             return result[0]
@@ -73,14 +115,13 @@ def set_setting(key: str, value: str, description: Optional[str] = None, updated
         updated_by: Пользователь, который обновил настройку
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO settings (key, value, description, updated_at, updated_by)
-            VALUES (?, ?, ?, ?, ?)
-        """, (key, value, description, datetime.now().isoformat(), updated_by))
-        conn.commit()
-        conn.close()
+        conn = get_settings_connection()
+        with _settings_lock, conn:
+            conn.execute(
+                _UPSERT_SETTING_SQL,
+                (key, value, description, datetime.now().isoformat(), updated_by),
+            )
+        get_setting.clear()
     except Exception as e:
         print(f"Ошибка при установке настройки: {e}")
 
@@ -93,19 +134,19 @@ def get_all_settings() -> Dict[str, Dict]:
         Словарь с настройками
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT key, value, description, updated_at, updated_by FROM settings")
-        rows = cursor.fetchall()
-        conn.close()
+        conn = get_settings_connection()
+        with _settings_lock:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute(_SELECT_ALL_SETTINGS_SQL).fetchall()
         
         settings = {}
         for row in rows:
-            settings[row[0]] = {
-                'value': row[1],
-                'description': row[2],
-                'updated_at': row[3],
-                'updated_by': row[4]
+            settings[row['key']] = {
+                'value': row['value'],
+                'description': row['description'],
+                'updated_at': row['updated_at'],
+                'updated_by': row['updated_by']
             }
         
         return settings
@@ -122,11 +163,10 @@ def delete_setting(key: str):
         key: Ключ настройки
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM settings WHERE key = ?", (key,))
-        conn.commit()
-        conn.close()
+        conn = get_settings_connection()
+        with _settings_lock, conn:
+            conn.execute(_DELETE_SETTING_SQL, (key,))
+        get_setting.clear()
     except Exception as e:
         print(f"Ошибка при удалении настройки: {e}")
 
@@ -1,22 +1,50 @@
 #!/usr/bin/env python3
 """Test CSV loading with proper parameters"""
 
+import codecs
+
 import pandas as pd
-import csv
+
+# Types of the project data columns, declared up front so pandas skips type
+# inference for them. Dates stay strings (dd.mm.yyyy, parsed by the app with
+# dayfirst); money columns use a decimal comma
+TEXT_COLUMNS = ['Проект', 'Аббревиатура', 'Блок', 'Раздел', 'Задача',
+                'Старт План', 'Конец План', 'Старт Факт', 'Конец Факт',
+                'Причина отклонений']
+MONEY_COLUMNS = ['Бюджет План', 'Бюджет Факт', 'Резерв']
+KNOWN_DTYPES = {
+    **dict.fromkeys(TEXT_COLUMNS, 'string[pyarrow]'),
+    **dict.fromkeys(MONEY_COLUMNS, 'double[pyarrow]'),
+    'Отклонение': 'int64[pyarrow]',
+    'Отклонений в днях': 'int64[pyarrow]',
+}
+
+CSV_PATH = 'sample_project_data_filled.csv'
+
+
+def detect_encoding(path, sample_size=32768):
+    """Pick utf-8-sig or windows-1251 from the first bytes of the file"""
+    with open(path, 'rb') as f:
+        head = f.read(sample_size)
+    try:
+        # Incremental decoder: a multi-byte character cut at the end of the
+        # sample is not an error
+        codecs.getincrementaldecoder('utf-8-sig')().decode(head, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'windows-1251'
+
 
 # Test loading the filled CSV file
+# The encoding is detected once so the file is parsed exactly once.
+# The Arrow CSV reader parses in parallel and returns Arrow-backed columns;
+# it quotes minimally by default, so only quotechar/doublequote are passed
 try:
-    df = pd.read_csv('sample_project_data_filled.csv', sep=';', encoding='utf-8-sig', 
-                     quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
-    print(f"[OK] Successfully loaded {len(df)} rows, {len(df.columns)} columns")
+    encoding = detect_encoding(CSV_PATH)
+    df = pd.read_csv(CSV_PATH, sep=';', encoding=encoding,
+                     quotechar='"', doublequote=True, decimal=',', dtype=KNOWN_DTYPES,
+                     engine='pyarrow', dtype_backend='pyarrow')
+    print(f"[OK] Successfully loaded with {encoding}: {len(df)} rows, {len(df.columns)} columns")
     print(f"  Columns: {list(df.columns)}")
 except Exception as e:
     print(f"[ERROR] Error loading: {e}")
-    # Try with windows-1251 encoding
-    try:
-        df = pd.read_csv('sample_project_data_filled.csv', sep=';', encoding='windows-1251',
-                        quoting=csv.QUOTE_MINIMAL, quotechar='"', doublequote=True)
-        print(f"[OK] Successfully loaded with windows-1251: {len(df)} rows, {len(df.columns)} columns")
-    except Exception as e2:
-        print(f"[ERROR] Error with windows-1251: {e2}")
-